@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Fused multi-aggregation for grouped data.
+
+    df.groupby('year')['lifeExp'].agg([np.count_nonzero, np.mean, np.std])
+    df.groupby('year').agg({'lifeExp': np.mean, 'pop': np.median, 'gdpPercap': np.median})
+
+run a separate pass over the data for every function and every column.
+Many of these statistics share work: count and sum give the mean, and with
+the sum of squared deviations they give the variance and standard
+deviation; a single sort within groups gives every median and quantile.
+
+`plan` works out which shared statistics a specification needs, and
+`aggregate` computes them in one pass per column (columns in parallel
+threads) over the cached group order of groupindex.py. The results are the
+same as pandas'. `groupindex.GroupBy.agg` uses this automatically, and
+`describe` gives a grouped `describe()` from one sort.
+
+Run this file to time it against pandas.
+"""
+
+#%% preamble
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+#%% Functions
+
+# function -> (statistic, ddof, skip NaN), following what pandas does with
+# each: numpy's std/var use ddof = 0, and np.median is applied as is, so a
+# group with a missing value has a missing median
+_FUNCS = {
+    'count': ('count', None, True), 'size': ('size', None, True),
+    'sum': ('sum', None, True), 'mean': ('mean', None, True),
+    'median': ('median', None, True), 'min': ('min', None, True),
+    'max': ('max', None, True), 'std': ('std', 1, True), 'var': ('var', 1, True),
+    np.sum: ('sum', None, True), np.mean: ('mean', None, True),
+    np.median: ('median', None, False), np.min: ('min', None, True),
+    np.max: ('max', None, True), np.std: ('std', 0, True), np.var: ('var', 0, True),
+    np.count_nonzero: ('count_nonzero', None, True),
+}
+
+# the shared statistics each result is built from
+_NEEDS = {
+    'count': {'count'}, 'size': set(), 'sum': {'sum'}, 'mean': {'count', 'sum'},
+    'median': {'sorted', 'count'}, 'min': {'min'}, 'max': {'max'},
+    'std': {'count', 'sum', 'm2'}, 'var': {'count', 'sum', 'm2'},
+    'count_nonzero': {'nonzero'},
+}
+
+
+def _name(func):
+    return func if isinstance(func, str) else func.__name__
+
+
+def _lookup(func):
+    try:
+        return _FUNCS[func]
+    except (KeyError, TypeError):
+        return None
+
+
+def plan(spec, columns=None):
+    """
+    Work out the statistics needed for an aggregation specification.
+
+    INPUTS:
+    spec    : a function or name, a list of them, or a dict of column ->
+              function(s), as accepted by pandas' `agg`
+    columns : the column(s) a non-dict spec applies to
+
+    OUTPUT:
+    A dict of column -> list of (output name, statistic, ddof, skipna), and a dict
+    of column -> set of shared statistics, or None if some function can't
+    be planned (pandas should be used instead)
+    """
+    if isinstance(spec, dict):
+        items = spec.items()
+    else:
+        items = [(c, spec) for c in ([columns] if np.isscalar(columns) else columns)]
+    outputs, needs = {}, {}
+    for column, funcs in items:
+        funcs = funcs if isinstance(funcs, (list, tuple)) else [funcs]
+        outputs[column] = []
+        needs[column] = set()
+        for f in funcs:
+            found = _lookup(f)
+            if found is None:
+                return None
+            outputs[column].append((_name(f),) + found)
+            stat = found[0]
+            needs[column] |= _NEEDS[stat]
+    return outputs, needs
+
+
+#%% Fused pass
+
+
+def _numeric(dtype):
+    # the statistics are computed on numpy numbers; pandas does the rest
+    return isinstance(dtype, np.dtype) and dtype.kind in 'iufb'
+
+
+def _column_stats(values, index, needs):
+    """All shared statistics of one column from a single grouped pass"""
+    starts = index.offsets[:-1]
+    sizes = index.sizes()
+    v = values[index.order]
+    is_int = v.dtype.kind in 'iub'
+    out = {}
+    if 'nonzero' in needs:
+        out['nonzero'] = np.add.reduceat((v != 0).astype(np.int64), starts) if len(v) else sizes * 0
+    f = v.astype(float) if not is_int else None
+    ok = None if is_int else ~np.isnan(f)
+    if 'count' in needs:
+        out['count'] = sizes.copy() if is_int else np.add.reduceat(ok.astype(np.int64), starts)
+    if 'sum' in needs:
+        if is_int:
+            out['sum'] = np.add.reduceat(v.astype(np.int64), starts)
+        else:
+            out['sum'] = np.add.reduceat(np.where(ok, f, 0.0), starts)
+    if 'm2' in needs:
+        x = v.astype(float) if is_int else f
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = out['sum'] / out['count']
+        dev = x - np.repeat(mean, sizes)
+        if not is_int:
+            dev = np.where(ok, dev, 0.0)
+        out['m2'] = np.add.reduceat(dev * dev, starts)
+    if 'min' in needs:
+        out['min'] = np.minimum.reduceat(v, starts) if is_int else np.fmin.reduceat(f, starts)
+    if 'max' in needs:
+        out['max'] = np.maximum.reduceat(v, starts) if is_int else np.fmax.reduceat(f, starts)
+    if 'sorted' in needs:
+        # one sort within each group (NaN last) serves every median/quantile
+        x = v.astype(float)
+        if len(sizes) <= 4096:
+            for s, e in zip(starts, index.offsets[1:]):
+                x[s:e].sort()
+        else:
+            group = np.repeat(np.arange(len(sizes)), sizes).astype(np.min_scalar_type(len(sizes)))
+            o = np.argsort(x)
+            x = x[o[np.argsort(group[o], kind='stable')]]
+        out['sorted'] = x
+    return out
+
+
+def _quantile(sorted_values, starts, counts, q):
+    """Linear-interpolated quantile of each group from within-group sorted values"""
+    out = np.full(len(starts), np.nan)
+    has = counts > 0
+    pos = q * (counts[has] - 1)
+    lo = np.floor(pos).astype(np.int64)
+    hi = np.ceil(pos).astype(np.int64)
+    s = starts[has]
+    a, b = sorted_values[s + lo], sorted_values[s + hi]
+    out[has] = a + (b - a) * (pos - lo)
+    return out
+
+
+def _finish(stat, ddof, skipna, stats, index):
+    with np.errstate(invalid='ignore', divide='ignore'):
+        if stat == 'size':
+            return index.sizes()
+        if stat in ('count', 'sum', 'min', 'max'):
+            return stats[stat]
+        if stat == 'count_nonzero':
+            return stats['nonzero']
+        if stat == 'mean':
+            return stats['sum'] / stats['count']
+        if stat in ('var', 'std'):
+            n = stats['count']
+            var = np.where(n > ddof, stats['m2'] / (n - ddof), np.nan)
+            return np.sqrt(var) if stat == 'std' else var
+        if stat == 'median':
+            out = _quantile(stats['sorted'], index.offsets[:-1], stats['count'], 0.5)
+            if not skipna:
+                out[stats['count'] < index.sizes()] = np.nan
+            return out
+    raise ValueError(stat)
+
+
+def aggregate(df, index, spec, columns=None, workers=None):
+    """
+    Grouped aggregation of `df` with a GroupIndex, in one fused pass per column.
+
+    INPUTS:
+    df      : the DataFrame
+    index   : a groupindex.GroupIndex for the grouping
+    spec    : as for pandas' `agg`: a function, list of functions or dict
+              of column -> function(s)
+    columns : the column(s) selected before `agg` (for non-dict specs)
+    workers : threads used across columns (default one per column)
+
+    OUTPUT:
+    A Series or DataFrame shaped as pandas' `agg` result, or None if the
+    spec contains functions that can't be planned or columns that aren't
+    numbers (strings, dates, nullable or categorical columns)
+    """
+    planned = plan(spec, columns)
+    if planned is None:
+        return None
+    outputs, needs = planned
+    cols = list(outputs)
+    if not all(_numeric(df[c].dtype) for c in cols):
+        return None
+
+    def run(c):
+        return _column_stats(df[c].to_numpy(), index, needs[c])
+
+    if len(cols) > 1:
+        with ThreadPoolExecutor(max_workers=workers or len(cols)) as pool:
+            stats = dict(zip(cols, pool.map(run, cols)))
+    else:
+        stats = {c: run(c) for c in cols}
+
+    results = {(c, name): _finish(stat, ddof, skipna, stats[c], index)
+               for c in cols for name, stat, ddof, skipna in outputs[c]}
+    groups = index.groups
+    if isinstance(spec, dict):
+        if all(not isinstance(f, (list, tuple)) for f in spec.values()):
+            return pd.DataFrame({c: results[(c, outputs[c][0][0])] for c in cols}, index=groups)
+        out = pd.DataFrame({key: value for key, value in results.items()}, index=groups)
+        out.columns = pd.MultiIndex.from_tuples(out.columns)
+        return out
+    if np.isscalar(columns):
+        if not isinstance(spec, (list, tuple)):
+            return pd.Series(results[(columns, outputs[columns][0][0])], index=groups, name=columns)
+        return pd.DataFrame({name: results[(columns, name)] for name, *_ in outputs[columns]},
+                            index=groups)
+    if not isinstance(spec, (list, tuple)):
+        return pd.DataFrame({c: results[(c, outputs[c][0][0])] for c in cols}, index=groups)
+    out = pd.DataFrame(dict(results), index=groups)
+    out.columns = pd.MultiIndex.from_tuples(out.columns)
+    return out
+
+
+def describe(df, index, column, percentiles=(0.25, 0.5, 0.75)):
+    """
+    Grouped `describe()` of a numeric column from a single within-group
+    sort: min, max and every percentile are read from the sorted values.
+    """
+    stats = _column_stats(df[column].to_numpy(), index, {'count', 'sum', 'm2', 'sorted'})
+    starts = index.offsets[:-1]
+    n = stats['count']
+    out = {'count': n.astype(float),
+           'mean': _finish('mean', None, True, stats, index),
+           'std': _finish('std', 1, True, stats, index),
+           'min': _quantile(stats['sorted'], starts, n, 0.0)}
+    for q in percentiles:
+        out[f'{q * 100:g}%'] = _quantile(stats['sorted'], starts, n, q)
+    out['max'] = _quantile(stats['sorted'], starts, n, 1.0)
+    return pd.DataFrame(out, index=index.groups)
+
+
+#%% Benchmark
+
+
+def benchmark(n=1000000, seed=25):
+    import groupindex
+
+    rng = np.random.RandomState(seed)
+    df = pd.DataFrame({'year': rng.choice(np.arange(1952, 2008, 5), n),
+                       'lifeExp': rng.rand(n) * 50 + 30,
+                       'pop': rng.randint(60000, 1300000000, n),
+                       'gdpPercap': rng.rand(n) * 1e4})
+    cases = [
+        ('lifeExp: count_nonzero, mean, std',
+         lambda: df.groupby('year')['lifeExp'].agg([np.count_nonzero, np.mean, np.std]),
+         lambda: groupindex.groupby(df, 'year')['lifeExp'].agg([np.count_nonzero, np.mean, np.std])),
+        ('dict: mean, median, median',
+         lambda: df.groupby('year').agg({'lifeExp': np.mean, 'pop': np.median, 'gdpPercap': np.median}),
+         lambda: groupindex.groupby(df, 'year').agg({'lifeExp': np.mean, 'pop': np.median,
+                                                      'gdpPercap': np.median})),
+        ('lifeExp: describe',
+         lambda: df.groupby('year')['lifeExp'].describe(),
+         lambda: groupindex.groupby(df, 'year')['lifeExp'].describe()),
+    ]
+    for label, f_pandas, f_fused in cases:
+        pd.testing.assert_frame_equal(f_pandas(), f_fused())
+        times = []
+        for f in (f_pandas, f_fused):
+            start = time.perf_counter()
+            f()
+            times.append(time.perf_counter() - start)
+        print(f'{label:<36} pandas {times[0] * 1e3:7.1f} ms, fused {times[1] * 1e3:7.1f} ms')
+
+
+if __name__ == '__main__':
+    benchmark()
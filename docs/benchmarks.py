@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmarks of the pandas recipes in pd_extract.py, pd_merge.py, pd_sac.py,
+pd_tidy.py and pd_concat.py as the data grows.
+
+Each recipe is run on data from datagen.py at several scales and with
+three mixes of column types:
+
++ 'default'  : as read from CSV (str, int64, float64)
++ 'category' : text columns with few distinct values as categoricals
++ 'nullable' : int and bool columns as masked dtypes (see nullable.py)
+
+Every case runs in a fresh process, and records
+
++ the minimum and median wall time over `repeat` runs
++ the peak resident memory (RSS) during one run, above what the data takes
++ the peak of memory allocated through Python and numpy (tracemalloc, in
+  a separate run so it doesn't slow down the timings)
+
+Results are saved as JSON, and can be compared against a saved baseline:
+
+    python benchmarks.py --scales 1 100 --save bench
+    python benchmarks.py --scales 1 100 --baseline bench/20261019-101500.json
+
+A case is flagged as a regression when its time or memory is more than
+`threshold` times the baseline.
+"""
+
+#%% preamble
+
+import argparse
+import gc
+import json
+import os
+import pickle
+import platform
+import statistics
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import datagen
+import nullable
+import rss
+
+SCALES = (1, 100, 1000)
+MIXES = ('default', 'category', 'nullable')
+
+#%% Recipes
+
+_RECIPES = {}
+
+
+def recipe(dataset):
+    """Register a benchmark of a recipe run on one of the datasets"""
+    def register(func):
+        _RECIPES[func.__name__] = (dataset, func)
+        return func
+    return register
+
+
+# pd_extract.py
+
+@recipe('titanic')
+def extract_columns(titanic):
+    return titanic.loc[:, ['Survived', 'Fare']]
+
+
+@recipe('titanic')
+def extract_boolean_filter(titanic):
+    return titanic[(titanic['Pclass'] == 1) & (titanic['Fare'] > 50)]
+
+
+@recipe('titanic')
+def extract_query(titanic):
+    return titanic.query("(Pclass == 1) & (Embarked == 'S')")
+
+
+# pd_merge.py
+
+@recipe('survey')
+def merge_three_way(tables):
+    survey, visited = tables['survey_survey.csv'], tables['survey_visited.csv']
+    site, person = tables['survey_site.csv'], tables['survey_person.csv']
+    merged = survey.merge(visited, how='left', left_on='taken', right_on='ident')
+    merged = merged.merge(site, how='left', left_on='site', right_on='name')
+    return merged.merge(person, how='left', left_on='person', right_on='ident')
+
+
+# pd_sac.py
+
+@recipe('gapminder')
+def groupby_mean(df):
+    return df.groupby('country', observed=True)['lifeExp'].mean()
+
+
+@recipe('gapminder')
+def groupby_agg_list(df):
+    return df.groupby('continent', observed=True)['lifeExp'].agg(
+        [np.count_nonzero, np.mean, np.median])
+
+
+@recipe('gapminder')
+def groupby_agg_dict(df):
+    return df.groupby('continent', observed=True).agg(
+        {'lifeExp': np.mean, 'pop': np.median, 'gdpPercap': np.median})
+
+
+@recipe('gapminder')
+def groupby_describe(df):
+    return df.groupby('continent', observed=True)['lifeExp'].describe()
+
+
+@recipe('gapminder')
+def groupby_transform(df):
+    def my_zscore(values):
+        return (values - np.mean(values)) / np.std(values)
+    return df.groupby('year', observed=True)['lifeExp'].transform(my_zscore)
+
+
+@recipe('gapminder')
+def groupby_filter(df):
+    return df.groupby('country', observed=True).filter(lambda g: g['lifeExp'].mean() > 60)
+
+
+# pd_tidy.py
+
+@recipe('pew')
+def melt(pew):
+    return pd.melt(pew, id_vars=['religion'], var_name='income_group', value_name='count')
+
+
+@recipe('tables')
+def pivot_table(tables):
+    return tables['table2.csv'].pivot_table(index=['country', 'year'], columns='type',
+                                            values='count', observed=True)
+
+
+@recipe('tables')
+def split_column(tables):
+    table3 = tables['table3.csv']
+    parts = table3['rate'].astype(str).str.split('/', expand=True)
+    parts.columns = ['cases', 'population']
+    return pd.concat([table3.drop(columns='rate'), parts], axis=1)
+
+
+# pd_concat.py (on three parts of titanic)
+
+def _thirds(titanic):
+    n = len(titanic) // 3
+    return titanic.iloc[:n], titanic.iloc[n:2 * n], titanic.iloc[2 * n:]
+
+
+@recipe('titanic')
+def concat_rows(titanic):
+    return pd.concat(_thirds(titanic))
+
+
+@recipe('titanic')
+def concat_columns(titanic):
+    df1, df2, df3 = (d.reset_index(drop=True) for d in _thirds(titanic))
+    return pd.concat([df1, df2, df3], axis=1)
+
+
+@recipe('titanic')
+def concat_inner(titanic):
+    df1, _, df3 = _thirds(titanic)
+    return pd.concat([df1, df3[['PassengerId', 'Name', 'Fare']]], join='inner')
+
+
+@recipe('titanic')
+def append_row(titanic):
+    return pd.concat([titanic, titanic.iloc[[0]]])
+
+
+#%% Data
+
+
+def _mix(df, mix):
+    if mix == 'category':
+        text = [c for c in df.columns if df[c].dtype.kind in 'OT' or df[c].dtype == 'str']
+        few = [c for c in text if df[c].nunique() <= max(1, len(df) // 2)]
+        return df.astype({c: 'category' for c in few})
+    if mix == 'nullable':
+        return nullable.to_nullable(df)
+    return df
+
+
+def _prepare(dataset, scale, mix, directory):
+    """Generate a dataset once, and pickle it for the benchmark processes"""
+    path = os.path.join(directory, f'{dataset}-{scale}-{mix}.pkl')
+    if not os.path.exists(path):
+        data = datagen.generate(dataset, scale)
+        data = {k: _mix(v, mix) for k, v in data.items()} if isinstance(data, dict) \
+            else _mix(data, mix)
+        with open(path, 'wb') as f:
+            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+    return path
+
+
+#%% Measuring
+
+
+def _measure(args):
+    name, path, repeat = args
+    dataset, func = _RECIPES[name]
+    with open(path, 'rb') as f:
+        data = pickle.load(f)
+    out = {}
+    try:
+        times = []
+        for _ in range(repeat):
+            gc.collect()
+            start = time.perf_counter()
+            func(data)
+            times.append(time.perf_counter() - start)
+        out['min'] = min(times)
+        out['median'] = statistics.median(times)
+
+        gc.collect()
+        rss.reset_peak()
+        before = rss.current()
+        func(data)
+        out['peak_rss_mb'] = max(0, rss.peak() - before) / 2 ** 20
+
+        gc.collect()
+        tracemalloc.start()
+        func(data)
+        out['alloc_peak_mb'] = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        tracemalloc.stop()
+    except Exception as e:  # a recipe that doesn't work with a dtype mix
+        out['error'] = f'{type(e).__name__}: {e}'
+    return out
+
+
+def run(names=None, scales=SCALES, mixes=MIXES, repeat=5, verbose=True):
+    """
+    Run the benchmarks.
+
+    INPUTS:
+    names   : recipes to run (default: all)
+    scales  : data sizes relative to the original datasets
+    mixes   : column type mixes ('default', 'category', 'nullable')
+    repeat  : timed runs per case
+
+    OUTPUT:
+    A dict with the environment ('meta') and a list of 'results'
+    """
+    names = list(_RECIPES) if names is None else names
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for scale in scales:
+            for mix in mixes:
+                for name in names:
+                    dataset = _RECIPES[name][0]
+                    path = _prepare(dataset, scale, mix, directory)
+                    # a new process per case, so memory peaks don't carry over
+                    with ProcessPoolExecutor(max_workers=1) as pool:
+                        out = pool.submit(_measure, (name, path, repeat)).result()
+                    row = {'benchmark': name, 'scale': scale, 'mix': mix, **out}
+                    results.append(row)
+                    if verbose:
+                        print(_format(row))
+    meta = {'time': time.strftime('%Y-%m-%dT%H:%M:%S'), 'python': platform.python_version(),
+            'pandas': pd.__version__, 'numpy': np.__version__, 'machine': platform.machine(),
+            'processor': platform.processor(), 'cpus': os.cpu_count(), 'repeat': repeat}
+    return {'meta': meta, 'results': results}
+
+
+def _format(row):
+    label = f"{row['benchmark']:<24} x{row['scale']:<6g} {row['mix']:<9}"
+    if 'error' in row:
+        return f'{label} {row["error"]}'
+    return (f"{label} {row['min'] * 1e3:9.2f} ms (median {row['median'] * 1e3:9.2f})"
+            f"  rss +{row['peak_rss_mb']:8.1f} MB  alloc {row['alloc_peak_mb']:8.1f} MB")
+
+
+#%% Storing and comparing
+
+
+def save(report, directory='bench'):
+    """Save a report from run() as directory/<date>-<time>.json"""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, time.strftime('%Y%m%d-%H%M%S') + '.json')
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=1)
+    return path
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(report, baseline, threshold=1.25, metrics=('min', 'alloc_peak_mb')):
+    """
+    Compare a report with a baseline report.
+
+    INPUTS:
+    report, baseline : reports from run() (or paths of saved ones)
+    threshold        : ratio to the baseline above which a case regressed
+    metrics          : measurements compared
+
+    OUTPUT:
+    A DataFrame with one row per case of the baseline, the baseline and new
+    value and their ratio for each metric, a 'status' column ('ok', 'error'
+    if the new run failed, 'missing' if the new report doesn't have the
+    case) and a 'regression' column. A case regressed if a ratio is above
+    the threshold, if it is missing, or if it fails now but didn't in the
+    baseline
+    """
+    report = load(report) if isinstance(report, str) else report
+    baseline = load(baseline) if isinstance(baseline, str) else baseline
+    keys = ['benchmark', 'scale', 'mix']
+    new = pd.DataFrame(report['results'])
+    old = pd.DataFrame(baseline['results'])
+    for df in (new, old):
+        if 'error' not in df:
+            df['error'] = None
+    new['found'] = True
+    out = old.merge(new, on=keys, how='left', suffixes=('_baseline', '_new'))
+    missing = out['found'].isna().to_numpy()
+    failed = out['error_new'].notna().to_numpy() & ~missing
+    out['status'] = np.select([missing, failed], ['missing', 'error'], 'ok')
+    regression = pd.Series(missing | (failed & out['error_baseline'].isna().to_numpy()),
+                           index=out.index)
+    for m in metrics:
+        if f'{m}_baseline' not in out or f'{m}_new' not in out:
+            continue
+        ratio = out[f'{m}_new'] / out[f'{m}_baseline']
+        out[f'{m}_ratio'] = ratio
+        # small absolute differences in memory are noise
+        noise = (out[f'{m}_new'] - out[f'{m}_baseline']).abs() < (1.0 if m.endswith('mb') else 0)
+        regression |= (ratio > threshold) & ~noise
+    out['regression'] = regression
+    columns = keys + [c for m in metrics for c in (f'{m}_baseline', f'{m}_new', f'{m}_ratio')
+                      if c in out] + ['status', 'regression']
+    return out[columns]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the pandas recipes')
+    parser.add_argument('names', nargs='*', help='recipes to run (default: all)')
+    parser.add_argument('--scales', nargs='+', type=float, default=SCALES)
+    parser.add_argument('--mixes', nargs='+', default=MIXES)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--save', metavar='DIRECTORY', help='save the results as JSON here')
+    parser.add_argument('--baseline', metavar='JSON', help='compare with a saved report')
+    parser.add_argument('--threshold', type=float, default=1.25)
+    args = parser.parse_args()
+    report = run(args.names or None, [s if s % 1 else int(s) for s in args.scales],
+                 args.mixes, args.repeat)
+    if args.save:
+        print('saved', save(report, args.save))
+    if args.baseline:
+        table = compare(report, args.baseline, args.threshold)
+        print(table.to_string(index=False))
+        if table['regression'].any():
+            raise SystemExit(f"{table['regression'].sum()} regression(s)")
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+value_counts, describe and cross-tabulation from integer codes.
+
+python_pandas.py explores categorical columns with
+
+    df['A'].value_counts()
+    df_cat['A'].describe()
+    df_cat['B'] = pd.Categorical(list('aabb'), categories = ['a','b','c','d'])
+    df_cat['B'].value_counts()
+
+A categorical column already stores an integer code per row, so all of
+these are one `np.bincount` over the codes, with a count for every
+category, seen or not. Other columns are factorized first. Several columns
+are counted together by combining their codes into one code per row, so a
+contingency table of any number of columns is again a single bincount:
+
+    value_counts(df_cat['B'])                  # df_cat['B'].value_counts()
+    describe(df_cat['A'])                      # df_cat['A'].describe()
+    value_counts(df_cat[['A', 'B']])           # df_cat[['A', 'B']].value_counts()
+    crosstab(df_cat, 'A', 'B')                 # table of A by B, every category included
+"""
+
+#%% preamble
+
+import numpy as np
+import pandas as pd
+
+#%% Codes
+
+
+def _codes(series, appearance=False):
+    """
+    Integer codes (-1 for missing) and the values they stand for. With
+    appearance = True the categories of a categorical are ordered as they
+    first occur, then the unused ones (as groupby(sort = False) has them)
+    """
+    values = series.array
+    if isinstance(values, pd.Categorical):
+        codes = values.codes.astype(np.intp)
+        levels = pd.CategoricalIndex(values.categories, categories=values.categories,
+                                     ordered=values.ordered)
+        if appearance:
+            seen = _first_seen(codes)
+            order = np.concatenate([seen, np.setdiff1d(np.arange(len(levels)), seen)])
+            rank = np.empty(len(order), dtype=np.intp)
+            rank[order] = np.arange(len(order))
+            codes = np.where(codes >= 0, rank[np.maximum(codes, 0)], -1)
+            levels = levels[order]
+        return codes, levels
+    codes, uniques = pd.factorize(values)  # in order of appearance, as value_counts breaks ties
+    return codes.astype(np.intp), pd.Index(uniques)
+
+
+def _first_seen(codes):
+    """The distinct codes (not -1) in order of first occurrence"""
+    return pd.unique(codes[codes >= 0]).astype(np.intp)
+
+
+def _combined(frame, names, appearance=False):
+    """
+    One code per row for several columns (-1 if any is missing), and the
+    categories of each column. Codes run over the product of the
+    categories in lexicographic order.
+    """
+    codes, levels = zip(*(_codes(frame[n], appearance) for n in names))
+    sizes = [len(lev) for lev in levels]
+    missing = np.zeros(len(frame), dtype=bool)
+    for c in codes:
+        missing |= c < 0
+    combined = np.ravel_multi_index([np.where(missing, 0, c) for c in codes], sizes) \
+        if len(frame) else np.zeros(0, dtype=np.intp)
+    combined[missing] = -1
+    return combined, list(levels), sizes
+
+
+def _bincount(codes, size):
+    return np.bincount(codes[codes >= 0], minlength=size)
+
+
+#%% value_counts
+
+
+def _frame_counts(df):
+    """
+    Counts of the rows of a DataFrame by their values, in the order of
+    groupby(sort = False, observed = False): every combination of the
+    categories of the categorical columns with each combination of the
+    other columns' values that occurs. The combinations that occur come
+    first, in order of appearance; if all columns are categorical the
+    order is that of the product of the categories instead.
+    """
+    names = list(df.columns)
+    cat = [n for n in names if isinstance(df[n].dtype, pd.CategoricalDtype)]
+    other = [n for n in names if n not in cat]
+    if cat:
+        k, levels, sizes = _combined(df, cat, appearance=True)
+    else:
+        k, levels, sizes = np.zeros(len(df), dtype=np.intp), [], []
+    ncat = int(np.prod(sizes))
+    missing = k < 0
+    # the combinations of the other columns, numbered as they first occur
+    g = np.zeros(len(df), dtype=np.int64)
+    for n in other:
+        codes, uniques = _codes(df[n])
+        missing |= codes < 0
+        g = g * (len(uniques) + 1) + codes + 1
+        g = pd.factorize(g)[0].astype(np.int64)
+    ok = np.flatnonzero(~missing)
+    g[ok] = pd.factorize(g[ok])[0]
+    ngroups = int(g[ok].max()) + 1 if len(ok) else (0 if other else 1)
+    first = ok[np.unique(g[ok], return_index=True)[1]] if other else None
+    key = np.where(missing, -1, g * ncat + k)
+    counts = _bincount(key, ngroups * ncat)
+    if other:
+        order = _first_seen(key)
+        if cat:
+            order = np.concatenate([order, np.setdiff1d(np.arange(len(counts)), order)])
+    else:
+        order = np.arange(len(counts))
+    arrays = {}
+    for n in other:
+        arrays[n] = df[n].array.take(first[order // ncat])
+    for n, lev, codes in zip(cat, levels, np.unravel_index(order % ncat, sizes)
+                             if cat else []):
+        arrays[n] = lev[codes]
+    index = pd.MultiIndex.from_arrays([arrays[n] for n in names], names=names)
+    return counts[order], index
+
+
+
+def value_counts(obj, normalize=False, sort=True, ascending=False, dropna=True):
+    """
+    `value_counts()` of a Series, or of the rows of a DataFrame, from one
+    bincount over codes. Categories that don't occur are counted as 0, as
+    pandas does for categorical columns (for a DataFrame: the combinations
+    that don't occur are listed if any of its columns is categorical).
+
+    INPUTS:
+    obj       : a Series, or a DataFrame (counts of each combination of values)
+    normalize : proportions instead of counts
+    sort      : sort by count (ties keep category order)
+    ascending : smallest counts first
+    dropna    : leave out missing values (Series only)
+
+    OUTPUT:
+    A Series named 'count' (or 'proportion') indexed by the values
+    """
+    if isinstance(obj, pd.DataFrame):
+        counts, index = _frame_counts(obj)
+    else:
+        codes, levels = _codes(obj)
+        counts = _bincount(codes, len(levels))
+        index = levels.rename(obj.name)
+        if not isinstance(obj.dtype, pd.CategoricalDtype):
+            index = index.astype(obj.dtype)
+        if not dropna:
+            nmissing = int(np.count_nonzero(codes < 0))
+            if nmissing:
+                counts = np.append(counts, nmissing)
+                index = index.insert(len(index), np.nan)
+        if not isinstance(obj.dtype, pd.CategoricalDtype):
+            # like pandas, only categoricals list values that don't occur
+            keep = counts > 0
+            counts, index = counts[keep], index[keep]
+    name = 'count'
+    if normalize:
+        with np.errstate(invalid='ignore'):
+            counts = counts / counts.sum()
+        name = 'proportion'
+    out = pd.Series(counts, index=index, name=name)
+    if sort:
+        order = np.argsort(counts if ascending else -counts, kind='stable')
+        out = out.iloc[order]
+    return out
+
+
+#%% describe
+
+
+def describe(series):
+    """`describe()` of a categorical (or other non-numeric) column: count, unique, top, freq"""
+    codes, levels = _codes(series)
+    counts = _bincount(codes, len(levels))
+    n = int(counts.sum())
+    if n:
+        top = np.argmax(counts)  # first of the most frequent, in category order
+        values = [n, int(np.count_nonzero(counts)), levels[top], int(counts[top])]
+    else:
+        values = [0, 0, np.nan, np.nan]
+    return pd.Series(values, index=pd.Index(['count', 'unique', 'top', 'freq']),
+                     name=series.name, dtype=object)
+
+
+#%% Contingency tables
+
+
+def crosstab(df, rows, columns, normalize=False):
+    """
+    Contingency table of `df` by the categories of `rows` and `columns`.
+
+    INPUTS:
+    df        : a DataFrame
+    rows      : a column name or list of names for the rows of the table
+    columns   : a column name or list of names for the columns of the table
+    normalize : proportions of the total instead of counts
+
+    OUTPUT:
+    A DataFrame with every combination of categories, including those
+    with no rows (`pd.crosstab` drops them). Rows with a missing value in
+    any of the columns are not counted.
+    """
+    rows = rows if isinstance(rows, list) else [rows]
+    columns = columns if isinstance(columns, list) else [columns]
+    codes, levels, sizes = _combined(df, rows + columns)
+    counts = _bincount(codes, int(np.prod(sizes)))
+    nrows = int(np.prod(sizes[:len(rows)]))
+    table = counts.reshape(nrows, -1)
+    if normalize:
+        with np.errstate(invalid='ignore'):
+            table = table / table.sum()
+
+    def axis(names, lev):
+        if len(names) > 1:
+            return pd.MultiIndex.from_product(lev, names=names)
+        return pd.Index(lev[0], name=names[0])
+
+    return pd.DataFrame(table, index=axis(rows, levels[:len(rows)]),
+                        columns=axis(columns, levels[len(rows):]))
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Re-run a py:percent script, skipping the cells that haven't changed.
+
+Every code cell gets a key, a hash of
+
++ its source
++ for each name it reads, the key of the cell that last bound or changed
+  it (so a change anywhere upstream changes the keys downstream)
++ the size and modification time of files it names (e.g. 'data/survey_site.csv')
+  and of local modules it imports
+
+After a cell runs, the names it bound or changed (its delta) and what it
+printed are pickled under its key.
+On the next run, a cell whose key is found is not run: its delta is put
+back into the namespace and its output replayed. So after editing the
+split-apply-combine section of python_pandas.py, only that section (and
+the cells after it that use what it makes) runs again:
+
+    python cellcache.py python_pandas.py
+
+The store is a directory of pickles (default: .cellcache next to the
+script), kept under a size cap by dropping the least recently used.
+
+The changes a cell makes are found from its code (see Cell.changes): a
+name it binds, assigns items or attributes of, or calls methods of
+(`lst.append(1)`, `df.drop(..., inplace=True)`) is in its delta. A
+cell whose delta can't be pickled (e.g. it defines a function) always
+runs. Values are pickled per cell, so objects shared
+between cells are copies after a restore.
+"""
+
+#%% preamble
+
+import argparse
+import ast
+import builtins
+import hashlib
+import importlib
+import io
+import os
+import pickle
+import sys
+import textwrap
+import time
+import traceback
+import types
+from contextlib import redirect_stdout
+
+import pandas as pd
+
+from cells import code_cells, modules
+
+#%% Store
+
+
+class Store:
+    """
+    Pickles on disk by key, least recently used dropped first.
+
+    directory : where the pickles go
+    max_bytes : size cap of the directory
+    """
+
+    def __init__(self, directory='.cellcache', max_bytes=2 ** 30):
+        self.directory = os.path.abspath(directory)
+        self.max_bytes = max_bytes
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.pkl')
+
+    def __contains__(self, key):
+        return os.path.exists(self._path(key))
+
+    def get(self, key):
+        """The object stored under key (KeyError if there is none)"""
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                obj = pickle.load(f)
+        except FileNotFoundError:
+            raise KeyError(key) from None
+        os.utime(path)  # the modification time orders the entries for eviction
+        return obj
+
+    def put(self, key, obj):
+        """Store obj under key; False if it can't be pickled"""
+        try:
+            data = pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            return False
+        if len(data) > self.max_bytes:
+            return False
+        path = self._path(key)
+        with open(path + '.tmp', 'wb') as f:
+            f.write(data)
+        os.replace(path + '.tmp', path)
+        self.evict()
+        return True
+
+    def _entries(self):
+        out = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.pkl'):
+                st = os.stat(os.path.join(self.directory, name))
+                out.append((st.st_mtime_ns, st.st_size, name))
+        return sorted(out)
+
+    def size(self):
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self):
+        """Drop the least recently used entries until the store is under its cap"""
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in entries:
+            if total <= self.max_bytes:
+                break
+            os.remove(os.path.join(self.directory, name))
+            total -= size
+
+    def clear(self):
+        for _, _, name in self._entries():
+            os.remove(os.path.join(self.directory, name))
+
+
+#%% Keys and deltas
+
+
+class _Module:
+    """A module in a delta, stored by name and imported again on restore"""
+
+    def __init__(self, name):
+        self.name = name
+
+
+def _files(cell):
+    """(path, size, mtime) of the files a cell names and the local modules it imports"""
+    tree = ast.parse(textwrap.dedent(cell.source))
+    paths = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Constant) and isinstance(node.value, str) and \
+                0 < len(node.value) < 256 and '\n' not in node.value:
+            paths.add(node.value)
+        elif isinstance(node, ast.Import):
+            paths.update(a.name.split('.')[0] + '.py' for a in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            paths.add(node.module.split('.')[0] + '.py')
+    out = []
+    for p in sorted(paths):
+        try:
+            st = os.stat(p)
+        except (OSError, ValueError):
+            continue
+        out.append((p, st.st_size, st.st_mtime_ns))
+    return out
+
+
+def _key(cell, versions):
+    loads, _ = cell.names()
+    inputs = sorted((n, versions[n]) for n in loads if n in versions)
+    text = repr((pd.__version__, sys.version_info[:2], textwrap.dedent(cell.source), inputs,
+                 _files(cell)))
+    return hashlib.sha256(text.encode()).hexdigest()[:32]
+
+
+#%% Running
+
+
+def run(path, cache=None, max_bytes=2 ** 30, stop=True, verbose=True):
+    """
+    Run a script's code cells, taking unchanged cells from the cache.
+
+    INPUTS:
+    path      : the py:percent script (run from its own directory)
+    cache     : directory of the store (default: .cellcache next to the script)
+    max_bytes : size cap of the store
+    stop      : re-raise the error of a failing cell; otherwise carry on
+                (a failing cell is never cached)
+    verbose   : print a line per cell: 'cached', 'ran', 'ran (not cached)'
+                or 'error'
+
+    OUTPUT:
+    The namespace of the script, and a DataFrame with a row per cell
+    """
+    path = os.path.abspath(path)
+    directory = os.path.dirname(path)
+    store = Store(cache or os.path.join(directory, '.cellcache'), max_bytes)
+    namespace = {'__name__': '__main__', '__file__': path, '__builtins__': builtins}
+    versions, rows = {}, []
+    old = os.getcwd()
+    os.chdir(directory)
+    sys.path.insert(0, directory)
+    try:
+        cells = code_cells(path)
+        imported = modules(cells)
+        for cell in cells:
+            key = _key(cell, versions)
+            changed = cell.changes(imported)
+            start = time.perf_counter()
+            try:
+                entry = store.get(key)
+            except KeyError:
+                entry = None
+            except Exception:  # unreadable, e.g. written by another pandas
+                entry = None
+            if entry is not None:
+                namespace.update({n: importlib.import_module(v.name) if isinstance(v, _Module)
+                                  else v for n, v in entry['delta'].items()})
+                for name in entry['deleted']:
+                    namespace.pop(name, None)
+                sys.stdout.write(entry['stdout'])
+                status = 'cached'
+            else:
+                out, failed = io.StringIO(), False
+                try:
+                    with redirect_stdout(out):
+                        cell.execute(namespace, path)
+                except Exception:
+                    if stop:
+                        sys.stdout.write(out.getvalue())
+                        raise
+                    failed = True
+                sys.stdout.write(out.getvalue())
+                if failed:
+                    traceback.print_exc()
+                    status = 'error'
+                else:
+                    delta = {n: _Module(v.__name__) if isinstance(v, types.ModuleType) else v
+                             for n in changed if n in namespace for v in [namespace[n]]}
+                    entry = {'delta': delta, 'deleted': [n for n in changed if n not in namespace],
+                             'stdout': out.getvalue()}
+                    status = 'ran' if store.put(key, entry) else 'ran (not cached)'
+            for name in changed:
+                versions[name] = key
+            rows.append({'cell': cell.index, 'line': cell.lineno, 'status': status,
+                         'wall': time.perf_counter() - start, 'key': key})
+            if verbose:
+                print(f"[{cell.index:>3}] line {cell.lineno:<5} {status:<17} "
+                      f"{rows[-1]['wall']:8.3f} s", file=sys.stderr)
+    finally:
+        sys.path.remove(directory)
+        os.chdir(old)
+    return namespace, pd.DataFrame(rows)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Re-run a py:percent script incrementally')
+    parser.add_argument('script')
+    parser.add_argument('--cache', help='cache directory (default: .cellcache by the script)')
+    parser.add_argument('--max-mb', type=float, default=1024, help='size cap of the cache')
+    parser.add_argument('--clear', action='store_true', help='empty the cache first')
+    parser.add_argument('--keep-going', action='store_true', help="don't stop at errors")
+    args = parser.parse_args()
+    if args.clear:
+        Store(args.cache or os.path.join(os.path.dirname(os.path.abspath(args.script)),
+                                         '.cellcache')).clear()
+    run(args.script, args.cache, int(args.max_mb * 2 ** 20), stop=not args.keep_going)
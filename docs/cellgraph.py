@@ -0,0 +1,445 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Run the independent parts of a py:percent script at the same time.
+
+Most cells of python_pandas.py only need what a few cells before them
+made: the Series demo, the categorical demo, the survey merges, the tidy
+reshapes and the gapminder groupby don't use each other's variables. From
+the names each code cell reads and changes (Cell.names, Cell.changes)
+`build` makes a graph with an edge from the cell that last changed a name
+to each cell that reads it, and between cells that name the same file
+when one of them writes it (`mtcars.to_excel('data/mtcars.xlsx')`).
+
+`run` executes the graph on a process pool. Chains of cells with nothing
+branching off are run together as one task; a task is sent to a worker
+as soon as the tasks it depends on are done, with just the variables it
+reads, and sends back the variables later cells read. Each version of a
+variable is kept by the cell that made it, so a branch that rebinds `df`
+doesn't disturb another that still reads the earlier `df`. The output of
+the cells is printed in script order:
+
+    python cellgraph.py python_pandas.py --workers 4
+    python cellgraph.py python_pandas.py --plan
+    python cellgraph.py python_pandas.py --dot graph.dot
+
+Tasks whose variables can't be pickled (e.g. functions defined in the
+script) run in the main process, on copies of the variables they read.
+As with Cell.changes, a variable changed in a way the code doesn't show
+(through another name, say) is not tracked.
+"""
+
+#%% preamble
+
+import argparse
+import ast
+import builtins
+import copy
+import importlib
+import io
+import os
+import pickle
+import sys
+import textwrap
+import time
+import traceback
+import types
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from contextlib import redirect_stdout
+
+import pandas as pd
+
+from cells import code_cells, modules
+
+#%% Graph
+
+_WRITERS = ('to_', 'save', 'write', 'dump')
+
+
+def _paths(cell):
+    """
+    File names a cell mentions, as (path, writes): a string with a file
+    extension, written if it is an argument of a to_*/save*/write*/dump*
+    call or of open() in a write mode
+    """
+    out = {}
+    for node in ast.walk(ast.parse(textwrap.dedent(cell.source))):
+        if not isinstance(node, ast.Call):
+            continue
+        func = node.func.attr if isinstance(node.func, ast.Attribute) else \
+            node.func.id if isinstance(node.func, ast.Name) else ''
+        args = list(node.args) + [k.value for k in node.keywords]
+        strings = [a.value for a in args if isinstance(a, ast.Constant)
+                   and isinstance(a.value, str)]
+        writes = func.startswith(_WRITERS) or func == 'open' and any(
+            set(s) & set('wax') for s in strings[1:2])
+        for s in strings:
+            if os.path.splitext(s)[1] and ' ' not in s and '\n' not in s:
+                out[s] = out.get(s, False) or writes
+    return out.items()
+
+
+class Graph:
+    """
+    Data flow between the code cells of a script.
+
+    cells  : the code cells, by index
+    reads  : cell index -> {name: index of the cell its value comes from}
+    writes : cell index -> names the cell may change
+    after  : cell index -> cells it has to run after
+    """
+
+    def __init__(self, cells):
+        self.cells = {c.index: c for c in cells}
+        self.reads, self.writes, self.after = {}, {}, {}
+        writer, file_writer, file_readers = {}, {}, {}
+        imported = modules(cells)
+        for cell in cells:
+            i = cell.index
+            loads = cell.names()[0]
+            self.reads[i] = {n: writer[n] for n in loads if n in writer}
+            self.writes[i] = cell.changes(imported)
+            after = set(self.reads[i].values())
+            for path, writes in _paths(cell):
+                if path in file_writer:
+                    after.add(file_writer[path])
+                if writes:
+                    after.update(file_readers.pop(path, []))
+                    file_writer[path] = i
+                else:
+                    file_readers.setdefault(path, []).append(i)
+            after.discard(i)
+            self.after[i] = after
+            for n in self.writes[i]:
+                writer[n] = i
+        self.final = writer  # name -> cell whose version of it is the script's
+
+    def before(self):
+        """cell index -> cells that have to run after it"""
+        out = {i: set() for i in self.cells}
+        for i, after in self.after.items():
+            for j in after:
+                out[j].add(i)
+        return out
+
+    def tasks(self):
+        """
+        The cells grouped into chains: a cell joins the chain of the cell
+        before it when that is the only cell it follows and it is the only
+        cell following that one. A list of lists of cell indices.
+        """
+        before = self.before()
+        chains, chain_of = [], {}
+        for i in self.cells:
+            after = self.after[i]
+            if len(after) == 1:
+                (j,) = after
+                if len(before[j]) == 1 and chains[chain_of[j]][-1] == j:
+                    chains[chain_of[j]].append(i)
+                    chain_of[i] = chain_of[j]
+                    continue
+            chain_of[i] = len(chains)
+            chains.append([i])
+        return chains
+
+    def levels(self):
+        """Cells by how many cells have to run before them (0: can start at once)"""
+        depth = {}
+        for i in self.cells:
+            depth[i] = 1 + max((depth[j] for j in self.after[i]), default=-1)
+        out = {}
+        for i, d in depth.items():
+            out.setdefault(d, []).append(i)
+        return [out[d] for d in sorted(out)]
+
+    def dot(self):
+        """The graph in Graphviz format, edges labelled with the names passed"""
+        lines = ['digraph cells {', '  node [shape=box, fontname="monospace"];']
+        for i, cell in self.cells.items():
+            label = f'{cell.lineno}: {_label(cell)}'.replace('\\', '\\\\').replace('"', '\\"')
+            lines.append(f'  c{i} [label="{label}"];')
+        for i, after in self.after.items():
+            for j in sorted(after):
+                names = sorted(n for n, w in self.reads[i].items() if w == j)
+                lines.append(f'  c{j} -> c{i} [label="{", ".join(names)}"];')
+        lines.append('}')
+        return '\n'.join(lines) + '\n'
+
+
+def build(path=None, text=None):
+    """The Graph of a script's code cells"""
+    return Graph(code_cells(path, text))
+
+
+def _label(cell):
+    lines = [line.strip() for line in cell.source.splitlines() if line.strip()]
+    first = next((line for line in lines if not line.startswith('#')
+                  and line.strip('"\'')), lines[0])
+    return cell.title or first[:50]
+
+
+#%% Executing tasks
+
+
+class _Module:
+    """A module passed between processes by name"""
+
+    def __init__(self, name):
+        self.name = name
+
+
+def _pack(values):
+    return pickle.dumps({k: _Module(v.__name__) if isinstance(v, types.ModuleType) else v
+                         for k, v in values.items()}, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _unpack(data):
+    return {k: importlib.import_module(v.name) if isinstance(v, _Module) else v
+            for k, v in pickle.loads(data).items()}
+
+
+def _copy(values):
+    """
+    Copies of the versions a task run in the main process reads, as a worker
+    gets them, so that changing them in place (`df['b'] = ...`) doesn't
+    change what other tasks read. Modules and what can't be copied are shared.
+    """
+    memo, out = {}, {}
+    for name, value in values.items():
+        try:
+            out[name] = value if isinstance(value, types.ModuleType) else \
+                copy.deepcopy(value, memo)
+        except Exception:
+            out[name] = value
+    return out
+
+
+def _execute(cells, inputs, outputs, path, pack):
+    """
+    Run a chain of cells in a fresh namespace holding `inputs`
+    ({name: value}) and return their output, times and the `outputs`
+    ({(name, cell): name}) the other tasks need, pickled if `pack`.
+    """
+    namespace = {'__name__': '__main__', '__file__': path, '__builtins__': builtins, **inputs}
+    report = {'stdout': {}, 'wall': {}, 'error': None, 'values': None, 'pid': os.getpid()}
+    for cell in cells:
+        out = io.StringIO()
+        start = time.perf_counter()
+        try:
+            with redirect_stdout(out):
+                cell.execute(namespace, path)
+        except Exception as e:
+            try:
+                pickle.dumps(e)
+            except Exception:
+                e = RuntimeError(f'{type(e).__name__}: {e}')
+            report['error'] = (cell.index, e, traceback.format_exc())
+        report['wall'][cell.index] = time.perf_counter() - start
+        report['stdout'][cell.index] = out.getvalue()
+        if report['error']:
+            return report
+    values = {key: namespace[name] for key, name in outputs.items() if name in namespace}
+    if pack:
+        try:
+            values = _pack(values)
+        except Exception:
+            values = None  # the caller runs the task itself
+    report['values'] = values
+    return report
+
+
+def _init(directory):
+    """Worker initializer: run from the script's directory, numpy and pandas imported"""
+    os.environ.setdefault('MPLBACKEND', 'Agg')
+    os.chdir(directory)
+    sys.path.insert(0, directory)
+    import numpy  # noqa: F401
+    import pandas  # noqa: F401
+
+
+def _remote(cells, inputs, outputs, path):
+    return _execute(cells, _unpack(inputs), outputs, path, pack=True)
+
+
+#%% Scheduling
+
+
+def run(path, workers=None, stop=True, verbose=True):
+    """
+    Run a script's code cells on a process pool, independent chains of
+    cells at the same time.
+
+    INPUTS:
+    path    : the py:percent script (run from its own directory)
+    workers : worker processes (default: one per CPU)
+    stop    : don't start more cells after one fails, and re-raise its error
+    verbose : print a line per task as it finishes (to stderr)
+
+    OUTPUT:
+    The final namespace of the script, and a DataFrame with a row per cell
+    ('status' is 'ok', 'error' or 'skipped', after a failed cell it needed)
+    """
+    path = os.path.abspath(path)
+    directory = os.path.dirname(path)
+    graph = build(path)
+    tasks = graph.tasks()
+    task_of = {i: t for t, chain in enumerate(tasks) for i in chain}
+    needs = [set(task_of[j] for i in chain for j in graph.after[i]) - {t}
+             for t, chain in enumerate(tasks)]
+
+    # the versions of variables each task passes on: read by another task,
+    # or the script's final value
+    outputs = [{} for _ in tasks]
+    for i, reads in graph.reads.items():
+        for name, j in reads.items():
+            if task_of[j] != task_of[i]:
+                outputs[task_of[j]][(name, j)] = name
+    for name, j in graph.final.items():
+        outputs[task_of[j]][(name, j)] = name
+    # tasks still to read each version, so it can be dropped after the last
+    reading = [{(name, j) for i in chain for name, j in graph.reads[i].items() if task_of[j] != t}
+               for t, chain in enumerate(tasks)]
+    uses = {}
+    for keys in reading:
+        for key in keys:
+            uses[key] = uses.get(key, 0) + 1
+
+    values, rows, stdout = {}, {}, {}
+    state = ['waiting'] * len(tasks)
+    failure, printed = None, 0
+    order = sorted(graph.cells)
+    start = time.perf_counter()
+
+    def inputs(t):
+        return {name: values[(name, j)] for name, j in reading[t] if (name, j) in values}
+
+    def release(t):
+        for key in reading[t]:
+            uses[key] -= 1
+            if not uses[key] and graph.final.get(key[0]) != key[1]:
+                values.pop(key, None)
+
+    def finish(t, report, local=False):
+        nonlocal failure
+        release(t)
+        stdout.update(report['stdout'])
+        for i in tasks[t]:
+            status = 'ok' if i in report['wall'] else 'skipped'
+            if report['error'] and report['error'][0] == i:
+                status = 'error'
+            rows[i] = {'cell': i, 'line': graph.cells[i].lineno, 'task': t, 'status': status,
+                       'wall': report['wall'].get(i), 'pid': report['pid']}
+        if report['error']:
+            index, error, text = report['error']
+            state[t] = 'failed'
+            print(f'cell {index} (line {graph.cells[index].lineno}) failed:\n{text}',
+                  file=sys.stderr)
+            failure = failure or error
+        else:
+            state[t] = 'done'
+            values.update(report['values'])
+        if verbose:
+            first = graph.cells[tasks[t][0]]
+            print(f"task {t:>3} cells {tasks[t][0]}-{tasks[t][-1]} (line {first.lineno}) "
+                  f"{state[t]} in {sum(report['wall'].values()):.3f} s"
+                  f"{' (main process)' if local else ''}", file=sys.stderr)
+
+    def flush():
+        nonlocal printed
+        while printed < len(order) and order[printed] in rows:
+            sys.stdout.write(stdout.get(order[printed], ''))
+            printed += 1
+
+    def skip(t):
+        state[t] = 'skipped'
+        release(t)
+        for i in tasks[t]:
+            rows[i] = {'cell': i, 'line': graph.cells[i].lineno, 'task': t, 'status': 'skipped',
+                       'wall': None, 'pid': None}
+
+    old = os.getcwd()
+    os.chdir(directory)
+    sys.path.insert(0, directory)
+    try:
+        with ProcessPoolExecutor(workers, initializer=_init, initargs=(directory,)) as pool:
+            running = {}
+            while True:
+                for t in range(len(tasks)):
+                    if state[t] != 'waiting':
+                        continue
+                    if any(state[d] in ('failed', 'skipped') for d in needs[t]) or \
+                            (failure is not None and stop):
+                        skip(t)
+                    elif all(state[d] == 'done' for d in needs[t]):
+                        cells = [graph.cells[i] for i in tasks[t]]
+                        try:
+                            data = _pack(inputs(t))
+                        except Exception:  # e.g. a function defined in the script
+                            finish(t, _execute(cells, _copy(inputs(t)), outputs[t], path, False),
+                                   True)
+                            continue
+                        state[t] = 'running'
+                        running[pool.submit(_remote, cells, data, outputs[t], path)] = t
+                flush()
+                if not running:
+                    if all(s != 'waiting' for s in state):
+                        break
+                    continue  # tasks became ready through a task run here
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    t = running.pop(future)
+                    report = future.result()
+                    if report['values'] is None and not report['error']:
+                        # what it made can't be pickled: run it here instead
+                        cells = [graph.cells[i] for i in tasks[t]]
+                        finish(t, _execute(cells, _copy(inputs(t)), outputs[t], path, False),
+                               True)
+                    else:
+                        report['values'] = _unpack(report['values']) \
+                            if report['values'] is not None else {}
+                        finish(t, report)
+        flush()
+    finally:
+        sys.path.remove(directory)
+        os.chdir(old)
+    if verbose:
+        print(f'{len(order)} cells in {len(tasks)} tasks, {time.perf_counter() - start:.2f} s',
+              file=sys.stderr)
+    namespace = {'__name__': '__main__', '__file__': path, '__builtins__': builtins}
+    namespace.update({name: values[(name, j)] for name, j in graph.final.items()
+                      if (name, j) in values})
+    if failure is not None and stop:
+        raise failure
+    return namespace, pd.DataFrame([rows[i] for i in order])
+
+
+def _plan(graph):
+    tasks = graph.tasks()
+    task_of = {i: t for t, chain in enumerate(tasks) for i in chain}
+    for level, cells in enumerate(graph.levels()):
+        print(f'level {level}:')
+        for i in cells:
+            cell = graph.cells[i]
+            after = ', '.join(str(j) for j in sorted(graph.after[i])) or '-'
+            print(f'  cell {i:>3} line {cell.lineno:<5} task {task_of[i]:<3} after {after:<12} '
+                  f'{_label(cell)}')
+    print(f'{len(graph.cells)} cells, {len(tasks)} tasks, {len(graph.levels())} levels')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run the independent cells of a script in parallel')
+    parser.add_argument('script')
+    parser.add_argument('--workers', type=int, help='worker processes (default: CPUs)')
+    parser.add_argument('--plan', action='store_true', help="print the schedule, don't run")
+    parser.add_argument('--dot', help='write the graph in Graphviz format to this file')
+    parser.add_argument('--keep-going', action='store_true', help="don't stop at errors")
+    args = parser.parse_args()
+    if args.plan or args.dot:
+        graph = build(args.script)
+        if args.dot:
+            with open(args.dot, 'w') as f:
+                f.write(graph.dot())
+        if args.plan:
+            _plan(graph)
+    else:
+        run(args.script, args.workers, stop=not args.keep_going)
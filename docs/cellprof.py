@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Find the slow cell (or pandas call) of a py:percent script.
+
+`run` executes the code cells of a script one by one, as a notebook would,
+and records for each
+
++ wall time and CPU time
++ memory: the peak resident memory during the cell above what was in use
+  before it (see rss.py)
++ rows in: rows of the DataFrames and Series the cell reads
++ rows out: rows of the DataFrames and Series it creates, including the
+  value of a final expression
+
+With `pandas = True` the common DataFrame, Series and GroupBy methods and
+pandas functions (read_csv, merge, concat, ...) are timed as well, each
+with the rows of the object it was called on and of its result; calls
+made inside other pandas calls are not counted separately.
+
+The events can be written as a Chrome trace (open it at chrome://tracing
+or https://ui.perfetto.dev) or as JSON lines, and a summary table sorted
+by time is printed at the end:
+
+    python cellprof.py pd_sac.py --pandas --trace sac.json
+"""
+
+#%% preamble
+
+import argparse
+import builtins
+import inspect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+
+import pandas as pd
+from pandas.core.groupby import DataFrameGroupBy, SeriesGroupBy
+
+import rss
+from cells import code_cells
+
+#%% Events
+
+
+class Tracer:
+    """Collects timed events and writes them out"""
+
+    def __init__(self):
+        self.events = []
+        self.origin = time.perf_counter()
+        self._local = threading.local()
+
+    def add(self, name, category, start, wall, cpu, memory, rows_in, rows_out, **args):
+        self.events.append({'name': name, 'cat': category, 'start': start - self.origin,
+                            'wall': wall, 'cpu': cpu, 'memory_mb': memory / 2 ** 20,
+                            'rows_in': rows_in, 'rows_out': rows_out,
+                            'thread': threading.get_ident(), **args})
+
+    def chrome(self, path):
+        """Write a Chrome trace (JSON object format)"""
+        pid = os.getpid()
+        trace = [{'name': e['name'], 'cat': e['cat'], 'ph': 'X', 'pid': pid, 'tid': e['thread'],
+                  'ts': e['start'] * 1e6, 'dur': e['wall'] * 1e6,
+                  'args': {k: v for k, v in e.items()
+                           if k not in ('name', 'cat', 'start', 'wall', 'thread')}}
+                 for e in self.events]
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': trace, 'displayTimeUnit': 'ms'}, f)
+
+    def jsonl(self, path):
+        """Write one JSON object per event"""
+        with open(path, 'w') as f:
+            for e in self.events:
+                f.write(json.dumps(e, default=str) + '\n')
+
+    def summary(self, category='cell'):
+        """
+        Events of one category sorted by wall time. pandas calls are
+        totalled by method, with the number of calls.
+        """
+        df = pd.DataFrame([e for e in self.events if e['cat'] == category])
+        if df.empty:
+            return df
+        if category == 'pandas':
+            df = df.groupby('name').agg(calls=('wall', 'size'), wall=('wall', 'sum'),
+                                        cpu=('cpu', 'sum'), memory_mb=('memory_mb', 'max'),
+                                        rows_in=('rows_in', 'sum'), rows_out=('rows_out', 'sum'))
+            return df.sort_values('wall', ascending=False)
+        columns = ['cell', 'line', 'name', 'wall', 'cpu', 'memory_mb', 'rows_in', 'rows_out',
+                   'error']
+        return df[[c for c in columns if c in df]].sort_values('wall', ascending=False) \
+            .reset_index(drop=True)
+
+
+def _rows(obj):
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        return len(obj)
+    if isinstance(obj, (DataFrameGroupBy, SeriesGroupBy)):
+        return len(obj.obj)
+    return 0
+
+
+#%% pandas hooks
+
+_METHODS = {
+    pd.DataFrame: ['merge', 'join', 'groupby', 'query', 'melt', 'pivot_table', 'pivot',
+                   'sort_values', 'drop_duplicates', 'dropna', 'fillna', 'apply', 'agg',
+                   'describe', 'value_counts', 'astype', 'reset_index', 'set_index', 'to_csv',
+                   'to_excel'],
+    pd.Series: ['groupby', 'apply', 'map', 'value_counts', 'unique', 'nunique', 'describe',
+                'astype', 'sort_values', 'fillna'],
+    DataFrameGroupBy: ['agg', 'aggregate', 'transform', 'filter', 'apply', 'mean', 'sum',
+                       'describe', 'nth', 'size', 'count', 'median'],
+    SeriesGroupBy: ['agg', 'aggregate', 'transform', 'filter', 'apply', 'mean', 'sum',
+                    'describe', 'nth', 'size', 'count', 'median'],
+}
+_FUNCTIONS = ['read_csv', 'read_table', 'read_excel', 'concat', 'merge', 'melt', 'pivot_table',
+              'crosstab', 'to_datetime']
+
+
+def _timed(tracer, label, func, method):
+    @wraps(func)
+    def call(*args, **kwargs):
+        local = tracer._local
+        if getattr(local, 'depth', 0):
+            return func(*args, **kwargs)  # inside another pandas call
+        local.depth = 1
+        rows_in = _rows(args[0]) if method and args else \
+            sum(_rows(a) for a in (args[0] if args and isinstance(args[0], (list, tuple))
+                                   else args))
+        before = rss.current()
+        start, cpu = time.perf_counter(), time.process_time()
+        try:
+            result = func(*args, **kwargs)
+        finally:
+            local.depth = 0
+        wall, cpu = time.perf_counter() - start, time.process_time() - cpu
+        tracer.add(label, 'pandas', start, wall, cpu, max(0, rss.current() - before),
+                   rows_in, _rows(result))
+        return result
+    return call
+
+
+@contextmanager
+def pandas_hooks(tracer):
+    """Time the common pandas methods and functions while in this block"""
+    saved = []
+    for cls, names in _METHODS.items():
+        for name in names:
+            if callable(inspect.getattr_static(cls, name, None)):  # not properties such as nth
+                original = getattr(cls, name)
+                saved.append((cls, name, cls.__dict__.get(name)))
+                setattr(cls, name, _timed(tracer, f'{cls.__name__}.{name}', original, True))
+    for name in _FUNCTIONS:
+        original = getattr(pd, name)
+        saved.append((pd, name, original))
+        setattr(pd, name, _timed(tracer, f'pd.{name}', original, False))
+    try:
+        yield tracer
+    finally:
+        for owner, name, original in reversed(saved):
+            if original is None:
+                delattr(owner, name)  # the method was inherited
+            else:
+                setattr(owner, name, original)
+
+
+#%% Running cells
+
+
+@contextmanager
+def _cwd(directory):
+    old = os.getcwd()
+    os.chdir(directory or '.')
+    try:
+        yield
+    finally:
+        os.chdir(old)
+
+
+def _frames(namespace, names):
+    """Distinct DataFrames/Series bound to some names"""
+    return {id(v): v for n in names for v in [namespace.get(n)]
+            if isinstance(v, (pd.DataFrame, pd.Series))}
+
+
+def run(path, pandas=False, trace=None, jsonl=None, summary=True, stop=True):
+    """
+    Run a script's code cells, timing each.
+
+    INPUTS:
+    path    : the py:percent script (run from its own directory, so that
+              paths such as 'data/gapminder.tsv' work)
+    pandas  : also time pandas calls
+    trace   : write a Chrome trace to this file
+    jsonl   : write the events as JSON lines to this file
+    summary : print the summary tables at the end
+    stop    : stop at the first cell that raises an error (it is re-raised
+              after the trace is written); otherwise carry on
+
+    OUTPUT:
+    The Tracer, with the events and the script's namespace as `namespace`
+    """
+    path = os.path.abspath(path)
+    tracer = Tracer()
+    namespace = {'__name__': '__main__', '__file__': path, '__builtins__': builtins}
+    tracer.namespace = namespace
+    failure = None
+    hooks = pandas_hooks(tracer) if pandas else nullcontext()
+    with _cwd(os.path.dirname(path)), hooks:
+        for cell in code_cells(path):
+            loads, stores = cell.names()
+            before_in = _frames(namespace, loads)
+            before_out = {n: id(namespace.get(n)) for n in stores}
+            rss.reset_peak()
+            memory = rss.current()
+            start, cpu = time.perf_counter(), time.process_time()
+            error, value = None, None
+            try:
+                value = cell.execute(namespace, path)
+            except Exception as e:
+                error = f'{type(e).__name__}: {e}'
+                failure = failure or e
+            wall, cpu = time.perf_counter() - start, time.process_time() - cpu
+            memory = max(0, rss.peak() - memory)
+            new = _frames(namespace, [n for n in stores if id(namespace.get(n)) != before_out[n]])
+            if isinstance(value, (pd.DataFrame, pd.Series)):
+                new[id(value)] = value
+            lines = [line.strip() for line in cell.source.splitlines() if line.strip()]
+            first = next((line for line in lines if not line.startswith('#')
+                          and line.strip('"\'')), lines[0])
+            tracer.add(cell.title or first[:60], 'cell', start, wall, cpu, memory,
+                       sum(map(len, before_in.values())), sum(map(len, new.values())),
+                       cell=cell.index, line=cell.lineno, error=error)
+            if error and stop:
+                break
+    if trace:
+        tracer.chrome(trace)
+    if jsonl:
+        tracer.jsonl(jsonl)
+    if summary:
+        with pd.option_context('display.width', 200, 'display.max_colwidth', 60):
+            print(tracer.summary('cell').to_string(index=False))
+            if pandas:
+                print()
+                print(tracer.summary('pandas').to_string())
+    if failure is not None and stop:
+        raise failure
+    return tracer
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Time the cells of a py:percent script')
+    parser.add_argument('script')
+    parser.add_argument('--pandas', action='store_true', help='also time pandas calls')
+    parser.add_argument('--trace', help='write a Chrome trace to this file')
+    parser.add_argument('--jsonl', help='write the events as JSON lines to this file')
+    parser.add_argument('--keep-going', action='store_true', help="don't stop at errors")
+    args = parser.parse_args()
+    run(args.script, args.pandas, args.trace, args.jsonl, stop=not args.keep_going)
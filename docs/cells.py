@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cells of py:percent scripts.
+
+The scripts here are jupytext "percent" files: a cell starts at a line
+
+    # %%                                        (or #%%)
+    # %% Some title
+    # %% [markdown]
+    # %% [markdown] slideshow={"slide_type": "slide"}
+
+and runs to the next one. Markdown cells are comment lines. A YAML header
+between `# ---` lines holds the notebook metadata, and code before the
+first marker is a cell of its own.
+
+    for cell in parse('pd_sac.py'):
+        print(cell.index, cell.kind, cell.lineno, cell.title)
+"""
+
+#%% preamble
+
+import ast
+import json
+import re
+import textwrap
+from dataclasses import dataclass, field
+
+#%% Parsing
+
+_MARKER = re.compile(r'^#\s?%%(?!%)(.*)$')
+_OPTION = re.compile(r'(\w+)=(\{.*?\}(?=\s+\w+=|\s*$)|\[.*?\]|"[^"]*"|\S+)')
+
+
+@dataclass
+class Cell:
+    """
+    One cell of a script.
+
+    index    : position among the cells of the script
+    kind     : 'code' or 'markdown'
+    source   : the text of the cell, without the marker line (markdown
+               without the leading '# ')
+    lineno   : line number of the first line of `source` in the script
+    title    : text after the marker, if any
+    metadata : options after the marker, e.g. {'slideshow': {'slide_type': 'slide'}}
+    """
+    index: int
+    kind: str
+    source: str
+    lineno: int
+    title: str = ''
+    metadata: dict = field(default_factory=dict)
+
+    def compile(self, filename='<cell>'):
+        """
+        Code object of a code cell, with line numbers as in the script. A
+        cell that is indented as a whole is dedented first, as IPython does.
+        """
+        return compile('\n' * (self.lineno - 1) + textwrap.dedent(self.source), filename, 'exec')
+
+    def names(self):
+        """
+        Top-level names a code cell reads and names it binds, as two sets.
+        Names local to the functions, classes and comprehensions of the
+        cell are left out; the globals they read are in.
+        """
+        return _scope(ast.parse(textwrap.dedent(self.source)).body)
+
+    def changes(self, modules=()):
+        """
+        Top-level names a code cell may bind, delete or change in place: the
+        names it binds, names whose items or attributes it assigns
+        (`df['x'] = ...`) and names whose methods it calls (`lst.append(1)`,
+        `df.drop(..., inplace=True)`), other than `modules`, names bound to
+        modules (`pd.concat(...)`). Changes made any other way, e.g. by
+        passing a name to a function, are not seen.
+        """
+        tree = ast.parse(textwrap.dedent(self.source))
+        names = set(self.names()[1])
+
+        def base(node):
+            while isinstance(node, (ast.Subscript, ast.Attribute)):
+                node = node.value
+            return node.id if isinstance(node, ast.Name) else None
+
+        for node in _walk(tree.body):
+            if isinstance(node, (ast.Subscript, ast.Attribute)) and \
+                    isinstance(node.ctx, (ast.Store, ast.Del)):
+                names.add(base(node))
+            elif isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute):
+                name = base(node.func)
+                if name not in modules:
+                    names.add(name)
+        names.discard(None)
+        return names
+
+    def execute(self, namespace, filename='<cell>'):
+        """
+        Run a code cell in a namespace as a notebook would, returning the
+        value of a final expression statement (None if there isn't one).
+        """
+        tree = ast.parse(textwrap.dedent(self.source), filename)
+        ast.increment_lineno(tree, self.lineno - 1)
+        last = None
+        if tree.body and isinstance(tree.body[-1], ast.Expr):
+            last = ast.Expression(tree.body.pop().value)
+        exec(compile(tree, filename, 'exec'), namespace)
+        if last is not None:
+            return eval(compile(last, filename, 'eval'), namespace)
+        return None
+
+
+def _walk(nodes):
+    """Like ast.walk, but not into the bodies of functions, which run when called"""
+    todo = list(nodes)
+    while todo:
+        node = todo.pop()
+        yield node
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda)):
+            args = node.args
+            todo += args.defaults + [d for d in args.kw_defaults if d is not None]
+            if not isinstance(node, ast.Lambda):
+                todo += node.decorator_list
+        else:
+            todo += ast.iter_child_nodes(node)
+
+
+_COMPREHENSIONS = (ast.ListComp, ast.SetComp, ast.DictComp, ast.GeneratorExp)
+
+
+def _scope(nodes, outer=None):
+    """
+    Names read and names bound in a scope made of `nodes`, not counting
+    those of the scopes nested in it. `outer` collects the targets of
+    walrus assignments in a comprehension, which bind in the enclosing
+    scope.
+    """
+    loads, stores = set(), set()
+
+    def nested(body, bound=()):
+        inner_loads, inner_stores = _scope(body)
+        loads.update(inner_loads - inner_stores - set(bound))
+
+    def visit(node):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda)):
+            args = node.args
+            for child in (node.decorator_list if not isinstance(node, ast.Lambda) else []) + \
+                    args.defaults + [d for d in args.kw_defaults if d is not None]:
+                visit(child)
+            params = [a.arg for a in args.posonlyargs + args.args + args.kwonlyargs] + \
+                [a.arg for a in (args.vararg, args.kwarg) if a is not None]
+            if isinstance(node, ast.Lambda):
+                nested([node.body], params)
+            else:
+                stores.add(node.name)
+                nested(node.body, params)
+        elif isinstance(node, ast.ClassDef):
+            for child in node.decorator_list + node.bases + node.keywords:
+                visit(child)
+            stores.add(node.name)
+            nested(node.body)
+        elif isinstance(node, _COMPREHENSIONS):
+            first, *rest = node.generators
+            visit(first.iter)
+            parts = [node.key, node.value] if isinstance(node, ast.DictComp) else [node.elt]
+            for g in [first] + rest:
+                parts += [g.target] + g.ifs + ([g.iter] if g is not first else [])
+            walrus = set()
+            inner_loads, inner_stores = _scope(parts, walrus)
+            loads.update(inner_loads - inner_stores)
+            (outer if outer is not None else stores).update(walrus)
+        elif isinstance(node, ast.NamedExpr) and outer is not None:
+            outer.add(node.target.id)
+            visit(node.value)
+        elif isinstance(node, ast.Name):
+            (loads if isinstance(node.ctx, ast.Load) else stores).add(node.id)
+        elif isinstance(node, ast.alias):
+            stores.add((node.asname or node.name).split('.')[0])
+        elif isinstance(node, (ast.Global, ast.Nonlocal)):
+            declared.update(node.names)
+        else:
+            if isinstance(node, (ast.ExceptHandler, ast.MatchAs, ast.MatchStar)) and node.name:
+                stores.add(node.name)
+            elif isinstance(node, ast.MatchMapping) and node.rest:
+                stores.add(node.rest)
+            for child in ast.iter_child_nodes(node):
+                visit(child)
+
+    declared = set()
+    for node in nodes:
+        visit(node)
+    return loads, stores - declared
+
+
+def _options(text):
+    """Title, kind and metadata from the text after '# %%'"""
+    kind = 'code'
+    m = re.search(r'\[(\w+)\]', text)
+    if m:
+        kind = m.group(1)
+        text = text[:m.start()] + text[m.end():]
+    metadata = {}
+    for key, value in _OPTION.findall(text):
+        try:
+            metadata[key] = json.loads(value)
+        except ValueError:
+            metadata[key] = value
+    title = _OPTION.sub('', text).strip()
+    return title, kind, metadata
+
+
+def _uncomment(lines):
+    return [line[2:] if line.startswith('# ') else line[1:] if line.startswith('#') else line
+            for line in lines]
+
+
+def _strip(lines):
+    while lines and not lines[-1].strip():
+        lines = lines[:-1]
+    return lines
+
+
+def header(text):
+    """The YAML header of a script as a string ('' if none)"""
+    lines = text.splitlines()
+    if lines and lines[0].rstrip() == '# ---':
+        for i, line in enumerate(lines[1:], 1):
+            if line.rstrip() == '# ---':
+                return '\n'.join(_uncomment(lines[1:i]))
+    return ''
+
+
+def parse(path=None, text=None):
+    """
+    The cells of a script.
+
+    INPUTS:
+    path : the script (or give its text)
+    text : the script's text
+
+    OUTPUT:
+    A list of Cell, without empty cells
+    """
+    if text is None:
+        with open(path, encoding='utf-8') as f:
+            text = f.read()
+    lines = text.splitlines()
+    start = 0
+    if header(text):
+        start = next(i for i, line in enumerate(lines[1:], 1) if line.rstrip() == '# ---') + 1
+
+    cells = []
+
+    def add(kind, body, lineno, title='', metadata=None):
+        if kind != 'code':
+            body = _uncomment(body)
+        body = _strip(body)
+        while body and not body[0].strip():
+            body, lineno = body[1:], lineno + 1
+        if body:
+            cells.append(Cell(len(cells), kind, '\n'.join(body) + '\n', lineno, title,
+                              metadata or {}))
+
+    kind, title, metadata, first, body = 'code', '', {}, start + 1, []
+    for i in range(start, len(lines)):
+        m = _MARKER.match(lines[i])
+        if m:
+            add(kind, body, first, title, metadata)
+            title, kind, metadata = _options(m.group(1))
+            first, body = i + 2, []
+        else:
+            body.append(lines[i])
+    add(kind, body, first, title, metadata)
+    return cells
+
+
+def code_cells(path=None, text=None):
+    return [c for c in parse(path, text) if c.kind == 'code']
+
+
+def modules(cells):
+    """Names the code cells bind with `import` statements (`import pandas as pd`)"""
+    out = set()
+    for cell in cells:
+        for node in ast.walk(ast.parse(textwrap.dedent(cell.source))):
+            if isinstance(node, ast.Import):
+                out.update((a.asname or a.name).split('.')[0] for a in node.names)
+    return out
+
+
+#%% Notebooks
+
+_KERNEL = {'display_name': 'Python 3', 'language': 'python', 'name': 'python3'}
+
+
+def _lines(text):
+    """Notebook JSON stores text as a list of lines, each with its newline"""
+    return text.splitlines(keepends=True)
+
+
+def notebook(cells, outputs=None, metadata=None):
+    """
+    An nbformat 4 notebook (as a dict, ready for json.dump) from cells.
+
+    INPUTS:
+    cells    : a list of Cell
+    outputs  : dict of cell index -> list of output dicts, and optionally
+               'count' -> dict of cell index -> execution count
+    metadata : notebook metadata (default: a Python 3 kernelspec)
+    """
+    outputs = outputs or {}
+    counts = outputs.get('count', {})
+    out = []
+    for cell in cells:
+        source = _lines(cell.source.rstrip('\n'))
+        if cell.kind == 'code':
+            out.append({'cell_type': 'code', 'execution_count': counts.get(cell.index),
+                        'metadata': cell.metadata, 'outputs': outputs.get(cell.index, []),
+                        'source': source})
+        else:
+            out.append({'cell_type': cell.kind, 'metadata': cell.metadata, 'source': source})
+    return {'cells': out, 'metadata': metadata or {'kernelspec': dict(_KERNEL)},
+            'nbformat': 4, 'nbformat_minor': 4}
+
+
+def metadata(text, yaml_header=None):
+    """
+    Notebook metadata from a script's YAML header, or from `yaml_header`
+    if given (needs PyYAML; else a default)
+    """
+    try:
+        import yaml
+        meta = (yaml.safe_load(header(text) if yaml_header is None else yaml_header)
+                or {}).get('jupyter', {})
+    except ImportError:
+        meta = {}
+    meta.setdefault('kernelspec', dict(_KERNEL))
+    return meta
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Rule-table classification, a vectorized version of the if-elif-else loop in
+python_primer.py:
+
+    for u in x:
+      if u < 0:
+        y.append('Negative')
+      elif u % 2 == 1:
+        y.append('Odd')
+      else:
+        y.append('Even')
+
+becomes
+
+    classify(x, [(lambda u: u < 0, 'Negative'),
+                 (lambda u: u % 2 == 1, 'Odd')], default = 'Even')
+
+Run this file to compare the two on a million numbers.
+"""
+
+#%% preamble
+
+import time
+
+import numpy as np
+import pandas as pd
+
+#%% Classifier
+
+
+def _evaluate(condition, values):
+    """
+    Evaluate one condition over an array of values. Conditions written for
+    a single number (e.g. using `if` or `math` functions) fail or return a
+    scalar on an array, and are then applied element by element.
+    """
+    if not callable(condition):
+        return np.asarray(condition, dtype=bool)
+    try:
+        result = np.asarray(condition(values))
+    except (TypeError, ValueError):
+        result = None
+    if result is None or result.shape != values.shape:
+        result = np.fromiter((bool(condition(u)) for u in values),
+                             dtype=bool, count=len(values))
+    return result.astype(bool, copy=False)
+
+
+def classify(x, rules, default=None):
+    """
+    Label each element of `x` by the first rule whose condition it meets.
+
+    INPUTS:
+    x       : a list, numpy array or pandas Series
+    rules   : an ordered list of (condition, label) pairs. A condition is a
+              function of the values (e.g. `lambda u: u < 0`) or a boolean
+              array of the same length as `x`. Several rules may give
+              the same label
+    default : label for elements meeting no condition (the `else`
+              branch). If None these are left missing
+
+    OUTPUT:
+    A pandas Categorical with the labels in rule order (a categorical
+    Series with the same index if `x` is a Series)
+
+    Each condition is only evaluated on elements not yet labelled, and
+    evaluation stops as soon as every element has a label.
+    """
+    index = x.index if isinstance(x, pd.Series) else None
+    values = np.asarray(x)
+    labels = list(dict.fromkeys([label for _, label in rules] +
+                                ([] if default is None else [default])))
+    rule_codes = [labels.index(label) for _, label in rules]
+    codes = np.full(len(values), -1, dtype=np.int8 if len(labels) < 128 else np.int32)
+    remaining = None  # positions not yet labelled; None means all of them
+    for code, (condition, _) in zip(rule_codes, rules):
+        if remaining is None:
+            hit = _evaluate(condition, values)
+            codes[hit] = code
+            remaining = np.flatnonzero(~hit)
+            continue
+        if len(remaining) == 0:
+            break
+        if callable(condition):
+            hit = _evaluate(condition, values[remaining])
+        else:
+            hit = _evaluate(condition, values)[remaining]
+        codes[remaining[hit]] = code
+        remaining = remaining[~hit]
+    if remaining is None:
+        remaining = np.arange(len(values))
+    if default is not None and len(remaining):
+        codes[remaining] = labels.index(default)
+    result = pd.Categorical.from_codes(codes, categories=labels)
+    if index is not None:
+        return pd.Series(result, index=index, name=x.name)
+    return result
+
+
+#%% Benchmark
+
+
+def _loop(x):
+    y = []
+    for u in x:
+        if u < 0:
+            y.append('Negative')
+        elif u % 2 == 1:
+            y.append('Odd')
+        else:
+            y.append('Even')
+    return y
+
+
+def benchmark(n=1000000, seed=25):
+    rng = np.random.RandomState(seed)
+    x = rng.randint(-1000, 1000, n)
+    rules = [(lambda u: u < 0, 'Negative'), (lambda u: u % 2 == 1, 'Odd')]
+
+    start = time.perf_counter()
+    y_loop = _loop(x.tolist())
+    t_loop = time.perf_counter() - start
+
+    start = time.perf_counter()
+    y_rules = classify(x, rules, default='Even')
+    t_rules = time.perf_counter() - start
+
+    assert list(y_rules) == y_loop
+    print(f"for-loop: {t_loop * 1e3:.1f} ms, classify: {t_rules * 1e3:.1f} ms "
+          f"({t_loop / t_rules:.0f}x) on {n} numbers")
+
+
+if __name__ == '__main__':
+    benchmark()
@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Keep the .py, .md and .ipynb versions of the lessons in step, all in one
+process.
+
+The lessons are py:percent scripts paired with a markdown file and a
+notebook (`formats: ipynb,md,py:percent` in their header), as jupytext
+writes them. Running jupytext once per file and per format starts a new
+Python each time; here each file is read once into cells (cells.Cell) and
+every other format is written from the same cells:
+
++ py     : py:percent
++ md     : jupytext markdown, cell options kept as `<!-- #region ... -->`
+           and ```` ```python ... ```` options, as in python_primer_slides.md
++ ipynb  : a notebook without outputs (cells.notebook)
++ slides : a notebook for `jupyter nbconvert --to slides`, <name>.slides.ipynb.
+           Cells keep their own `slideshow` metadata; other markdown cells
+           starting with a # or ## heading begin a slide, and with a
+           deeper heading a subslide, as in python_primer_slides.py
+
+Any of .py, .md and .ipynb can be the file converted from, so a lesson
+edited as markdown (python_tools_ds.md) goes back to its script with
+
+    python convert.py python_tools_ds.md
+
+What carries over between the formats is the cells (their kind, source,
+title and options) and the header, not the exact text: empty cells,
+blank lines around cells and comment lines with only '#' at the start or
+end of a markdown cell are dropped, and a notebook keeps no
+`text_representation` in its header. So py -> md -> py may change a
+script the first time, after which the files written here stay as they
+are.
+
+A file is only written when its content changes, and one that was edited
+since this last wrote it (or that this never wrote) is left alone unless
+`force` is given. A manifest (.convert.json in each directory) keeps a
+hash of each file converted and of what was written from it, so
+unchanged files aren't parsed at all:
+
+    python convert.py *.py
+    python convert.py python_primer.py --formats md ipynb slides
+"""
+
+#%% preamble
+
+import argparse
+import hashlib
+import json
+import os
+import re
+
+import cells
+
+FORMATS = ('py', 'md', 'ipynb')
+_VERSION = 1  # part of the hashes, so that changes here rewrite everything
+_FENCE = re.compile(r'^```python\b\s*(.*)$')
+_REGION = re.compile(r'^<!-- #region\s*(.*?)\s*-->$')
+
+#%% Reading
+
+
+def _cell(cells_, kind, lines, lineno, options=''):
+    while lines and not lines[-1].strip():
+        lines = lines[:-1]
+    while lines and not lines[0].strip():
+        lines, lineno = lines[1:], lineno + 1
+    title, _, metadata = cells._options(options)
+    title = metadata.pop('title', title)
+    if lines:
+        cells_.append(cells.Cell(len(cells_), kind, '\n'.join(lines) + '\n', lineno, title,
+                                 metadata))
+
+
+def read_markdown(text):
+    """
+    Cells and YAML header of jupytext markdown: code in ```python fences,
+    markdown between them, split into cells at <!-- #region --> blocks and
+    at two blank lines in a row
+    """
+    lines = text.splitlines()
+    header, start = '', 0
+    if lines and lines[0].rstrip() == '---':
+        end = next((i for i, line in enumerate(lines[1:], 1) if line.rstrip() == '---'), None)
+        if end is not None:
+            header, start = '\n'.join(lines[1:end]), end + 1
+    out, body, first = [], [], start + 1
+    i = start
+    while i < len(lines):
+        line = lines[i]
+        fence, region = _FENCE.match(line), _REGION.match(line)
+        if fence or region:
+            _cell(out, 'markdown', body, first)
+            closing = '```' if fence else '<!-- #endregion -->'
+            j = next((k for k in range(i + 1, len(lines)) if lines[k].rstrip() == closing),
+                     len(lines))
+            _cell(out, 'code' if fence else 'markdown', lines[i + 1:j], i + 2,
+                  (fence or region).group(1))
+            body, first, i = [], j + 2, j + 1
+            continue
+        if not line.strip() and body and not body[-1].strip():
+            _cell(out, 'markdown', body, first)
+            body, first = [], i + 2
+        else:
+            body.append(line)
+        i += 1
+    _cell(out, 'markdown', body, first)
+    return out, header
+
+
+def read_notebook(text):
+    """Cells and YAML header (needs PyYAML, else none) of notebook JSON"""
+    nb = json.loads(text)
+    out = []
+    for cell in nb['cells']:
+        if cell['cell_type'] not in ('code', 'markdown'):
+            continue
+        source = ''.join(cell['source']) if isinstance(cell['source'], list) else cell['source']
+        metadata = dict(cell.get('metadata', {}))
+        title = metadata.pop('title', '')
+        out.append(cells.Cell(len(out), cell['cell_type'], source.rstrip('\n') + '\n', 1, title,
+                              metadata))
+    try:
+        import yaml
+        header = yaml.safe_dump({'jupyter': nb.get('metadata', {})}, sort_keys=True).rstrip()
+    except ImportError:
+        header = ''
+    return out, header
+
+
+def read(path, text=None):
+    """Cells and YAML header of a .py, .md or .ipynb file"""
+    if text is None:
+        with open(path, encoding='utf-8') as f:
+            text = f.read()
+    if path.endswith('.md'):
+        return read_markdown(text)
+    if path.endswith('.ipynb'):
+        return read_notebook(text)
+    return cells.parse(path, text=text), cells.header(text)
+
+
+#%% Writing
+
+
+def _options(metadata):
+    return ' '.join(f'{k}={json.dumps(v)}' for k, v in metadata.items())
+
+
+def _header(header, extension, name, version):
+    """A YAML header with its text_representation changed to another format"""
+    out = []
+    for line in header.splitlines():
+        m = re.match(r'^(\s*)(extension|format_name|format_version):', line)
+        if m:
+            value = {'extension': extension, 'format_name': name,
+                     'format_version': f"'{version}'"}[m.group(2)]
+            line = f'{m.group(1)}{m.group(2)}: {value}'
+        out.append(line)
+    return '\n'.join(out)
+
+
+def percent(parsed, header):
+    """Cells as a py:percent script"""
+    out = []
+    if header:
+        lines = _header(header, '.py', 'percent', '1.3').splitlines()
+        out.append('\n'.join(['# ---'] + [f'# {line}' if line else '#' for line in lines]
+                             + ['# ---']))
+    for cell in parsed:
+        marker = '# %%' + (f' {cell.title}' if cell.title else '') + \
+            ('' if cell.kind == 'code' else f' [{cell.kind}]') + \
+            (f' {_options(cell.metadata)}' if cell.metadata else '')
+        source = cell.source.rstrip('\n')
+        if cell.kind != 'code':
+            source = '\n'.join(f'# {line}' if line else '#' for line in source.split('\n'))
+        out.append(f'{marker}\n{source}')
+    return '\n\n'.join(out) + '\n'
+
+
+def markdown(parsed, header):
+    """Cells as jupytext markdown"""
+    out = []
+    if header:
+        out.append(f"---\n{_header(header, '.md', 'markdown', '1.2')}\n---")
+    previous = False
+    for cell in parsed:
+        source = cell.source.rstrip('\n')
+        metadata = dict(cell.metadata, **({'title': cell.title} if cell.title else {}))
+        options = f' {_options(metadata)}' if metadata else ''
+        # markdown without options (or blank lines that would split it) needs no region
+        plain = cell.kind != 'code' and not metadata and '\n\n\n' not in source
+        if cell.kind == 'code':
+            out.append(f'```python{options}\n{source}\n```')
+        elif not plain:
+            out.append(f'<!-- #region{options} -->\n{source}\n<!-- #endregion -->')
+        else:
+            out.append(f'\n{source}' if previous else source)  # two blank lines between cells
+        previous = plain
+    return '\n\n'.join(out) + '\n'
+
+
+def _notebook_metadata(header):
+    metadata = cells.metadata(None, header)
+    if 'jupytext' in metadata:  # as jupytext stores it in a paired notebook
+        metadata['jupytext'] = {k: v for k, v in metadata['jupytext'].items()
+                                if k != 'text_representation'}
+    return metadata
+
+
+def notebook(parsed, header):
+    """Cells as notebook JSON, without outputs"""
+    nb = cells.notebook(parsed, metadata=_notebook_metadata(header))
+    for cell, out in zip(parsed, nb['cells']):
+        if cell.title:
+            out['metadata'] = dict(out['metadata'], title=cell.title)
+    return json.dumps(nb, indent=1, ensure_ascii=False) + '\n'
+
+
+def _slide_type(cell):
+    heading = re.match(r'(#+)\s', cell.source)
+    if cell.kind != 'markdown' or not heading:
+        return None
+    return 'slide' if len(heading.group(1)) <= 2 else 'subslide'
+
+
+def slides(parsed, header):
+    """A notebook with slideshow metadata on the cells that start slides"""
+    nb = json.loads(notebook(parsed, header))
+    for cell, out in zip(parsed, nb['cells']):
+        kind = _slide_type(cell)
+        if 'slideshow' not in out['metadata'] and kind:
+            out['metadata']['slideshow'] = {'slide_type': kind}
+    return json.dumps(nb, indent=1, ensure_ascii=False) + '\n'
+
+
+_WRITERS = {'py': ('.py', percent), 'md': ('.md', markdown), 'ipynb': ('.ipynb', notebook),
+            'slides': ('.slides.ipynb', slides)}
+
+#%% Converting
+
+
+def _hash(data):
+    return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+
+def _read(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def _manifest(directory):
+    path = os.path.join(directory, '.convert.json')
+    try:
+        with open(path) as f:
+            return path, json.load(f)
+    except (FileNotFoundError, ValueError):
+        return path, {}
+
+
+def _split(path):
+    """Stem and format of a file"""
+    if not path.endswith('.slides.ipynb'):
+        for fmt in ('py', 'md', 'ipynb'):
+            extension = _WRITERS[fmt][0]
+            if path.endswith(extension):
+                return path[:-len(extension)], fmt
+    raise ValueError(f'not a .py, .md or .ipynb file: {path}')
+
+
+def _paired(header):
+    """Formats named in a header's `formats:` line (e.g. ipynb,md,py:percent)"""
+    m = re.search(r'^\s*formats:\s*(\S+)', header, re.M)
+    return [f.split(':')[0] for f in m.group(1).split(',')] if m else None
+
+
+def convert(paths, formats=None, force=False, verbose=True):
+    """
+    Write the other formats of lessons.
+
+    INPUTS:
+    paths   : files to convert from (.py, .md or .ipynb)
+    formats : any of 'py', 'md', 'ipynb', 'slides' (default: the formats
+              paired in the file's header, else 'py', 'md' and 'ipynb')
+    force   : parse every file, even if the manifest says it is unchanged,
+              and overwrite files edited since they were last written
+    verbose : print each file written, and each left alone
+
+    OUTPUT:
+    A dict of output path -> 'written', 'unchanged' (same content),
+    'skipped' (nothing changed since the last run) or 'edited' (changed
+    since it was last written, so not overwritten)
+    """
+    status, manifests = {}, {}
+    for path in paths:
+        path = os.path.abspath(path)
+        directory = os.path.dirname(path)
+        if directory not in manifests:
+            manifests[directory] = _manifest(directory)
+        manifest = manifests[directory][1]
+        stem, source = _split(path)
+        text = _read(path)
+        key = _hash(f'{_VERSION}\n{formats}\n{text}')
+        entry = manifest.get(os.path.basename(path), {})
+        if not force and entry.get('source') == key and entry.get('complete') and all(
+                _hash(_read(stem + _WRITERS[f][0]) or '') == h
+                for f, h in entry['outputs'].items()):
+            status.update(dict.fromkeys((stem + _WRITERS[f][0] for f in entry['outputs']),
+                                        'skipped'))
+            continue
+        # contents this has read or written: anything else was edited by hand
+        known = {h for e in manifest.values() for h in [e.get('text'), *e.get('outputs', {}).values()]}
+        parsed, header = read(path, text)
+        written, complete = {}, True
+        for fmt in formats or _paired(header) or FORMATS:
+            if fmt == source:
+                continue
+            out = stem + _WRITERS[fmt][0]
+            data = _WRITERS[fmt][1](parsed, header)
+            digest, current = _hash(data), _read(out)
+            if current is not None and _hash(current) == digest:
+                status[out] = 'unchanged'
+            elif current is not None and not force and _hash(current) not in known:
+                status[out] = 'edited'
+                complete = False
+                if verbose:
+                    print(f'left {os.path.relpath(out)} alone: it was edited since it was last '
+                          f'converted (use force to overwrite)')
+                continue
+            else:
+                with open(out + '.tmp', 'w', encoding='utf-8') as f:
+                    f.write(data)
+                os.replace(out + '.tmp', out)
+                status[out] = 'written'
+                if verbose:
+                    print('wrote', os.path.relpath(out))
+            written[fmt] = digest
+        manifest[os.path.basename(path)] = {'source': key, 'text': _hash(text),
+                                            'outputs': written, 'complete': complete}
+    for path, manifest in manifests.values():
+        with open(path, 'w') as f:
+            json.dump(manifest, f, indent=1, sort_keys=True)
+            f.write('\n')
+    return status
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Convert lessons between .py, .md and .ipynb')
+    parser.add_argument('files', nargs='+')
+    parser.add_argument('--formats', nargs='+', choices=list(_WRITERS),
+                        help="formats to write (default: those paired in each file's header)")
+    parser.add_argument('--force', action='store_true',
+                        help='ignore the manifest and overwrite edited files')
+    args = parser.parse_args()
+    status = convert(args.files, args.formats, args.force)
+    counts = {s: list(status.values()).count(s)
+              for s in ('written', 'unchanged', 'skipped', 'edited')}
+    print(', '.join(f'{n} {s}' for s, n in counts.items()))
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Read only the columns and rows you need from a CSV file.
+
+pd_extract.py reads the whole of titanic.csv and then keeps a few columns
+or rows:
+
+    titanic.loc[:, ['Survived','Fare']]
+    titanic.query('(Pclass == 1) & (Fare > 50)')
+
+`read_csv` here takes the projection and the filter up front:
+
+    read_csv('data/titanic.csv', columns = ['Survived','Fare'],
+             where = '(Pclass == 1) & (Fare > 50)')
+
+The file is split into byte ranges at line boundaries, and the ranges are
+parsed in parallel threads (pandas' C tokenizer releases the GIL). Only the
+projected columns and the columns used by the filter are converted, and
+non-matching rows are dropped from each range before the pieces are put
+together. A column that the ranges parse as different types (numbers in
+one, text in another, say) is read again from the whole file, so that it
+gets the type a single read gives it. The result is the same as reading
+the whole file and then filtering: same values, dtypes and row labels.
+
+Fields with quoted line breaks can't be split safely; use `threads = 1`
+for such files. Options that change which lines are rows (header,
+skiprows, nrows, index_col, ...) make it read the file in one go.
+"""
+
+#%% preamble
+
+import io
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+# pd.read_csv options the byte ranges can't honour: the file is read whole
+_WHOLE_FILE = {'header', 'skiprows', 'skipfooter', 'nrows', 'index_col', 'names'}
+
+#%% Byte ranges
+
+
+def _byte_ranges(path, parts, min_bytes):
+    """Split the data part of a file (after the header line) at newlines"""
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        f.readline()
+        start = f.tell()
+        parts = max(1, min(parts, (size - start) // min_bytes))
+        step = (size - start) / parts
+        bounds = [start]
+        for i in range(1, parts):
+            f.seek(int(start + i * step))
+            f.readline()
+            pos = f.tell()
+            if bounds[-1] < pos < size:
+                bounds.append(pos)
+        bounds.append(size)
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def _read_range(path, start, end):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        return f.read(end - start)
+
+
+#%% Per-range parsing
+
+
+def _referenced(where, names):
+    """Columns used by a query string (or all columns for a callable)"""
+    if where is None:
+        return []
+    if callable(where):
+        return list(names)
+    tokens = set(re.findall(r'`([^`]+)`|([A-Za-z_][A-Za-z0-9_]*)', where))
+    used = {a or b for a, b in tokens}
+    return [n for n in names if n in used]
+
+
+def _filter(df, where):
+    if where is None:
+        return df
+    return df[where(df)] if callable(where) else df.query(where)
+
+
+def _parse(path, byte_range, names, usecols, dtype, kwargs):
+    data = _read_range(path, *byte_range)
+    df = pd.read_csv(io.BytesIO(data), header=None, names=names, usecols=usecols,
+                     dtype=dtype, low_memory=False, **kwargs)
+    # what the parser made of each column, and whether it was all missing
+    kinds = {c: (df[c].dtype, bool(df[c].isna().all())) for c in df.columns}
+    return df, kinds
+
+
+def _conflicts(results):
+    """
+    Columns that were inferred as different, incompatible types in different
+    ranges (e.g. numbers in one and text in another, or categoricals with
+    different categories)
+    """
+    out = []
+    for c in results[0][1]:
+        seen = {kinds[c][0] for _, kinds in results if not kinds[c][1]}
+        if len(seen) > 1 and not all(d.kind in 'iuf' for d in seen):
+            out.append(c)
+    return out
+
+
+def _redo(path, results, dtype, kwargs):
+    """
+    Read the conflicting columns again from the whole file, so that they get
+    the type a full read would infer from all their values together, and put
+    them in place of the pieces of the ranges.
+    """
+    redo = _conflicts(results)
+    if not redo:
+        return
+    whole = pd.read_csv(path, usecols=redo, dtype=dtype, low_memory=False, **kwargs)
+    start = 0
+    for df, kinds in results:
+        part = whole.iloc[start:start + len(df)].set_axis(df.index)
+        for c in redo:
+            df[c] = part[c]
+            kinds[c] = (df[c].dtype, False)
+        start += len(df)
+
+
+def _align(results):
+    """
+    Give the pieces of a column that was empty in their range (parsed as
+    float) the type of the rest of it, e.g. str for a sparse text column,
+    so that they concatenate to the type of a full read. Bool columns are
+    left alone: with missing values a full read has them as objects, as
+    concatenating bool and float pieces does.
+    """
+    for c in results[0][1]:
+        seen = {kinds[c][0] for _, kinds in results if not kinds[c][1]}
+        if len(seen) != 1:
+            continue
+        dtype = seen.pop()
+        if dtype.kind in 'iufb':
+            continue
+        for df, kinds in results:
+            if kinds[c][1] and df[c].dtype != dtype:
+                df[c] = df[c].astype(dtype)
+
+
+def _filter_range(df, offset, where):
+    df.index = df.index + offset  # row labels as in a whole-file read
+    return _filter(df, where)
+
+
+#%% Reader
+
+
+def read_csv(path, columns=None, where=None, threads=None, min_bytes=1 << 20, **kwargs):
+    """
+    Read a CSV file with column projection and row filtering.
+
+    INPUTS:
+    path      : the CSV file (with a header line)
+    columns   : list of columns to keep, in the order wanted (default: all)
+    where     : a `DataFrame.query` string such as '(Pclass == 1) & (Fare > 50)',
+                or a function of a frame returning a boolean mask
+    threads   : number of parsing threads (default: number of CPUs)
+    min_bytes : smallest byte range given to a thread
+    kwargs    : other `pd.read_csv` arguments (e.g. sep = '\\t', dtype); not
+                usecols, chunksize or iterator
+
+    OUTPUT:
+    The same frame as `pd.read_csv(path, **kwargs).query(where)[columns]`,
+    with columns mixing numbers and text as with `low_memory = False`.
+    """
+    for arg in ('usecols', 'chunksize', 'iterator'):
+        if arg in kwargs:
+            raise TypeError(f"read_csv doesn't take {arg}" +
+                            (', use columns' if arg == 'usecols' else ''))
+    dtype = kwargs.pop('dtype', None)
+    if _WHOLE_FILE & set(kwargs):
+        df = _filter(pd.read_csv(path, dtype=dtype, **kwargs), where)
+        return df[list(columns)] if columns is not None else df
+    names = list(pd.read_csv(path, nrows=0, **kwargs).columns)
+    keep = list(columns) if columns is not None else names
+    missing = set(keep) - set(names)
+    if missing:
+        raise KeyError(f'columns not in {path}: {sorted(missing)}')
+    needed = set(keep) | set(_referenced(where, names))
+    usecols = [n for n in names if n in needed]
+
+    ranges = _byte_ranges(path, threads or os.cpu_count() or 1, min_bytes)
+    if ranges[0][0] == ranges[-1][1]:
+        # header only
+        df = pd.read_csv(path, usecols=usecols, dtype=dtype, **kwargs)
+        return _filter(df, where)[keep]
+    with ThreadPoolExecutor(max_workers=len(ranges)) as pool:
+        results = list(pool.map(lambda r: _parse(path, r, names, usecols, dtype, kwargs), ranges))
+        _redo(path, results, dtype, kwargs)
+        _align(results)
+        offsets = [0]
+        for df, _ in results:
+            offsets.append(offsets[-1] + len(df))
+        frames = list(pool.map(lambda i: _filter_range(results[i][0], offsets[i], where),
+                               range(len(results))))
+    results.clear()
+    out = pd.concat(frames) if len(frames) > 1 else frames[0]
+    if where is None:
+        out.index = pd.RangeIndex(offsets[-1])
+    return out[keep]
@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+A long-lived local process that runs the pandas recipes on demand.
+
+Launching pd_extract.py, pd_merge.py or pd_sac.py as a new process pays for
+starting Python, importing numpy and pandas and reading the data every
+time. The daemon does all of that once: it imports pandas, reads the
+common datasets (titanic, gapminder and the survey tables) and listens on
+a Unix socket. For each script sent to it, it forks a child that
+
++ runs the script in a fresh namespace, from the client's working
+  directory, capturing what it prints
++ gets the resident frames from `pd.read_csv` (or from `frames['titanic']`
+  etc.) when the script reads one of the files they came from with the
+  same options, as shallow copies. With pandas' copy-on-write, changes a
+  script makes to them are its own, and the pages of the frames are
+  shared with the daemon by the fork until then. A file that has changed
+  since the daemon read it (size or modification time) is read again
++ sends back its output and the variables asked for, then exits
+
+so scripts can't disturb each other or the daemon, and a run costs a
+fork instead of a start-up:
+
+    python daemon.py serve &                        # in the directory with data/
+    python daemon.py run pd_sac.py --get avg_lifeExp_country
+    python daemon.py stop
+
+Requests and replies are pickled; the socket is only accessible to its
+owner, since whoever can write to it can run code as the daemon's user.
+"""
+
+#%% preamble
+
+import argparse
+import io
+import os
+import pickle
+import signal
+import socket
+import struct
+import sys
+import time
+import traceback
+from contextlib import redirect_stderr, redirect_stdout
+
+# pandas is imported by the daemon only, so that the client starts quickly
+
+SOCKET = os.path.join(os.environ.get('XDG_RUNTIME_DIR') or '/tmp', f'pandas-daemon-{os.getuid()}')
+
+DATASETS = {
+    'titanic': ('titanic.csv', {}),
+    'gapminder': ('gapminder.tsv', {'sep': '\t'}),
+    'survey_person': ('survey_person.csv', {}),
+    'survey_site': ('survey_site.csv', {}),
+    'survey_survey': ('survey_survey.csv', {}),
+    'survey_visited': ('survey_visited.csv', {}),
+}
+
+#%% Messages
+
+
+def _send(sock, obj):
+    data = pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+    sock.sendall(struct.pack('!Q', len(data)) + data)
+
+
+def _recv_exactly(sock, n):
+    chunks = []
+    while n:
+        chunk = sock.recv(min(n, 1 << 20))
+        if not chunk:
+            raise ConnectionError('connection closed')
+        chunks.append(chunk)
+        n -= len(chunk)
+    return b''.join(chunks)
+
+
+def _recv(sock):
+    (n,) = struct.unpack('!Q', _recv_exactly(sock, 8))
+    return pickle.loads(_recv_exactly(sock, n))
+
+
+#%% Resident frames
+
+
+def _key(path, kwargs):
+    return os.path.realpath(path), repr(sorted(kwargs.items()))
+
+
+def _stat(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def load(directory='data', names=None):
+    """
+    Read the datasets to keep in memory.
+
+    OUTPUT:
+    A dict of name -> DataFrame, and a dict of (file, options) -> (name,
+    (mtime, size) of the file when read) for recognising reads of them
+    """
+    import pandas as pd
+    frames, keys = {}, {}
+    for name in names or DATASETS:
+        filename, kwargs = DATASETS[name]
+        path = os.path.join(directory, filename)
+        if not os.path.exists(path):
+            continue
+        stat = _stat(path)
+        frames[name] = pd.read_csv(path, **kwargs)
+        keys[_key(path, kwargs)] = (name, stat)
+    return frames, keys
+
+
+def _current(frames, keys):
+    """The resident frames whose files haven't changed since they were read"""
+    return {name: frames[name] for (path, _), (name, stat) in keys.items()
+            if _stat(path) == stat}
+
+
+def _resident_reads(frames, keys):
+    """
+    Make pd.read_csv return shallow copies of the resident frames for their
+    files, unless a file has changed since
+    """
+    import pandas as pd
+    read_csv = pd.read_csv
+
+    def read(filepath_or_buffer, *args, **kwargs):
+        if not args and isinstance(filepath_or_buffer, (str, os.PathLike)):
+            path = os.fspath(filepath_or_buffer)
+            name, stat = keys.get(_key(path, kwargs), (None, None))
+            if name is not None and _stat(path) == stat:
+                return frames[name].copy(deep=False)
+        return read_csv(filepath_or_buffer, *args, **kwargs)
+
+    pd.read_csv = read
+
+
+#%% Running a request (in a forked child)
+
+
+class _Timeout(BaseException):
+    """Not an Exception, so that a script's `except Exception` doesn't swallow it"""
+
+
+def _alarm(signum, frame):
+    raise _Timeout()
+
+
+def _execute(request, frames, keys):
+    """Run one script; the reply"""
+    _resident_reads(frames, keys)
+    os.chdir(request.get('cwd') or '.')
+    path = os.path.abspath(request['script']) if request.get('script') else '<request>'
+    if request.get('script'):
+        with open(path, encoding='utf-8') as f:
+            source = f.read()
+        sys.path.insert(0, os.path.dirname(path))
+    else:
+        source = request['code']
+    sys.argv = [path, *request.get('argv', [])]
+    namespace = {'__name__': '__main__', '__file__': path,
+                 'frames': {k: v.copy(deep=False) for k, v in _current(frames, keys).items()}}
+    stdout, stderr = io.StringIO(), io.StringIO()
+    reply = {'status': 'ok', 'error': None, 'pid': os.getpid()}
+    start = time.perf_counter()
+    if request.get('timeout'):
+        signal.signal(signal.SIGALRM, _alarm)
+        signal.setitimer(signal.ITIMER_REAL, request['timeout'])
+    try:
+        with redirect_stdout(stdout), redirect_stderr(stderr):
+            exec(compile(source, path, 'exec'), namespace)
+    except _Timeout:
+        reply.update(status='timeout', error=f"took longer than {request['timeout']} s")
+    except (Exception, SystemExit) as e:
+        if not (isinstance(e, SystemExit) and e.code in (None, 0)):
+            reply.update(status='error', error=traceback.format_exc())
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+    reply['wall'] = time.perf_counter() - start
+    reply['stdout'], reply['stderr'] = stdout.getvalue(), stderr.getvalue()
+    values = {}
+    for name in request.get('get', []):
+        if name in namespace:
+            value = namespace[name]
+            try:
+                pickle.dumps(value)
+            except Exception:
+                value = repr(value)
+            values[name] = value
+    reply['values'] = values
+    return reply
+
+
+#%% Server
+
+
+def serve(path=SOCKET, directory='data', names=None, max_children=None, verbose=True):
+    """
+    Load the datasets and answer requests on a Unix socket until told to stop.
+
+    INPUTS:
+    path         : the socket
+    directory    : where the datasets are
+    names        : datasets to keep in memory (default: all of DATASETS found)
+    max_children : scripts running at once (default: one per CPU)
+    verbose      : log requests to stderr
+    """
+    frames, keys = load(directory, names)
+    max_children = max_children or os.cpu_count() or 1
+    if os.path.exists(path):
+        os.remove(path)  # left by a daemon that didn't shut down
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    old = os.umask(0o177)
+    try:
+        server.bind(path)
+    finally:
+        os.umask(old)
+    server.listen(64)
+    children, served, started = set(), 0, time.time()
+
+    def reap(block=False):
+        while children:
+            pid, _ = os.waitpid(-1, 0 if block else os.WNOHANG)
+            if not pid:
+                return
+            children.discard(pid)
+            if block:
+                return
+
+    def shutdown(signum=None, frame=None):
+        raise KeyboardInterrupt
+
+    signal.signal(signal.SIGTERM, shutdown)
+    if verbose:
+        sizes = ', '.join(f'{k} {len(v)} rows' for k, v in frames.items())
+        print(f'serving on {path} (pid {os.getpid()}): {sizes or "no datasets"}', file=sys.stderr)
+    try:
+        while True:
+            reap()
+            conn, _ = server.accept()
+            try:
+                request = _recv(conn)
+            except (ConnectionError, pickle.UnpicklingError, struct.error):
+                conn.close()
+                continue
+            command = request.get('command', 'run')
+            if command != 'run':
+                _send(conn, {'pid': os.getpid(), 'served': served, 'running': len(children),
+                             'datasets': {k: v.shape for k, v in frames.items()},
+                             'uptime': time.time() - started})
+                conn.close()
+                if command == 'stop':
+                    break
+                continue
+            while len(children) >= max_children:
+                reap(block=True)
+            pid = os.fork()
+            if pid == 0:  # child
+                server.close()
+                status = 0
+                try:
+                    _send(conn, _execute(request, frames, keys))
+                except BaseException:
+                    status = 1
+                finally:
+                    conn.close()
+                    os._exit(status)
+            conn.close()
+            children.add(pid)
+            served += 1
+            if verbose:
+                print(f"{time.strftime('%H:%M:%S')} {request.get('script') or '<code>'} "
+                      f'(pid {pid})', file=sys.stderr)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        if os.path.exists(path):
+            os.remove(path)
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        while children:
+            reap(block=True)
+
+
+#%% Client
+
+
+def request(message, path=SOCKET):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(path)
+        _send(sock, message)
+        return _recv(sock)
+
+
+def run(script=None, get=(), argv=(), code=None, timeout=None, path=SOCKET):
+    """
+    Run a script (or a string of code) in the daemon.
+
+    INPUTS:
+    script  : the script, run from the current directory as `python script`
+    get     : names of variables to send back (pickled, else their repr)
+    argv    : sys.argv[1:] for the script
+    code    : source to run instead of a script
+    timeout : seconds after which the script is stopped
+
+    OUTPUT:
+    A dict with 'status' ('ok', 'error' or 'timeout'), 'error' (the
+    traceback), 'stdout', 'stderr', 'wall' and the 'values' asked for
+    """
+    return request({'command': 'run', 'script': script and os.path.abspath(script),
+                    'code': code, 'get': list(get), 'argv': list(argv), 'cwd': os.getcwd(),
+                    'timeout': timeout}, path)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run pandas recipes in a warm daemon')
+    parser.add_argument('--socket', default=SOCKET)
+    commands = parser.add_subparsers(dest='command', required=True)
+    p = commands.add_parser('serve', help='start the daemon')
+    p.add_argument('--data', default='data', help='directory of the datasets')
+    p.add_argument('--datasets', nargs='+', choices=list(DATASETS), help='datasets to load')
+    p.add_argument('--children', type=int, help='scripts running at once')
+    p = commands.add_parser('run', help='run a script in the daemon')
+    p.add_argument('script')
+    p.add_argument('argv', nargs='*')
+    p.add_argument('--get', nargs='+', default=[], help='print these variables afterwards')
+    p.add_argument('--timeout', type=float)
+    commands.add_parser('status', help="show the daemon's datasets and counts")
+    commands.add_parser('stop', help='stop the daemon')
+    args = parser.parse_args()
+    if args.command == 'serve':
+        serve(args.socket, args.data, args.datasets, args.children)
+    elif args.command == 'run':
+        reply = run(args.script, args.get, args.argv, timeout=args.timeout, path=args.socket)
+        sys.stdout.write(reply['stdout'])
+        sys.stderr.write(reply['stderr'])
+        for name, value in reply['values'].items():
+            print(f'{name} =\n{value}')
+        if reply['error']:
+            sys.stderr.write(reply['error'] + '\n')
+        raise SystemExit(0 if reply['status'] == 'ok' else 1)
+    else:
+        print(request({'command': args.command}, args.socket))
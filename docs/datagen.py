@@ -0,0 +1,481 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Synthetic versions of the datasets the scripts read from data/, at any scale.
+
+`data` is a link to a folder that only exists on the author's machine, so
+
+    mtcars.csv, mtcars.xlsx, titanic.csv, gapminder.tsv, pew.csv,
+    survey_person.csv, survey_site.csv, survey_visited.csv, survey_survey.csv,
+    table1.csv, table2.csv, table3.csv, table4a.csv, table4b.csv, table5.csv,
+    country_timeseries.csv
+
+are generated here instead. Each file has the columns, types, formats,
+missing values and roughly the distributions of the original (e.g.
+survival depends on sex and class in titanic, life expectancy rises over
+the years in gapminder, and foreign keys between the survey tables are
+valid). At scale 1 the files have the original number of rows; `scale`
+multiplies the number of cars, passengers, countries, readings, religions
+or reports, up to 10**4 and beyond. Dates stay within the originals'
+ranges: more visits or reports fall on the same days.
+
+    write('data', scale = 100)          # all files, 100 times the size
+    titanic = generate('titanic', scale = 10)
+
+Rows are generated in chunks of fixed size, each from its own
+`np.random.RandomState([seed, dataset, chunk])`, and the chunks are
+generated and written in parallel processes. The output depends only on
+`seed` and `scale`, not on the number of workers.
+"""
+
+#%% preamble
+
+import os
+import shutil
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+CHUNK = 50000  # units (cars, passengers, countries, ...) per chunk
+
+#%% mtcars
+
+_MAKES = ['Mazda RX4', 'Mazda RX4 Wag', 'Datsun 710', 'Hornet 4 Drive', 'Hornet Sportabout',
+          'Valiant', 'Duster 360', 'Merc 240D', 'Merc 230', 'Merc 280', 'Merc 280C',
+          'Merc 450SE', 'Merc 450SL', 'Merc 450SLC', 'Cadillac Fleetwood',
+          'Lincoln Continental', 'Chrysler Imperial', 'Fiat 128', 'Honda Civic',
+          'Toyota Corolla', 'Toyota Corona', 'Dodge Challenger', 'AMC Javelin', 'Camaro Z28',
+          'Pontiac Firebird', 'Fiat X1-9', 'Porsche 914-2', 'Lotus Europa', 'Ford Pantera L',
+          'Ferrari Dino', 'Maserati Bora', 'Volvo 142E']
+
+# per number of cylinders (4, 6, 8): mean and sd of mpg, disp, hp, drat, wt, qsec
+_CARS = {'mpg': ([26.7, 19.7, 15.1], [4.5, 1.5, 2.6]),
+         'disp': ([105.1, 183.3, 353.1], [26.9, 41.6, 67.8]),
+         'hp': ([82.6, 122.3, 209.2], [20.9, 24.3, 51.0]),
+         'drat': ([4.07, 3.59, 3.23], [0.37, 0.48, 0.37]),
+         'wt': ([2.29, 3.12, 4.00], [0.57, 0.36, 0.76]),
+         'qsec': ([19.1, 18.0, 16.8], [1.7, 1.7, 0.8])}
+_DIGITS = {'mpg': 1, 'disp': 1, 'hp': 0, 'drat': 2, 'wt': 3, 'qsec': 2}
+
+
+def _labels(base, start, stop):
+    """Names for units start..stop: the original names, then 'name 2', 'name 3', ..."""
+    i = np.arange(start, stop)
+    names = np.asarray(base, dtype=object)[i % len(base)]
+    copy = i // len(base)
+    return np.where(copy == 0, names, names + ' ' + (copy + 1).astype(str).astype(object))
+
+
+def _mtcars(rng, start, stop, n):
+    size = stop - start
+    group = rng.choice(3, size, p=np.array([11, 7, 14]) / 32)
+    df = pd.DataFrame({'make': _labels(_MAKES, start, stop),
+                       'cyl': np.array([4, 6, 8])[group]})
+    for column, (mean, sd) in _CARS.items():
+        values = rng.normal(np.take(mean, group), np.take(sd, group))
+        values = np.round(np.maximum(values, np.take(mean, group) / 3), _DIGITS[column])
+        df[column] = values.astype(int) if _DIGITS[column] == 0 else values
+    df['vs'] = (rng.rand(size) < np.take([10 / 11, 4 / 7, 0.0], group)).astype(int)
+    df['am'] = (rng.rand(size) < np.take([8 / 11, 3 / 7, 2 / 14], group)).astype(int)
+    df['gear'] = np.where(df['am'] == 1, rng.choice([4, 5], size, p=[8 / 13, 5 / 13]),
+                          rng.choice([3, 4], size, p=[15 / 19, 4 / 19]))
+    df['carb'] = rng.choice([1, 2, 3, 4, 6, 8], size, p=np.array([7, 10, 3, 10, 1, 1]) / 32)
+    columns = ['make', 'mpg', 'cyl', 'disp', 'hp', 'drat', 'wt', 'qsec', 'vs', 'am', 'gear', 'carb']
+    return {'mtcars.csv': df[columns]}
+
+
+#%% titanic
+
+_SURNAMES = ['Andersson', 'Sage', 'Skoog', 'Carter', 'Goodwin', 'Johnson', 'Panula', 'Rice',
+             'Fortune', 'Brown', 'Smith', 'Williams', 'Kelly', 'Harris', 'Baclini', 'Allison',
+             'Asplund', 'Palsson', 'Ford', 'Harper', 'Moran', 'Davies', 'Flynn', 'Graham',
+             'Hart', 'Lefebre', 'Newell', 'Olsen', 'Taussig', 'Yasbeck']
+_MALE = ['William', 'John', 'Charles', 'George', 'Thomas', 'James', 'Edward', 'Henry',
+         'Frederick', 'Arthur', 'Joseph', 'Richard', 'Karl', 'Ernst', 'Owen Harris']
+_FEMALE = ['Mary', 'Anna', 'Margaret', 'Elizabeth', 'Helen', 'Alice', 'Ellen', 'Bertha',
+           'Florence', 'Marie', 'Edith', 'Laina', 'Elisabeth', 'Agnes', 'Kate']
+_TICKETS = np.array(['', '', '', '', 'PC ', 'A/5 ', 'C.A. ', 'STON/O2. ', 'SC/PARIS ',
+                     'W./C. ', 'SOTON/O.Q. '], dtype=object)
+
+
+def _titanic(rng, start, stop, n):
+    size = stop - start
+    pclass = rng.choice([1, 2, 3], size, p=[0.242, 0.207, 0.551])
+    c = pclass - 1
+    male = rng.rand(size) < 0.647
+    age = np.clip(rng.normal(np.take([38.2, 29.9, 25.1], c), 14.0), 0.42, 80.0)
+    age = np.where(age < 1, np.round(age, 2),
+                   np.floor(age) + 0.5 * (rng.rand(size) < 0.03))
+    age[rng.rand(size) < 0.199] = np.nan
+    boy = male & (age < 13)
+    survival = np.where(male, np.take([0.369, 0.157, 0.135], c), np.take([0.968, 0.921, 0.5], c))
+    survival = np.where(boy, 0.6, survival)
+    sibsp = rng.choice([0, 1, 2, 3, 4, 5, 8], size,
+                       p=[0.682, 0.235, 0.031, 0.018, 0.020, 0.006, 0.008])
+    parch = rng.choice([0, 1, 2, 3, 4, 5, 6], size,
+                       p=[0.761, 0.132, 0.090, 0.006, 0.004, 0.006, 0.001])
+    fare = np.round(np.exp(rng.normal(np.log(np.take([60.3, 14.25, 8.05], c)),
+                                      np.take([0.7, 0.5, 0.5], c))), 4)
+    title = np.where(male, np.where(boy, 'Master.', 'Mr.'),
+                     np.where(rng.rand(size) < 0.45, 'Mrs.', 'Miss.')).astype(object)
+    first = np.where(male, rng.choice(_MALE, size), rng.choice(_FEMALE, size)).astype(object)
+    name = rng.choice(_SURNAMES, size).astype(object) + ', ' + title + ' ' + first
+    ticket = rng.choice(_TICKETS, size) + rng.randint(1000, 400000, size).astype(str).astype(object)
+    deck = np.array(list('ABCDEFG'))[np.clip(rng.randint(0, 4, size) + 2 * c, 0, 6)]
+    cabin = (deck.astype(object) + rng.randint(1, 150, size).astype(str).astype(object))
+    cabin = np.where(rng.rand(size) < np.take([0.81, 0.09, 0.02], c), cabin, None)
+    embarked = rng.choice(np.array(['S', 'C', 'Q'], dtype=object), size, p=[0.724, 0.189, 0.087])
+    embarked[rng.rand(size) < 2 / 891] = None
+    df = pd.DataFrame({'PassengerId': np.arange(start, stop) + 1,
+                       'Survived': (rng.rand(size) < survival).astype(int),
+                       'Pclass': pclass, 'Name': name,
+                       'Sex': np.where(male, 'male', 'female'), 'Age': age,
+                       'SibSp': sibsp, 'Parch': parch, 'Ticket': ticket, 'Fare': fare,
+                       'Cabin': cabin, 'Embarked': embarked})
+    return {'titanic.csv': df}
+
+
+#%% gapminder
+
+_COUNTRIES = {
+    'Africa': ['Algeria', 'Angola', 'Benin', 'Botswana', 'Burkina Faso', 'Burundi', 'Cameroon',
+               'Central African Republic', 'Chad', 'Comoros', 'Congo, Dem. Rep.',
+               'Congo, Rep.', "Cote d'Ivoire", 'Djibouti', 'Egypt', 'Equatorial Guinea',
+               'Eritrea', 'Ethiopia', 'Gabon', 'Gambia', 'Ghana', 'Guinea', 'Guinea-Bissau',
+               'Kenya', 'Lesotho', 'Liberia', 'Libya', 'Madagascar', 'Malawi', 'Mali',
+               'Mauritania', 'Mauritius', 'Morocco', 'Mozambique', 'Namibia', 'Niger',
+               'Nigeria', 'Reunion', 'Rwanda', 'Sao Tome and Principe', 'Senegal',
+               'Sierra Leone', 'Somalia', 'South Africa', 'Sudan', 'Swaziland', 'Tanzania',
+               'Togo', 'Tunisia', 'Uganda', 'Zambia', 'Zimbabwe'],
+    'Americas': ['Argentina', 'Bolivia', 'Brazil', 'Canada', 'Chile', 'Colombia', 'Costa Rica',
+                 'Cuba', 'Dominican Republic', 'Ecuador', 'El Salvador', 'Guatemala', 'Haiti',
+                 'Honduras', 'Jamaica', 'Mexico', 'Nicaragua', 'Panama', 'Paraguay', 'Peru',
+                 'Puerto Rico', 'Trinidad and Tobago', 'United States', 'Uruguay',
+                 'Venezuela'],
+    'Asia': ['Afghanistan', 'Bahrain', 'Bangladesh', 'Cambodia', 'China', 'Hong Kong, China',
+             'India', 'Indonesia', 'Iran', 'Iraq', 'Israel', 'Japan', 'Jordan',
+             'Korea, Dem. Rep.', 'Korea, Rep.', 'Kuwait', 'Lebanon', 'Malaysia', 'Mongolia',
+             'Myanmar', 'Nepal', 'Oman', 'Pakistan', 'Philippines', 'Saudi Arabia',
+             'Singapore', 'Sri Lanka', 'Syria', 'Taiwan', 'Thailand', 'Vietnam',
+             'West Bank and Gaza', 'Yemen, Rep.'],
+    'Europe': ['Albania', 'Austria', 'Belgium', 'Bosnia and Herzegovina', 'Bulgaria', 'Croatia',
+               'Czech Republic', 'Denmark', 'Finland', 'France', 'Germany', 'Greece',
+               'Hungary', 'Iceland', 'Ireland', 'Italy', 'Montenegro', 'Netherlands', 'Norway',
+               'Poland', 'Portugal', 'Romania', 'Serbia', 'Slovak Republic', 'Slovenia',
+               'Spain', 'Sweden', 'Switzerland', 'Turkey', 'United Kingdom'],
+    'Oceania': ['Australia', 'New Zealand'],
+}
+_GAP = sorted((country, continent) for continent, names in _COUNTRIES.items() for country in names)
+_CONTINENTS = list(_COUNTRIES)
+# per continent: life expectancy in 1952 and its rise per 5 years, GDP per capita in 1952
+_LIFE = np.array([39.1, 53.3, 46.3, 64.4, 69.3])
+_GAIN = np.array([1.8, 2.5, 3.0, 1.3, 1.2])
+_GDP = np.array([1000.0, 3000.0, 1000.0, 5000.0, 10000.0])
+_YEARS = np.arange(1952, 2008, 5)
+
+
+def _gapminder(rng, start, stop, n):
+    size = stop - start
+    base = [_GAP[i % len(_GAP)] for i in range(start, stop)]
+    country = _labels([b[0] for b in _GAP], start, stop)
+    k = np.array([_CONTINENTS.index(b[1]) for b in base], dtype=np.intp)
+    life0 = rng.normal(_LIFE[k], 6.0)
+    gain = np.maximum(rng.normal(_GAIN[k], 0.8), 0.2)
+    pop0 = np.exp(rng.normal(np.log(3e6), 1.5, size))
+    growth = rng.normal(0.02, 0.01, size)
+    gdp0 = np.exp(rng.normal(np.log(_GDP[k]), 0.7))
+    gdp_growth = rng.normal(0.02, 0.015, size)
+    t = np.arange(len(_YEARS))
+    years = _YEARS - _YEARS[0]
+    life = life0[:, None] + gain[:, None] * t + rng.normal(0, 1.0, (size, len(t)))
+    pop = pop0[:, None] * np.exp(growth[:, None] * years)
+    gdp = gdp0[:, None] * np.exp(gdp_growth[:, None] * years + rng.normal(0, 0.08, (size, len(t))))
+    df = pd.DataFrame({'country': np.repeat(country, len(t)),
+                       'continent': np.repeat(np.array(_CONTINENTS, dtype=object)[k], len(t)),
+                       'year': np.tile(_YEARS, size),
+                       'lifeExp': np.round(np.clip(life, 23.6, 82.6), 3).ravel(),
+                       'pop': np.round(pop).astype(np.int64).ravel(),
+                       'gdpPercap': gdp.ravel()})
+    return {'gapminder.tsv': df}
+
+
+#%% Survey (person, site, visited, survey)
+
+_PEOPLE = [('dyer', 'William', 'Dyer'), ('pb', 'Frank', 'Pabodie'), ('lake', 'Anderson', 'Lake'),
+           ('roe', 'Valentina', 'Roerich'), ('danforth', 'Frank', 'Danforth')]
+_SITES = [('DR-1', -49.85, -128.57), ('DR-3', -47.15, -126.72), ('MSK-4', -48.87, -123.4)]
+_VISITS = [619, 622, 734, 735, 751, 752, 837, 844]
+_DATED = (pd.Timestamp('1927-02-08'), pd.Timestamp('1932-03-22'))  # first and last visit
+
+
+def _survey_units(n):
+    """Numbers of people, sites and visits for n readings (21 at scale 1)"""
+    scale = n / 21
+    return (max(1, round(5 * scale)), max(1, round(3 * scale)), max(1, round(8 * scale)))
+
+
+def _visit_ident(i):
+    return np.where(i < len(_VISITS), np.take(_VISITS, np.minimum(i, len(_VISITS) - 1)),
+                    _VISITS[-1] + 1 + i - len(_VISITS))
+
+
+def _people(npeople):
+    """ident, personal and family name of each person ('dyer', 'dyer_2', ...)"""
+    i = np.arange(npeople)
+    columns = [np.array([p[f] for p in _PEOPLE], dtype=object)[i % len(_PEOPLE)] for f in range(3)]
+    copy = i // len(_PEOPLE)
+    columns[0] = np.where(copy == 0, columns[0], columns[0] + '_' + (copy + 1).astype(str).astype(object))
+    return columns
+
+
+def _survey(rng, start, stop, n):
+    npeople, nsites, nvisits = _survey_units(n)
+    ident = _people(npeople)[0]
+    out = {}
+    if start == 0:
+        # the small tables are written whole with the first chunk
+        _, personal, family = _people(npeople)
+        out['survey_person.csv'] = pd.DataFrame({'ident': ident, 'personal': personal,
+                                                 'family': family})
+        j = np.arange(nsites)
+        name = np.array([_SITES[x][0] if x < len(_SITES) else f"{('DR', 'MSK')[x % 2]}-{x + 2}"
+                         for x in j], dtype=object)
+        known = np.minimum(j, len(_SITES) - 1)
+        lat = np.where(j < len(_SITES), np.take([s[1] for s in _SITES], known),
+                       np.round(rng.uniform(-50, -47, nsites), 2))
+        lon = np.where(j < len(_SITES), np.take([s[2] for s in _SITES], known),
+                       np.round(rng.uniform(-129, -123, nsites), 2))
+        out['survey_site.csv'] = pd.DataFrame({'name': name, 'lat': lat, 'long': lon})
+        days = np.sort(rng.randint(0, (_DATED[1] - _DATED[0]).days + 1, nvisits))
+        dated = (_DATED[0] + pd.to_timedelta(days, unit='D')).strftime('%Y-%m-%d')
+        dated = np.where(rng.rand(nvisits) < 1 / 8, None, np.asarray(dated, dtype=object))
+        out['survey_visited.csv'] = pd.DataFrame({'ident': _visit_ident(np.arange(nvisits)),
+                                                  'site': name[rng.randint(0, nsites, nvisits)],
+                                                  'dated': dated})
+    # readings, spread evenly over the visits in order
+    r = np.arange(start, stop)
+    size = stop - start
+    quant = rng.choice(np.array(['rad', 'sal', 'temp'], dtype=object), size,
+                       p=np.array([8, 7, 6]) / 21)
+    reading = np.where(quant == 'rad', np.round(rng.lognormal(np.log(6.0), 0.5, size), 2),
+                       np.where(quant == 'sal', np.round(rng.uniform(0.05, 0.5, size), 2),
+                                np.round(rng.normal(-20.0, 3.0, size), 1)))
+    # some salinities were recorded as percentages
+    mistake = (quant == 'sal') & (rng.rand(size) < 0.15)
+    reading = np.where(mistake, np.round(reading * 100, 1), reading)
+    person = ident[rng.randint(0, npeople, size)]
+    person[rng.rand(size) < 2 / 21] = None
+    out['survey_survey.csv'] = pd.DataFrame({'taken': _visit_ident(r * nvisits // n),
+                                             'person': person, 'quant': quant,
+                                             'reading': reading})
+    return out
+
+
+#%% pew
+
+_RELIGIONS = ['Agnostic', 'Atheist', 'Buddhist', 'Catholic', "Don't know/refused",
+              'Evangelical Prot', 'Hindu', 'Historically Black Prot', "Jehovah's Witness",
+              'Jewish', 'Mainline Prot', 'Mormon', 'Muslim', 'Orthodox', 'Other Christian',
+              'Other Faiths', 'Other World Religions', 'Unaffiliated']
+_FOLLOWERS = [826, 515, 411, 8054, 272, 9472, 257, 1995, 215, 682, 7470, 581, 116, 463, 129,
+              449, 42, 3707]
+_INCOMES = ['<$10k', '$10-20k', '$20-30k', '$30-40k', '$40-50k', '$50-75k', '$75-100k',
+            '$100-150k', '>150k', "Don't know/refused"]
+_SHARES = np.array([0.07, 0.11, 0.12, 0.11, 0.09, 0.14, 0.09, 0.07, 0.07, 0.13])
+
+
+def _pew(rng, start, stop, n):
+    size = stop - start
+    i = np.arange(start, stop)
+    followers = np.where(i < len(_FOLLOWERS), np.take(_FOLLOWERS, np.minimum(i, len(_FOLLOWERS) - 1)),
+                         np.round(rng.lognormal(np.log(500), 1.3, size)).astype(int))
+    shares = rng.dirichlet(_SHARES * 50, size)
+    # RandomState.multinomial takes one row at a time; a Generator seeded
+    # from it draws them all at once
+    counts = np.random.default_rng(rng.randint(2 ** 31)).multinomial(followers, shares)
+    df = pd.DataFrame(counts, columns=_INCOMES)
+    df.insert(0, 'religion', _labels(_RELIGIONS, start, stop))
+    return {'pew.csv': df}
+
+
+#%% Tidy-data tables (table1 ... table5)
+
+
+def _tables(rng, start, stop, n):
+    size = stop - start
+    country = _labels(['Afghanistan', 'Brazil', 'China'], start, stop)
+    pop = np.round(np.exp(rng.normal(np.log(1e8), 1.5, size))).astype(np.int64)
+    pop = np.stack([pop, np.round(pop * rng.uniform(1.01, 1.04, size)).astype(np.int64)], 1)
+    rate = np.exp(rng.normal(np.log(2e-4), 1.5, size))
+    cases = np.stack([rate, rate * rng.uniform(1.0, 3.6, size)], 1) * pop
+    cases = np.maximum(np.round(cases), 1).astype(np.int64)
+    years = np.array([1999, 2000])
+    long = pd.DataFrame({'country': np.repeat(country, 2), 'year': np.tile(years, size),
+                         'cases': cases.ravel(), 'population': pop.ravel()})
+    table2 = pd.DataFrame({'country': np.repeat(country, 4),
+                           'year': np.tile(np.repeat(years, 2), size),
+                           'type': np.tile(np.array(['cases', 'population'], dtype=object), 2 * size),
+                           'count': np.stack([cases, pop], 2).reshape(-1)})
+    rate = long['cases'].astype(str) + '/' + long['population'].astype(str)
+    table3 = long[['country', 'year']].assign(rate=rate)
+    wide = {'table4a.csv': cases, 'table4b.csv': pop}
+    out = {'table1.csv': long, 'table2.csv': table2, 'table3.csv': table3}
+    for name, values in wide.items():
+        out[name] = pd.DataFrame({'country': country, '1999': values[:, 0], '2000': values[:, 1]})
+    out['table5.csv'] = pd.DataFrame({'country': long['country'],
+                                      'century': (long['year'] // 100).astype(str),
+                                      'year': (long['year'] % 100).map('{:02d}'.format),
+                                      'rate': rate})
+    return out
+
+
+#%% Ebola (country_timeseries)
+
+_EBOLA = ['Guinea', 'Liberia', 'SierraLeone', 'Nigeria', 'Senegal', 'UnitedStates', 'Spain',
+          'Mali']
+# final cases, case fatality, share of dates reported, onset as a share of the period
+_OUTBREAK = np.array([[2775, 0.62, 0.76, 0.0], [8166, 0.43, 0.68, 0.35],
+                      [10030, 0.30, 0.70, 0.30], [20, 0.40, 0.31, 0.45],
+                      [1, 0.0, 0.21, 0.55], [4, 0.25, 0.15, 0.70],
+                      [1, 0.0, 0.13, 0.75], [8, 0.75, 0.10, 0.78]])
+
+
+_SPAN = 289  # days from the first report to the last
+
+
+def _country_timeseries(rng, start, stop, n):
+    size = stop - start
+    r = np.arange(start, stop)  # row 0 is the latest date
+    day = np.floor((n - 1 - r) * _SPAN / max(n - 1, 1)).astype(np.int64)
+    date = pd.Timestamp('2014-03-22') + pd.to_timedelta(day, unit='D')
+    df = pd.DataFrame({'Date': [f'{d.month}/{d.day}/{d.year}' for d in date], 'Day': day})
+    columns = {}
+    for c, (final, fatality, reported, onset) in zip(_EBOLA, _OUTBREAK):
+        t = (day / _SPAN - onset) / 0.12
+        cases = final / (1 + np.exp(-(t - 2.0))) * rng.lognormal(0, 0.03, size)
+        cases = np.round(cases)
+        deaths = np.round(cases * fatality * rng.uniform(0.8, 1.0, size))
+        missing = (rng.rand(size) > reported) | (day < onset * _SPAN)
+        columns[f'Cases_{c}'] = np.where(missing, np.nan, cases)
+        columns[f'Deaths_{c}'] = np.where(missing, np.nan, deaths)
+    for kind in ('Cases', 'Deaths'):
+        for c in _EBOLA:
+            df[f'{kind}_{c}'] = columns[f'{kind}_{c}']
+    return {'country_timeseries.csv': df}
+
+
+#%% Datasets
+
+# name -> (units at scale 1, generator of the files for units start..stop)
+DATASETS = {
+    'mtcars': (32, _mtcars),
+    'titanic': (891, _titanic),
+    'gapminder': (142, _gapminder),
+    'survey': (21, _survey),
+    'pew': (18, _pew),
+    'tables': (3, _tables),
+    'country_timeseries': (122, _country_timeseries),
+}
+
+
+def _units(name, scale):
+    return max(1, int(round(DATASETS[name][0] * scale)))
+
+
+def _chunk(name, k, n, seed):
+    """The files' rows for chunk k of a dataset with n units"""
+    rng = np.random.RandomState([seed, list(DATASETS).index(name), k])
+    return DATASETS[name][1](rng, k * CHUNK, min(n, (k + 1) * CHUNK), n)
+
+
+def generate(name, scale=1, seed=25):
+    """
+    One dataset in memory.
+
+    INPUTS:
+    name  : a key of DATASETS ('mtcars', 'titanic', 'gapminder', 'survey',
+            'pew', 'tables' or 'country_timeseries')
+    scale : size relative to the original
+    seed  : random seed
+
+    OUTPUT:
+    A DataFrame, or a dict of file name -> DataFrame for the datasets made
+    of several files ('survey' and 'tables')
+    """
+    n = _units(name, scale)
+    parts = {}
+    for k in range(-(-n // CHUNK)):
+        for filename, df in _chunk(name, k, n, seed).items():
+            parts.setdefault(filename, []).append(df)
+    out = {f: pd.concat(dfs, ignore_index=True) if len(dfs) > 1 else dfs[0]
+           for f, dfs in parts.items()}
+    return next(iter(out.values())) if len(out) == 1 else out
+
+
+#%% Writing
+
+
+def _write_chunk(args):
+    directory, name, k, n, seed = args
+    written = {}
+    for filename, df in _chunk(name, k, n, seed).items():
+        part = os.path.join(directory, f'.{filename}.{k:06d}.part')
+        df.to_csv(part, index=False, header=(k == 0),
+                  sep='\t' if filename.endswith('.tsv') else ',')
+        written[filename] = part
+    return written
+
+
+def write(directory='data', names=None, scale=1, seed=25, workers=None, excel=True):
+    """
+    Write the datasets to a directory as the scripts expect to find them.
+
+    INPUTS:
+    directory : where to write (created if needed)
+    names     : datasets to write (default: all of DATASETS)
+    scale     : size relative to the original
+    seed      : random seed
+    workers   : processes generating and writing chunks (default: number of CPUs)
+    excel     : also write mtcars.xlsx (with excel_io.write_excel)
+
+    OUTPUT:
+    The list of files written
+    """
+    if os.path.islink(directory) and not os.path.exists(directory):
+        raise FileNotFoundError(f'{directory} links to {os.readlink(directory)}, which '
+                                'does not exist; remove the link or use another directory')
+    os.makedirs(directory, exist_ok=True)
+    names = list(DATASETS) if names is None else names
+    tasks = [(directory, name, k, _units(name, scale), seed)
+             for name in names for k in range(-(-_units(name, scale) // CHUNK))]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(_write_chunk, tasks))
+    # put each file together from its parts, in chunk order
+    parts = {}
+    for written in results:
+        for filename, part in written.items():
+            parts.setdefault(filename, []).append(part)
+    paths = []
+    for filename, files in parts.items():
+        path = os.path.join(directory, filename)
+        with open(path, 'wb') as out:
+            for part in files:
+                with open(part, 'rb') as f:
+                    shutil.copyfileobj(f, out, 1 << 20)
+                os.remove(part)
+        paths.append(path)
+    if excel and 'mtcars' in names:
+        import excel_io
+        path = os.path.join(directory, 'mtcars.xlsx')
+        excel_io.write_excel(pd.read_csv(os.path.join(directory, 'mtcars.csv')), path)
+        paths.append(path)
+    return paths
+
+
+if __name__ == '__main__':
+    # python datagen.py [directory [scale]]
+    args = sys.argv[1:]
+    for path in write(args[0] if args else 'data', scale=float(args[1]) if len(args) > 1 else 1):
+        print(path)
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Count distinct values without building an array of them.
+
+pd_sac.py reports
+
+    len(df['country'].unique())
+
+which makes a full object array of the country names just to take its
+length. `nunique(df['country'])` counts them directly:
+
++ a categorical column is counted from its codes: a category is present
+  if some row has its code, so no strings are touched at all
++ any other column is read in chunks. Each chunk is reduced to its
+  distinct values with pandas' hash table, and only those are hashed to
+  64 bits (`sketches.hash_values`: numbers by value, strings by text) and
+  split by their leading bits into partitions of the hash space. The
+  partitions are merged in parallel threads, so memory grows with the
+  number of distinct values, not with the number of rows.
+
+The count is exact up to hash collisions: two different values have the
+same 64-bit hash, and are counted once, with probability about
+n**2 / 2**65 for n distinct values (below 1e-7 for a million). Object
+columns holding values other than strings and numbers (tuples, say) are
+counted by `Series.nunique` instead.
+"""
+
+#%% preamble
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import sketches
+
+#%% Categorical columns
+
+
+def _nunique_codes(codes, ncategories, dropna):
+    present = np.bincount(codes[codes >= 0], minlength=ncategories) > 0
+    out = int(np.count_nonzero(present))
+    if not dropna and (codes < 0).any():
+        out += 1
+    return out
+
+
+#%% Hashed columns
+
+
+def _distinct(h):
+    """Sorted distinct values of a hash array (a plain sort: faster than np.unique here)"""
+    h = np.sort(h)
+    if len(h) > 1:
+        h = h[np.concatenate(([True], h[1:] != h[:-1]))]
+    return h
+
+
+def _chunk_hashes(values, start, end, bits):
+    """
+    Distinct hashes of values[start:end], split into 2**bits partitions
+    (None if the chunk has values that can't be hashed exactly)
+    """
+    # pandas' hash table dedupes the chunk first, so only its distinct
+    # values are hashed
+    chunk = pd.unique(values[start:end])
+    missing = pd.isna(chunk)
+    has_missing = bool(missing.any())
+    if has_missing:
+        chunk = chunk[~missing]
+    if not isinstance(chunk, np.ndarray):
+        chunk = np.asarray(chunk, dtype=object) if chunk.dtype.kind == 'O' else chunk.to_numpy()
+    h = sketches.hash_values(chunk, exact=True)
+    if h is None:
+        return None
+    h = _distinct(h)  # sorted, so each partition is a contiguous slice
+    edges = np.searchsorted(h >> np.uint64(64 - bits), np.arange((1 << bits) + 1))
+    return [h[s:e] for s, e in zip(edges[:-1], edges[1:])], has_missing
+
+
+def _nunique_hashed(values, dropna, threads, chunksize):
+    threads = threads or os.cpu_count() or 1
+    bits = max(1, int(np.ceil(np.log2(threads))))
+    partitions = [np.empty(0, dtype=np.uint64) for _ in range(1 << bits)]
+    has_missing = False
+    bounds = list(range(0, len(values), chunksize)) + [len(values)]
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        # one batch of chunks at a time, so only `threads` chunks of hashes
+        # are held besides the distinct ones
+        for b in range(0, len(bounds) - 1, threads):
+            pieces = list(pool.map(lambda i: _chunk_hashes(values, bounds[i], bounds[i + 1], bits),
+                                   range(b, min(b + threads, len(bounds) - 1))))
+            if any(p is None for p in pieces):
+                return None
+            has_missing |= any(m for _, m in pieces)
+            partitions = list(pool.map(
+                lambda p: _distinct(np.concatenate([partitions[p]] + [parts[p] for parts, _ in pieces])),
+                range(len(partitions))))
+    out = sum(len(p) for p in partitions)
+    if not dropna and has_missing:
+        out += 1
+    return out
+
+
+#%% nunique
+
+
+def nunique(obj, dropna=True, threads=None, chunksize=1 << 22):
+    """
+    Number of distinct values, as `obj.nunique()` (exact up to hash
+    collisions, see above).
+
+    INPUTS:
+    obj       : a Series (or array), or a DataFrame (counted per column)
+    dropna    : don't count missing values
+    threads   : threads used to hash chunks and merge partitions (default:
+                number of CPUs)
+    chunksize : rows hashed at a time
+
+    OUTPUT:
+    An int, or a Series of ints for a DataFrame
+    """
+    if isinstance(obj, pd.DataFrame):
+        return pd.Series({c: nunique(obj[c], dropna, threads, chunksize) for c in obj.columns},
+                         dtype=np.int64)
+    values = obj.array if isinstance(obj, pd.Series) else obj
+    if isinstance(values, pd.Categorical):
+        return _nunique_codes(values.codes, len(values.categories), dropna)
+    out = _nunique_hashed(values, dropna, threads, chunksize)
+    if out is None:
+        return pd.Series(values, copy=False).nunique(dropna=dropna)
+    return out
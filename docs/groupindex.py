@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+A reusable group index for repeated groupby calls on the same frame.
+
+pd_sac.py and python_pandas.py call `df.groupby('country')` and
+`df.groupby('continent')` again and again (`mean`, `ngroups`, `get_group`,
+`describe`, `nth`, `agg`), and every call factorizes and sorts the key
+column from scratch. `groupby(df, 'country')` does that work once and keeps
+it with the frame:
+
++ `codes`   : the group number of each row (-1 for a missing key)
++ `order`   : row positions sorted by group, original order within groups
++ `offsets` : where each group starts and ends in `order`
+
+The index is cached per frame and key column(s), and is rebuilt
+automatically when a key column is replaced or modified.
+
+    gb = groupby(df, 'country')
+    gb.ngroups
+    gb.get_group('United Kingdom')
+    gb['lifeExp'].mean()
+    gb['lifeExp'].describe()
+"""
+
+#%% preamble
+
+import weakref
+
+import numpy as np
+import pandas as pd
+
+import aggplan
+import sketches
+
+#%% Group index
+
+
+class GroupIndex:
+    """
+    Codes, sorted order and group offsets for the key column(s) of a frame.
+
+    INPUTS:
+    df   : a DataFrame
+    keys : a column name or a list of column names
+
+    Groups are numbered in sorted key order, as in `df.groupby(keys)`.
+    Rows with a missing key belong to no group.
+    """
+
+    def __init__(self, df, keys):
+        self.keys = keys
+        names = keys if isinstance(keys, list) else [keys]
+        if len(names) == 1:
+            codes, uniques = pd.factorize(df[names[0]], sort=True)
+            self.groups = pd.Index(uniques, name=names[0])
+        else:
+            codes = np.zeros(len(df), dtype=np.int64)
+            levels = []
+            for name in names:
+                c, u = pd.factorize(df[name], sort=True)
+                codes = np.where((codes < 0) | (c < 0), -1, codes * len(u) + c)
+                levels.append((c, u))
+            used, codes[codes >= 0] = np.unique(codes[codes >= 0], return_inverse=True)
+            arrays = []
+            for c, u in levels:
+                first = np.zeros(len(used), dtype=np.int64)
+                first[codes[codes >= 0]] = c[codes >= 0]
+                arrays.append(u.take(first))
+            self.groups = pd.MultiIndex.from_arrays(arrays, names=names)
+        self.codes = codes
+        self.ngroups = len(self.groups)
+        valid = np.flatnonzero(codes >= 0)
+        self.order = valid[np.argsort(codes[valid], kind='stable')]
+        counts = np.bincount(codes[valid], minlength=self.ngroups)
+        self.offsets = np.concatenate(([0], np.cumsum(counts)))
+
+    def sizes(self):
+        return np.diff(self.offsets)
+
+    def locate(self, key):
+        """Group number of a key"""
+        try:
+            return self.groups.get_loc(key)
+        except KeyError:
+            raise KeyError(key) from None
+
+    def positions(self, key):
+        """Row positions of one group, in O(group size)"""
+        i = self.locate(key)
+        return self.order[self.offsets[i]:self.offsets[i + 1]]
+
+
+#%% Cache
+
+_cache = {}
+
+
+def _token(series):
+    """Identifies the data of a column; changes when the column is modified"""
+    values = series._values
+    if isinstance(values, np.ndarray):
+        return (values.__array_interface__['data'][0], values.shape, values.dtype.str)
+    return (id(values), len(values))
+
+
+def group_index(df, keys):
+    """
+    The cached GroupIndex of `df` for `keys`, built if needed.
+
+    The cache holds a reference to the key columns, so pandas copies them
+    on write and any change to a key column is detected here.
+    """
+    names = tuple(keys) if isinstance(keys, list) else (keys,)
+    slot = (id(df), names)
+    columns = [df[name] for name in names]
+    tokens = [_token(c) for c in columns]
+    hit = _cache.get(slot)
+    if hit is not None:
+        ref, cached_tokens, _, index = hit
+        if ref() is df and cached_tokens == tokens and len(index.codes) == len(df):
+            return index
+    index = GroupIndex(df, list(names) if len(names) > 1 else names[0])
+    if hit is None:
+        weakref.finalize(df, _cache.pop, slot, None)
+    _cache[slot] = (weakref.ref(df), tokens, columns, index)
+    return index
+
+
+def clear_cache():
+    _cache.clear()
+
+
+#%% GroupBy
+
+
+_KEY = '__group__'
+
+
+def _relabel(result, index):
+    """Turn the group numbers of a delegated result back into group keys"""
+    if isinstance(result.index, pd.CategoricalIndex) and result.index.name == _KEY:
+        result.index = index.groups.take(result.index.codes)
+    return result
+
+
+class GroupBy:
+    """
+    Grouped operations that reuse a cached GroupIndex.
+
+    Common reductions (size, count, sum, mean, var, std, min, max,
+    describe) and `get_group`, `nth` and `filter` work directly on the sorted
+    group order. Anything else (`transform`, `apply`, ...) is passed
+    to pandas' own groupby with the precomputed codes as a categorical key,
+    so pandas doesn't factorize the key column again.
+    """
+
+    def __init__(self, df, keys, column=None):
+        self.obj = df
+        self.keys = keys
+        self.column = column
+        self.index = group_index(df, keys)
+
+    def __getitem__(self, column):
+        return GroupBy(self.obj, self.keys, column)
+
+    @property
+    def ngroups(self):
+        return self.index.ngroups
+
+    @property
+    def groups(self):
+        return {k: self.obj.index[self.index.order[s:e]]
+                for k, s, e in zip(self.index.groups, self.index.offsets[:-1],
+                                   self.index.offsets[1:])}
+
+    def get_group(self, key):
+        return self.obj.take(self.index.positions(key))
+
+    def pandas(self):
+        """An equivalent pandas groupby that reuses the codes"""
+        index = self.index
+        key = pd.Categorical.from_codes(index.codes, categories=np.arange(index.ngroups))
+        gb = self.obj.groupby(pd.Series(key, index=self.obj.index, name=_KEY), observed=True)
+        if self.column is not None:
+            return gb[self.column]
+        keys = self.keys if isinstance(self.keys, list) else [self.keys]
+        return gb[[c for c in self.obj.columns if c not in keys]]
+
+    def __getattr__(self, name):
+        # private names aren't delegated: copy and pickle look them up on
+        # instances that __init__ hasn't filled in yet
+        if name.startswith('_') or 'index' not in self.__dict__:
+            raise AttributeError(name)
+        attr = getattr(self.pandas(), name)
+        if not callable(attr):
+            return attr
+        def call(*args, **kwargs):
+            result = attr(*args, **kwargs)
+            if isinstance(result, (pd.Series, pd.DataFrame)):
+                result = _relabel(result, self.index)
+            return result
+        return call
+
+    # fast reductions on the sorted values
+
+    def _sorted(self):
+        if self.column is None:
+            raise TypeError('select a column first, e.g. gb["lifeExp"].mean()')
+        values = self.obj[self.column].to_numpy()
+        return values[self.index.order]
+
+    def _result(self, values):
+        return pd.Series(values, index=self.index.groups, name=self.column)
+
+    def size(self):
+        return pd.Series(self.index.sizes(), index=self.index.groups, name='size')
+
+    def _reduceat(self, ufunc, values):
+        starts = self.index.offsets[:-1]
+        nonempty = self.index.sizes() > 0
+        out = np.full(self.ngroups, np.nan)
+        if len(values):
+            out[nonempty] = ufunc.reduceat(values, starts[nonempty])
+        return out
+
+    def count(self):
+        values = self._sorted()
+        ok = ~pd.isna(values)
+        return self._result(self._reduceat(np.add, ok.astype(np.int64)).astype(np.int64))
+
+    def _moments(self):
+        values = self._sorted().astype(float)
+        ok = ~np.isnan(values)
+        n = self._reduceat(np.add, ok.astype(float))
+        s = self._reduceat(np.add, np.where(ok, values, 0.0))
+        return values, ok, n, s
+
+    def sum(self):
+        values = self._sorted()
+        if values.dtype.kind in 'iub':
+            return self._result(np.add.reduceat(values.astype(np.int64), self.index.offsets[:-1]))
+        _, _, _, s = self._moments()
+        return self._result(s)
+
+    def mean(self):
+        _, _, n, s = self._moments()
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return self._result(s / n)
+
+    def var(self, ddof=1):
+        values, ok, n, s = self._moments()
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = s / n
+            group = np.repeat(np.arange(self.ngroups), self.index.sizes())
+            dev = np.where(ok, values - mean[group], 0.0)
+            ss = self._reduceat(np.add, dev * dev)
+            return self._result(np.where(n > ddof, ss / (n - ddof), np.nan))
+
+    def std(self, ddof=1):
+        return np.sqrt(self.var(ddof))
+
+    def min(self):
+        values = self._sorted()
+        if values.dtype.kind != 'f':
+            return self.__getattr__('min')()
+        return self._result(self._reduceat(np.fmin, values))
+
+    def max(self):
+        values = self._sorted()
+        if values.dtype.kind != 'f':
+            return self.__getattr__('max')()
+        return self._result(self._reduceat(np.fmax, values))
+
+    def agg(self, spec, *args, **kwargs):
+        """
+        Like pandas' `agg`. Lists and dicts of common functions are computed
+        in one fused pass per column (see aggplan.py); anything else goes
+        to pandas.
+        """
+        if not args and not kwargs:
+            columns = self.column
+            if columns is None and not isinstance(spec, dict):
+                keys = self.keys if isinstance(self.keys, list) else [self.keys]
+                columns = [c for c in self.obj.columns if c not in keys]
+            result = aggplan.aggregate(self.obj, self.index, spec, columns)
+            if result is not None:
+                return result
+        return self.__getattr__('agg')(spec, *args, **kwargs)
+
+    aggregate = agg
+
+    def describe(self, percentiles=None, approx=False, k=200, **kwargs):
+        """
+        Grouped describe() of the selected numeric column, with every
+        percentile taken from one sort within groups. With approx = True,
+        per-group KLL sketches (sketches.py) give approximate percentiles
+        without the sort.
+        """
+        numeric = self.column is not None and self.obj[self.column].dtype.kind in 'iuf'
+        if not numeric or kwargs:
+            return self.__getattr__('describe')(percentiles=percentiles, **kwargs)
+        percentiles = (0.25, 0.5, 0.75) if percentiles is None else sorted(set(percentiles))
+        if approx:
+            summary = sketches.GroupedSummary.from_index(self.obj[self.column], self.index, k)
+            out = summary.describe(percentiles)
+            out.index = self.index.groups
+            return out
+        return aggplan.describe(self.obj, self.index, self.column, percentiles)
+
+    def filter(self, func):
+        """The rows of the groups for which `func(group)` is True"""
+        obj = self.obj if self.column is None else self.obj[self.column]
+        offsets, order = self.index.offsets, self.index.order
+        keep = [order[s:e] for s, e in zip(offsets[:-1], offsets[1:])
+                if func(obj.take(order[s:e]))]
+        rows = np.sort(np.concatenate(keep)) if keep else np.array([], dtype=np.intp)
+        return obj.take(rows)
+
+    def nth(self, n):
+        """The n-th row of each group (rows of groups that are too small are skipped)"""
+        sizes = self.index.sizes()
+        starts = self.index.offsets[:-1]
+        pos = starts + (n if n >= 0 else sizes + n)
+        ok = (pos >= starts) & (pos < starts + sizes)
+        rows = np.sort(self.index.order[pos[ok]])
+        obj = self.obj if self.column is None else self.obj[self.column]
+        return obj.take(rows)
+
+
+def groupby(df, keys):
+    """`df.groupby(keys)` backed by a cached GroupIndex"""
+    return GroupBy(df, keys)
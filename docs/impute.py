@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Missing-data imputation for the `reindex` / `isna` / `dropna` / `fillna`
+recipes in python_pandas.py.
+
+The missing-value mask of a frame is computed once (`MissingMask`) and is
+then reused for every drop and fill decision. `Imputer` learns fill values
+(a constant, column means or medians, or means/medians within groups) once
+with `fit`, and can then be applied to any number of later batches with
+`transform`.
+
+    imp = Imputer(strategy = 'mean', by = 'continent').fit(df)
+    df_filled = imp.transform(df)
+"""
+
+#%% preamble
+
+import numpy as np
+import pandas as pd
+
+#%% Missing value mask
+
+
+class MissingMask:
+    """
+    A boolean bitmap of the missing cells of a DataFrame, computed once.
+
+    INPUTS:
+    df : a DataFrame
+
+    The mask is a (rows x columns) numpy array, so `isna`, `notna`,
+    `dropna` and the fill methods all read it instead of rescanning the frame.
+    """
+
+    def __init__(self, df):
+        self.index = df.index
+        self.columns = df.columns
+        self.bits = df.isna().to_numpy()
+
+    def isna(self):
+        return pd.DataFrame(self.bits, index=self.index, columns=self.columns)
+
+    def notna(self):
+        return pd.DataFrame(~self.bits, index=self.index, columns=self.columns)
+
+    def column_has_na(self):
+        """Boolean array: does each column contain at least one missing value"""
+        return self.bits.any(axis=0)
+
+    def keep_rows(self, how='any', subset=None):
+        """Boolean row mask equivalent to `dropna(how = how, subset = subset)`"""
+        bits = self.bits
+        if subset is not None:
+            bits = bits[:, self.columns.get_indexer(subset)]
+        if how == 'any':
+            return ~bits.any(axis=1)
+        if how == 'all':
+            return ~bits.all(axis=1)
+        raise ValueError("how must be 'any' or 'all'")
+
+    def dropna(self, df, how='any', subset=None):
+        return df[self.keep_rows(how, subset)]
+
+
+#%% Grouped statistics
+
+
+def _group_means(values, codes, ngroups):
+    """Per-group mean of `values` (ignoring NaN) using two bincounts"""
+    ok = ~np.isnan(values)
+    sums = np.bincount(codes[ok], weights=values[ok], minlength=ngroups)
+    counts = np.bincount(codes[ok], minlength=ngroups)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return sums / counts
+
+
+def _group_medians(values, codes, ngroups):
+    """Per-group median of `values` (ignoring NaN) from a single lexsort"""
+    ok = ~np.isnan(values)
+    values, codes = values[ok], codes[ok]
+    order = np.lexsort((values, codes))
+    values = values[order]
+    counts = np.bincount(codes, minlength=ngroups)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    out = np.full(ngroups, np.nan)
+    has = counts > 0
+    lo = starts[has] + (counts[has] - 1) // 2
+    hi = starts[has] + counts[has] // 2
+    out[has] = (values[lo] + values[hi]) / 2
+    return out
+
+
+_GROUP_STATS = {'mean': _group_means, 'median': _group_medians}
+
+#%% Imputer
+
+
+class Imputer:
+    """
+    Learn fill values for missing data once and apply them to many frames.
+
+    INPUTS:
+    strategy : 'mean', 'median' or 'constant'
+    value    : fill value (scalar or dict of column -> value) when
+               strategy = 'constant'
+    by       : optional column name; statistics are computed within the
+               groups of this column (e.g. 'continent') and a column's
+               overall statistic is used for groups not seen in `fit` or
+               with no values there
+    columns  : columns to impute. Defaults to the numeric columns, as with
+               `select_dtypes(exclude=[object])`
+    """
+
+    def __init__(self, strategy='mean', value=None, by=None, columns=None):
+        if strategy not in ('mean', 'median', 'constant'):
+            raise ValueError("strategy must be 'mean', 'median' or 'constant'")
+        if strategy == 'constant' and value is None:
+            raise ValueError("a value is needed with strategy = 'constant'")
+        self.strategy = strategy
+        self.value = value
+        self.by = by
+        self.columns = columns
+        self.fill_ = None
+        self.groups_ = None
+
+    def _columns(self, df):
+        if self.columns is not None:
+            return list(self.columns)
+        cols = df.select_dtypes(include=[np.number]).columns
+        return [c for c in cols if c != self.by]
+
+    def fit(self, df):
+        """Compute the fill value of each column (and group) from `df`"""
+        cols = self._columns(df)
+        if self.strategy == 'constant':
+            if isinstance(self.value, dict):
+                self.fill_ = dict(self.value)
+            else:
+                self.fill_ = {c: self.value for c in cols}
+            return self
+        if self.by is None:
+            stat = df[cols].mean() if self.strategy == 'mean' else df[cols].median()
+            self.fill_ = stat.to_dict()
+            return self
+        codes, self.groups_ = pd.factorize(df[self.by])
+        ngroups = len(self.groups_)
+        valid = codes >= 0
+        group_stat = _GROUP_STATS[self.strategy]
+        self.fill_ = {}
+        for c in cols:
+            values = df[c].to_numpy(dtype=float)
+            per_group = group_stat(values[valid], codes[valid], ngroups)
+            overall = np.nanmean(values) if self.strategy == 'mean' else np.nanmedian(values)
+            per_group[np.isnan(per_group)] = overall
+            # last slot holds the fallback for unseen or missing groups
+            self.fill_[c] = np.append(per_group, overall)
+        return self
+
+    def transform(self, df, mask=None, inplace=False):
+        """
+        Fill the missing values of `df` with the learned values.
+
+        Only columns that actually contain missing values (according to
+        `mask`, a `MissingMask` computed here if not given) are touched.
+        With inplace = True the columns of `df` are replaced and `df` is
+        returned, otherwise a shallow copy is filled.
+        """
+        if self.fill_ is None:
+            raise RuntimeError('Imputer must be fit before transform')
+        if mask is None:
+            mask = MissingMask(df)
+        out = df if inplace else df.copy(deep=False)
+        has_na = dict(zip(mask.columns, mask.column_has_na()))
+        codes = None
+        for c, fill in self.fill_.items():
+            if c not in has_na or not has_na[c]:
+                continue
+            missing = mask.bits[:, mask.columns.get_loc(c)]
+            if self.by is None or self.strategy == 'constant':
+                out[c] = df[c].fillna(fill)
+                continue
+            if codes is None:
+                codes = pd.Index(self.groups_).get_indexer(df[self.by])
+                codes[codes < 0] = len(self.groups_)
+            values = df[c].to_numpy(dtype=float, copy=True)
+            values[missing] = fill[codes[missing]]
+            out[c] = values
+        return out
+
+    def fit_transform(self, df, inplace=False):
+        mask = MissingMask(df)
+        return self.fit(df).transform(df, mask=mask, inplace=inplace)
+
+    def stream(self, batches):
+        """Apply the learned fill values lazily over an iterable of frames"""
+        for batch in batches:
+            yield self.transform(batch)
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Read many CSV files at once, as in
+
+    filenames = sorted(glob('data/table*.csv'))
+    tables = [pd.read_csv(f) for f in filenames]
+
+but with the files parsed concurrently in a process pool. Each worker hands
+its columns back through shared memory (see shmframe.py) rather than
+pickling the parsed frame. Files are always returned in sorted name order,
+and can be concatenated into a single frame:
+
+    df, report = read_csvs('data/table*.csv', concat = True, report = True)
+"""
+
+#%% preamble
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+from glob import glob
+
+import numpy as np
+import pandas as pd
+from pandas.api.extensions import ExtensionArray
+
+import shmframe
+
+#%% Worker
+
+
+def _parse(args):
+    filename, shared, kwargs = args
+    start = time.perf_counter()
+    df = pd.read_csv(filename, **kwargs)
+    seconds = time.perf_counter() - start
+    stats = {'file': filename, 'rows': len(df), 'bytes': os.path.getsize(filename),
+             'seconds': seconds}
+    if shared:
+        return shmframe.to_shared(df), stats
+    return df, stats
+
+
+#%% Combining
+
+
+def _same_schema(handles):
+    def schema(h):
+        return [(name, kind, payload[1] if kind != 'pickle' else None)
+                for name, kind, payload in h['columns']]
+    first = schema(handles[0])
+    return all(schema(h) == first for h in handles[1:])
+
+
+def _concat(parts):
+    if isinstance(parts[0], ExtensionArray):
+        # as pd.concat: e.g. categorical if the categories agree, else object
+        return pd.concat([pd.Series(p, copy=False) for p in parts], ignore_index=True).array
+    return np.concatenate(parts)
+
+
+def _concat_shared(handles, keep_index=False):
+    """Concatenate identical-schema handles straight from the shared views"""
+    names = [name for name, _, _ in handles[0]['columns']]
+    parts = {name: [] for name in names}
+    with ExitStack() as stack:
+        for h in handles:
+            views = stack.enter_context(shmframe.attach(h))
+            for name in names:
+                parts[name].append(views[name])
+        data = {name: _concat(parts[name]) for name in names}
+        parts.clear()
+    index = None
+    if keep_index:
+        index = handles[0]['index'].append([h['index'] for h in handles[1:]])
+    return pd.DataFrame(data, index=index, copy=False)
+
+
+def _check_schema(frames):
+    first = list(frames[0].columns)
+    for df in frames[1:]:
+        if list(df.columns) != first:
+            raise ValueError(f'files have different columns: {first} and {list(df.columns)}; '
+                             'use unify = True to combine them')
+
+
+#%% Reader
+
+
+def read_csvs(files, workers=None, concat=False, unify=False, shared=True,
+              report=False, **kwargs):
+    """
+    Read several CSV files in parallel worker processes.
+
+    INPUTS:
+    files   : a glob pattern (e.g. 'data/table*.csv') or a list of file names.
+              Files are read in sorted name order
+    workers : number of processes (defaults to the number of CPUs)
+    concat  : if True return one frame with the rows of all files, otherwise
+              a list with one frame per file
+    unify   : when concatenating, allow files with different columns (the
+              union of columns is used, missing values are NaN). Otherwise
+              all files must have the same columns
+    shared  : hand columns back through shared memory instead of pickling
+    report  : also return a DataFrame with the rows, size, parse time and
+              throughput (MB/s) of each file
+    kwargs  : passed to `pd.read_csv`. With `index_col` the concatenated
+              frame keeps the files' index, otherwise it is renumbered
+
+    If a file can't be read, its error is raised once the files already
+    being read are done, and their shared memory is released.
+    """
+    if isinstance(files, str):
+        files = glob(files)
+    files = sorted(files)
+    if not files:
+        raise FileNotFoundError('no files to read')
+    workers = min(workers or os.cpu_count() or 1, len(files))
+
+    keep_index = not any(kwargs.get('index_col') is v for v in (None, False))
+
+    start = time.perf_counter()
+    results, error = [], None
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_parse, (f, shared, kwargs)) for f in files]
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception as e:  # still collect the others, to release their segments
+                if error is None:
+                    error = e
+                    for other in futures:
+                        other.cancel()
+    parts = [part for part, _ in results]
+    if error is not None:
+        if shared:
+            for p in parts:
+                shmframe.release(p)
+        raise error
+
+    try:
+        if shared and concat and _same_schema(parts):
+            out = _concat_shared(parts, keep_index)
+        else:
+            frames = [shmframe.from_shared(p, unlink=False) for p in parts] if shared else parts
+            if concat:
+                if not unify:
+                    _check_schema(frames)
+                out = pd.concat(frames, ignore_index=not keep_index)
+            else:
+                out = frames
+    finally:
+        if shared:
+            for p in parts:
+                shmframe.release(p)
+    elapsed = time.perf_counter() - start
+
+    if not report:
+        return out
+    stats = pd.DataFrame([s for _, s in results])
+    stats['MB/s'] = stats['bytes'] / 1e6 / stats['seconds']
+    stats.attrs['wall_seconds'] = elapsed
+    stats.attrs['total_MB/s'] = stats['bytes'].sum() / 1e6 / elapsed
+    return out, stats
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Nullable (masked) column storage for reindex, concat and outer merges.
+
+In python_pandas.py, `df.reindex(['a','b','c','d','e','f','g'])` turns the
+int column `four` into float64 and the bool column `five` into object, just
+to be able to hold the new missing rows. pandas' masked extension dtypes
+(`Int64`, `boolean`, `Float64`, ...) keep the original values and add a
+separate validity mask instead. The helpers here convert frames to those
+dtypes before reshaping, and read the masks directly for `isna`, `notna`
+and `dropna`.
+
+Run this file to compare memory and time against the default dtypes.
+"""
+
+#%% preamble
+
+import time
+
+import numpy as np
+import pandas as pd
+
+#%% Conversion
+
+
+def _nullable_dtype(dtype, floats):
+    if dtype.kind in 'iu':
+        return pd.api.types.pandas_dtype(dtype.name.capitalize().replace('Uint', 'UInt'))
+    if dtype.kind == 'b':
+        return pd.BooleanDtype()
+    if dtype.kind == 'f' and floats and dtype.itemsize <= 8:
+        # there is no Float16: half floats go up to Float32
+        return pd.Float32Dtype() if dtype.itemsize <= 4 else pd.Float64Dtype()
+    return None
+
+
+def to_nullable(df, floats=False):
+    """
+    Convert the int, unsigned and bool columns of `df` to masked dtypes of
+    the same width (int32 -> Int32, bool -> boolean). Float columns are
+    converted too if `floats = True` (float16 to Float32); other columns
+    are left alone.
+    """
+    if isinstance(df, pd.Series):
+        dtype = _nullable_dtype(df.dtype, floats) if isinstance(df.dtype, np.dtype) else None
+        return df if dtype is None else df.astype(dtype)
+    conversions = {}
+    for col, dtype in df.dtypes.items():
+        if isinstance(dtype, np.dtype):
+            new = _nullable_dtype(dtype, floats)
+            if new is not None:
+                conversions[col] = new
+    if not conversions:
+        return df
+    return df.astype(conversions)
+
+
+def reindex(df, *args, **kwargs):
+    """`df.reindex(...)` that keeps int and bool columns as int and bool"""
+    return to_nullable(df).reindex(*args, **kwargs)
+
+
+def concat(objs, **kwargs):
+    """`pd.concat(objs, ...)` without upcasting columns missing from some inputs"""
+    return pd.concat([to_nullable(o) for o in objs], **kwargs)
+
+
+def merge(left, right, **kwargs):
+    """`left.merge(right, ...)` that keeps dtypes on outer/left/right joins"""
+    return to_nullable(left).merge(to_nullable(right), **kwargs)
+
+
+#%% Reading the validity masks
+
+
+def _missing(series):
+    # the stored mask itself for masked dtypes: callers must not modify it
+    mask = getattr(series.array, '_mask', None)
+    if mask is not None:
+        return mask
+    return pd.isna(series).to_numpy()
+
+
+def missing(series):
+    """
+    Boolean numpy array of missing values. For masked dtypes this is a
+    copy of the stored mask, so no values are scanned.
+    """
+    mask = getattr(series.array, '_mask', None)
+    if mask is not None:
+        return mask.copy()
+    return pd.isna(series).to_numpy()
+
+
+def validity_bitmap(series):
+    """The validity mask packed to one bit per row (1 = value present)"""
+    return np.packbits(~_missing(series), bitorder='little')
+
+
+def isna(df):
+    return pd.DataFrame({c: _missing(df[c]) for c in df.columns}, index=df.index)
+
+
+def notna(df):
+    return pd.DataFrame({c: ~_missing(df[c]) for c in df.columns}, index=df.index)
+
+
+def dropna(df, how='any'):
+    if how not in ('any', 'all'):
+        raise ValueError("how must be 'any' or 'all'")
+    masks = [_missing(df[c]) for c in df.columns]
+    if not masks:
+        return df
+    combine = np.logical_or if how == 'any' else np.logical_and
+    return df[~combine.reduce(masks)]
+
+
+#%% Benchmark
+
+
+def _time(f, repeat=5):
+    best = np.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        f()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _report(label, default, masked, ops):
+    mem_d = default.memory_usage(deep=True).sum()
+    mem_m = masked.memory_usage(deep=True).sum()
+    print(f"{label}: memory {mem_d / 1e6:.1f} MB -> {mem_m / 1e6:.1f} MB")
+    for name, f_default, f_masked in ops:
+        print(f"  {name:<8} {_time(f_default) * 1e3:8.2f} ms -> {_time(f_masked) * 1e3:8.2f} ms")
+
+
+def compare(n=1000000, seed=25):
+    """
+    Time and size the reindex and outer-join examples of python_pandas.py
+    with the default dtypes and with masked dtypes, on `n` rows.
+    """
+    rng = np.random.RandomState(seed)
+    # reindex example: every other label is new, so half the rows are missing
+    df = pd.DataFrame(rng.randn(n, 3), index=np.arange(0, 2 * n, 2),
+                      columns=['one', 'two', 'three'])
+    df['four'] = 20
+    df['five'] = df['one'] > 0
+    new_index = np.arange(2 * n)
+    default = df.reindex(new_index)
+    masked = reindex(df, new_index)
+    _report('reindex', default, masked, [
+        ('reindex', lambda: df.reindex(new_index), lambda: reindex(df, new_index)),
+        ('isna', default.isna, lambda: isna(masked)),
+        ('dropna', default.dropna, lambda: dropna(masked)),
+    ])
+
+    # outer join of int/bool tables where half of the keys don't match
+    left = pd.DataFrame({'ident': np.arange(n), 'reading': rng.randint(0, 100, n)})
+    right = pd.DataFrame({'taken': np.arange(n // 2, n + n // 2),
+                          'quant': rng.randint(0, 5, n), 'dry': rng.rand(n) > 0.5})
+    kwargs = dict(how='outer', left_on='ident', right_on='taken')
+    default = left.merge(right, **kwargs)
+    masked = merge(left, right, **kwargs)
+    _report('outer merge', default, masked, [
+        ('merge', lambda: left.merge(right, **kwargs), lambda: merge(left, right, **kwargs)),
+        ('isna', default.isna, lambda: isna(masked)),
+        ('dropna', default.dropna, lambda: dropna(masked)),
+    ])
+
+
+if __name__ == '__main__':
+    compare()
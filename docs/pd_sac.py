@@ -9,12 +9,13 @@
 
 import numpy as np
 import pandas as pd
+from distinct import nunique
 
 #%% split-apply-combine
 
 df = pd.read_csv('data/gapminder.tsv', sep = '\t') # data is tab-separated, so we use `\t` to specify that
 
-f"This dataset has {len(df['country'].unique())} countries in it"
+f"This dataset has {nunique(df['country'])} countries in it"
 
 df.groupby('country')['lifeExp'].mean()
 
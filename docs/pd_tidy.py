@@ -9,14 +9,12 @@
 
 import numpy as np
 import pandas as pd
-from glob import glob
+from streams import files
 
 #%% Tidy data
 
-filenames = glob('data/table*.csv') 
-filenames = sorted(filenames)
-
-table1, table2, table3, table4a, table4b, table5 = [pd.read_csv(f) for f in filenames] # Use a list comprehension
+# Lazily stream the sorted file names and read them in 4 threads
+table1, table2, table3, table4a, table4b, table5 = files('data/table*.csv').map(pd.read_csv, workers = 4)
 
 #%%
 pew = pd.read_csv('data/pew.csv')
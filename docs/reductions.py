@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Fast and accurate versions of the primer's loop-sum and `my_mean` helpers.
+
+python_primer.py sums numbers with
+
+    y = 0
+    for u in x:
+      y = y + u
+
+which is slow and accumulates rounding error. `my_sum` and `my_mean` keep
+the same call (`my_mean(x)`), but pick a method based on what `x` is:
+
++ numpy arrays and pandas Series: `np.add.reduce`, which uses pairwise
+  summation for floating point data
++ lists and tuples: `math.fsum`, which is exact for floats
++ any other iterable (e.g. a generator): a single streaming pass with
+  Neumaier (Kahan) compensated summation, never stored in memory
+
+Integers are added as integers, so that a sum of ints is the exact int the
+loop gives; an infinite or NaN value gives the loop's inf or nan.
+
+`parallel_sum` splits a very large array into chunks that are reduced in
+threads (numpy releases the GIL) and combined with `math.fsum`.
+"""
+
+#%% preamble
+
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+#%% Sums
+
+
+def kahan_sum(x):
+    """
+    Sum an iterable in one pass with Neumaier compensated summation.
+
+    OUTPUT:
+    A tuple (sum, count); the sum is an int if all the numbers are
+    """
+    integer = 0  # the ints, exactly
+    total = 0.0
+    compensation = 0.0
+    floats = False
+    n = 0
+    for u in x:
+        n += 1
+        if _is_int(u):
+            integer = integer + u
+            continue
+        floats = True
+        t = total + u
+        # past inf or nan the compensation would only turn into nan
+        if math.isfinite(t):
+            if abs(total) >= abs(u):
+                compensation += (total - t) + u
+            else:
+                compensation += (u - t) + total
+        total = t
+    if not floats:
+        return integer, n
+    if not math.isfinite(total):
+        return total + integer, n
+    return math.fsum((total, compensation, integer)), n
+
+
+def _is_int(u):
+    return isinstance(u, (int, np.integer))
+
+
+def _sum_count(x):
+    if isinstance(x, pd.Series):
+        x = x.to_numpy()
+    if isinstance(x, np.ndarray):
+        return np.add.reduce(x, axis=None), x.size
+    if isinstance(x, (list, tuple)):
+        if all(_is_int(u) for u in x):
+            return sum(x), len(x)
+        try:
+            return math.fsum(x), len(x)
+        except ValueError:  # inf - inf, which fsum refuses
+            return sum(x), len(x)
+    return kahan_sum(x)
+
+
+def my_sum(x):
+    """
+    Sum a list, tuple, numpy array, pandas Series or any iterable of numbers.
+    """
+    return _sum_count(x)[0]
+
+
+def my_mean(x):
+    """
+    A function to compute the mean of a list of numbers.
+
+    INPUTS:
+    x : a list, tuple, numpy array, pandas Series or any other iterable
+        of numbers (generators are consumed in a single pass)
+
+    OUTPUT:
+    The arithmetic mean of the numbers
+    """
+    total, n = _sum_count(x)
+    if n == 0:
+        raise ZeroDivisionError('mean of an empty sequence')
+    return total / n
+
+
+#%% Parallel reduction
+
+
+def parallel_sum(x, chunksize=2 ** 22, workers=None):
+    """
+    Sum a large numpy array in chunks reduced in parallel threads.
+
+    INPUTS:
+    x         : a numpy array or pandas Series
+    chunksize : number of elements per chunk
+    workers   : number of threads (defaults to the number of CPUs)
+
+    Arrays smaller than two chunks are summed directly.
+    """
+    x = np.asarray(x).ravel()
+    if x.size < 2 * chunksize:
+        return np.add.reduce(x)
+    bounds = range(0, x.size, chunksize)
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        partial = list(pool.map(lambda i: np.add.reduce(x[i:i + chunksize]), bounds))
+    if x.dtype.kind == 'f':
+        return x.dtype.type(math.fsum(partial))
+    return np.add.reduce(np.array(partial))
+
+
+def parallel_mean(x, chunksize=2 ** 22, workers=None):
+    x = np.asarray(x)
+    if x.size == 0:
+        raise ZeroDivisionError('mean of an empty array')
+    return parallel_sum(x, chunksize, workers) / x.size
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Resident memory (RSS) of the current process.
+
+On Linux the kernel keeps the peak RSS of a process and can be asked to
+reset it, so the peak of one piece of work can be measured:
+
+    reset_peak()
+    before = current()
+    ...
+    used = peak() - before
+
+Elsewhere `peak()` is the peak since the process started
+(`resource.getrusage`), and `reset_peak()` returns False.
+"""
+
+#%% preamble
+
+import resource
+import sys
+
+#%% RSS
+
+
+def _status():
+    with open('/proc/self/status') as f:
+        return dict(line.split(':', 1) for line in f)
+
+
+def current():
+    """Resident memory now, in bytes"""
+    try:
+        return int(_status()['VmRSS'].split()[0]) * 1024
+    except (OSError, KeyError):
+        return peak()
+
+
+def peak():
+    """Peak resident memory since start (or the last reset_peak), in bytes"""
+    try:
+        return int(_status()['VmHWM'].split()[0]) * 1024
+    except (OSError, KeyError):
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # in bytes on macOS, in kilobytes on Linux and the BSDs
+        return maxrss if sys.platform == 'darwin' else maxrss * 1024
+
+
+def reset_peak():
+    """Reset the kernel's peak RSS to the current RSS (Linux); False if not possible"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
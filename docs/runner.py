@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Run py:percent scripts headless, several at a time.
+
+Each script runs in a new worker process, forked from a server process
+that has numpy and pandas imported already: a script doesn't pay for
+those imports itself, and nothing it imports or changes is left for the
+next script. Its code cells
+are executed in order in one namespace, as in a notebook, with
+
++ a time limit per cell: a cell that runs longer is interrupted, and the
+  rest of that script is skipped
++ the printed output and the value of a final expression captured per cell
+
+and the result is written as an executed notebook (.ipynb, with the
+markdown cells too) without a Jupyter server or nbformat:
+
+    python runner.py pd_*.py --workers 4 --timeout 60 --out executed
+
+Scripts are independent of each other, so they run in parallel; cells
+within a script run one after another.
+"""
+
+#%% preamble
+
+import argparse
+import builtins
+import io
+import json
+import multiprocessing
+import os
+import signal
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager, redirect_stderr, redirect_stdout
+
+import cells
+
+#%% Workers
+
+
+class CellTimeout(BaseException):
+    """A cell ran longer than the time limit (not an Exception, so that a
+    script's `except Exception` doesn't swallow it)"""
+
+
+def _warm():
+    """Worker initializer: import what the scripts use before any of them runs"""
+    os.environ.setdefault('MPLBACKEND', 'Agg')  # no windows from plt.show()
+    import numpy  # noqa: F401
+    import pandas  # noqa: F401
+
+
+def _context():
+    """Start workers by forking a server process that has the heavy imports done"""
+    context = multiprocessing.get_context('forkserver')
+    context.set_forkserver_preload(['numpy', 'pandas'])
+    return context
+
+
+def _alarm(signum, frame):
+    raise CellTimeout()
+
+
+@contextmanager
+def _limit(seconds):
+    """Raise CellTimeout in the block after `seconds` (None: no limit)"""
+    if not seconds:
+        yield
+        return
+    previous = signal.signal(signal.SIGALRM, _alarm)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+@contextmanager
+def _script_dir(path):
+    """Run from the script's directory, importing its neighbours, as `python script.py` would"""
+    directory = os.path.dirname(path)
+    old = os.getcwd()
+    os.chdir(directory)
+    sys.path.insert(0, directory)
+    try:
+        yield
+    finally:
+        sys.path.remove(directory)
+        os.chdir(old)
+
+
+#%% Outputs
+
+
+def _stream(name, text):
+    return {'output_type': 'stream', 'name': name, 'text': cells._lines(text)}
+
+
+def _result(value, count):
+    data = {'text/plain': cells._lines(repr(value))}
+    html = getattr(value, '_repr_html_', None)
+    if callable(html):
+        try:
+            html = html()
+        except Exception:
+            html = None
+        if html:
+            data['text/html'] = cells._lines(html)
+    return {'output_type': 'execute_result', 'execution_count': count, 'data': data,
+            'metadata': {}}
+
+
+def _error(e, filename):
+    # keep the frames of the script, not those of the runner
+    frames = [f for f in traceback.extract_tb(e.__traceback__) if f.filename == filename]
+    lines = traceback.format_list(frames) + traceback.format_exception_only(type(e), e)
+    return {'output_type': 'error', 'ename': type(e).__name__, 'evalue': str(e),
+            'traceback': [line.rstrip('\n') for line in lines]}
+
+
+#%% Running
+
+
+def run_script(path, timeout=None, out=None, stop=True):
+    """
+    Run the code cells of one script.
+
+    INPUTS:
+    path    : the py:percent script (run from its own directory)
+    timeout : seconds allowed per cell (None: no limit)
+    out     : directory to write the executed notebook to (None: don't)
+    stop    : skip the rest of the script after a cell fails; otherwise
+              carry on (a timed-out cell always stops it)
+
+    OUTPUT:
+    A dict with the script, its status ('ok', 'error' or 'timeout'), the
+    total time, a row per cell run, and the notebook written
+    """
+    path = os.path.abspath(path)
+    with open(path, encoding='utf-8') as f:
+        text = f.read()
+    parsed = cells.parse(path, text=text)
+    namespace = {'__name__': '__main__', '__file__': path, '__builtins__': builtins}
+    outputs, counts, rows = {}, {}, []
+    status, start = 'ok', time.perf_counter()
+    with _script_dir(path):
+        for count, cell in enumerate((c for c in parsed if c.kind == 'code'), 1):
+            stdout, stderr = io.StringIO(), io.StringIO()
+            found, error = [], None
+            began = time.perf_counter()
+            try:
+                with redirect_stdout(stdout), redirect_stderr(stderr), _limit(timeout):
+                    value = cell.execute(namespace, path)
+                if value is not None:
+                    found.append(_result(value, count))
+            except CellTimeout:
+                error = CellTimeout(f'cell {cell.index} (line {cell.lineno}) took longer '
+                                    f'than {timeout} s')
+                status = 'timeout'
+            except (Exception, SystemExit) as e:  # sys.exit() ends the script, not the worker
+                error = e
+                status = status if status != 'ok' else 'error'
+            wall = time.perf_counter() - began
+            streams = [_stream(n, s.getvalue()) for n, s in [('stdout', stdout), ('stderr', stderr)]
+                       if s.getvalue()]
+            outputs[cell.index] = streams + found + ([_error(error, path)] if error else [])
+            counts[cell.index] = count
+            rows.append({'cell': cell.index, 'line': cell.lineno, 'wall': wall,
+                         'error': f'{type(error).__name__}: {error}' if error else None})
+            if error and (stop or status == 'timeout'):
+                break
+    report = {'script': path, 'status': status, 'wall': time.perf_counter() - start,
+              'cells': rows, 'notebook': None}
+    if out:
+        os.makedirs(out, exist_ok=True)
+        notebook = os.path.join(out, os.path.splitext(os.path.basename(path))[0] + '.ipynb')
+        with open(notebook, 'w', encoding='utf-8') as f:
+            json.dump(cells.notebook(parsed, {**outputs, 'count': counts}, cells.metadata(text)),
+                      f, indent=1, ensure_ascii=False)
+            f.write('\n')
+        report['notebook'] = notebook
+    return report
+
+
+def run(paths, workers=None, timeout=None, out=None, stop=True, verbose=True):
+    """
+    Run scripts in parallel, each in a fresh, pre-warmed worker process.
+
+    INPUTS:
+    paths   : the scripts
+    workers : worker processes (default: one per CPU, at most one per script)
+    timeout : seconds allowed per cell
+    out     : directory for the executed notebooks (relative paths are
+              relative to the current directory, not the scripts')
+    stop    : skip the rest of a script after a cell fails
+    verbose : print a line per script as it finishes
+
+    OUTPUT:
+    A list of the reports of run_script, in the order of `paths`. A
+    script whose worker died (e.g. killed for memory) has status 'crashed'.
+    """
+    paths = [os.path.abspath(p) for p in paths]
+    out = os.path.abspath(out) if out else None
+    workers = min(workers or os.cpu_count() or 1, len(paths)) or 1
+    reports = {}
+
+    def collect(batch, n):
+        with ProcessPoolExecutor(n, mp_context=_context(), initializer=_warm,
+                                 max_tasks_per_child=1) as pool:
+            futures = {pool.submit(run_script, p, timeout, out, stop): p for p in batch}
+            for future in as_completed(futures):
+                try:
+                    reports[futures[future]] = future.result()
+                except BrokenProcessPool:
+                    continue
+                if verbose:
+                    print(_format(reports[futures[future]]))
+
+    collect(paths, workers)
+    # a worker that dies (e.g. killed for memory) takes the others' scripts
+    # with it: rerun those one at a time to find the culprit
+    for path in [p for p in paths if p not in reports]:
+        collect([path], 1)
+        if path not in reports:
+            reports[path] = {'script': path, 'status': 'crashed', 'wall': None, 'cells': [],
+                             'notebook': None}
+            if verbose:
+                print(_format(reports[path]))
+    return [reports[p] for p in paths]
+
+
+def _format(report):
+    name = os.path.basename(report['script'])
+    if report['status'] == 'crashed':
+        return f'{name:<28} crashed (the worker process died)'
+    line = f"{name:<28} {report['status']:<8} {report['wall']:8.2f} s  {len(report['cells'])} cells"
+    failed = [c for c in report['cells'] if c['error']]
+    if failed:
+        line += f"  line {failed[0]['line']}: {failed[0]['error']}"
+        if len(failed) > 1:
+            line += f' (and {len(failed) - 1} more)'
+    return line
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run py:percent scripts headless, in parallel')
+    parser.add_argument('scripts', nargs='+')
+    parser.add_argument('--workers', type=int, help='worker processes (default: CPUs)')
+    parser.add_argument('--timeout', type=float, help='seconds allowed per cell')
+    parser.add_argument('--out', help='write executed notebooks to this directory')
+    parser.add_argument('--keep-going', action='store_true', help="don't stop a script at errors")
+    args = parser.parse_args()
+    reports = run(args.scripts, args.workers, args.timeout, args.out, stop=not args.keep_going)
+    failed = [r for r in reports if r['status'] != 'ok']
+    if failed:
+        raise SystemExit(f'{len(failed)} of {len(reports)} script(s) failed')
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Hand DataFrame columns between processes through shared memory.
+
+`to_shared(df)` copies each numeric/bool/datetime column of a frame into its
+own `multiprocessing.shared_memory` segment and returns a small, picklable
+handle. Another process passes the handle to `attach` (zero-copy views) or
+`from_shared` (an ordinary DataFrame). Only the handle travels through the
+pipe, so the column data is never pickled. Categorical columns share their
+codes and pickle their categories, nullable (Int64, Float64, boolean)
+columns share their values and mask. Object columns (strings), other
+extension arrays and the index are small enough in practice and are
+pickled with the handle, keeping their dtype.
+"""
+
+#%% preamble
+
+from contextlib import contextmanager
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+import pandas as pd
+from pandas.api.extensions import ExtensionArray
+
+_MASKED = (pd.arrays.IntegerArray, pd.arrays.FloatingArray, pd.arrays.BooleanArray)
+
+#%% Segments
+
+
+def _untrack(shm):
+    # Ownership of the segment passes to whoever unlinks it, so the creating
+    # (or attaching) process must not remove it when it exits
+    try:
+        resource_tracker.unregister(shm._name, 'shared_memory')
+    except Exception:
+        pass
+
+
+def _shareable(values):
+    return isinstance(values, np.ndarray) and values.dtype.kind in 'biufcmM'
+
+
+def _share(values, track):
+    shm = shared_memory.SharedMemory(create=True, size=values.nbytes)
+    np.ndarray(values.shape, dtype=values.dtype, buffer=shm.buf)[:] = values
+    if not track:
+        _untrack(shm)
+    shm.close()
+    return shm.name, values.dtype.str, len(values)
+
+
+def to_shared(df, track=False):
+    """
+    Copy the columns of `df` into shared memory segments.
+
+    INPUTS:
+    df    : a DataFrame
+    track : if False (the default) the segments outlive this process and
+            must be released by the receiver (`from_shared`, `release`)
+
+    OUTPUT:
+    A picklable handle (a dict)
+    """
+    columns = []
+    for name in df.columns:
+        array = df[name].array
+        if isinstance(array, pd.Categorical) and len(df):
+            columns.append((name, 'category', _share(array.codes, track) + (array.dtype,)))
+            continue
+        if isinstance(array, _MASKED) and len(df):
+            # a nullable column: its values and its mask, each in a segment
+            mask = _share(array._mask, track)[0]
+            columns.append((name, 'masked', _share(array._data, track) + (mask, array.dtype)))
+            continue
+        if isinstance(df[name].dtype, np.dtype):
+            values = df[name].to_numpy()
+        else:
+            values = array  # keeps the dtype (e.g. str, Int64, datetime with a time zone)
+        if not _shareable(values) or values.nbytes == 0:
+            columns.append((name, 'pickle', values))
+            continue
+        columns.append((name, 'shm', _share(values, track)))
+    return {'index': df.index, 'columns': columns}
+
+
+def segments(handle):
+    out = []
+    for _, kind, payload in handle['columns']:
+        if kind != 'pickle':
+            out.append(payload[0])
+        if kind == 'masked':
+            out.append(payload[3])
+    return out
+
+
+def _open(handle, readonly):
+    """The columns of a handle as arrays over its segments, and the segments"""
+    opened, views = [], {}
+    try:
+        for name, kind, payload in handle['columns']:
+            if kind == 'pickle':
+                views[name] = payload
+                continue
+            seg, dtype, length = payload[:3]
+            shm = shared_memory.SharedMemory(name=seg)
+            _untrack(shm)
+            opened.append(shm)
+            view = np.ndarray((length,), dtype=np.dtype(dtype), buffer=shm.buf)
+            view.flags.writeable = not readonly
+            if kind == 'category':
+                view = pd.Categorical.from_codes(view, dtype=payload[3], validate=False)
+            elif kind == 'masked':
+                shm = shared_memory.SharedMemory(name=payload[3])
+                _untrack(shm)
+                opened.append(shm)
+                mask = np.ndarray((length,), dtype=bool, buffer=shm.buf)
+                mask.flags.writeable = not readonly
+                view = payload[4].construct_array_type()(view, mask, copy=False)
+            views[name] = view
+    except BaseException:
+        views.clear()
+        close(opened)
+        raise
+    return views, opened
+
+
+def close(opened):
+    """Close segments, unless arrays over them are still around (they then close with those)"""
+    for shm in opened:
+        try:
+            shm.close()
+        except BufferError:
+            pass
+
+
+@contextmanager
+def attach(handle, readonly=True):
+    """
+    Zero-copy access to the columns of a handle, as a dict of numpy arrays
+    (pandas arrays for categorical and nullable columns).
+    The arrays are only valid inside the `with` block.
+    """
+    views, opened = _open(handle, readonly)
+    try:
+        yield views
+    finally:
+        views.clear()
+        close(opened)
+
+
+def view(handle):
+    """
+    A read-only DataFrame over the segments of a handle, without copying
+    the shared columns, and the segments it uses. Keep those open as long
+    as the frame is used; `close` them afterwards.
+    """
+    views, opened = _open(handle, readonly=True)
+    return pd.DataFrame(views, index=handle['index'], copy=False), opened
+
+
+def release(handle):
+    """Remove the shared memory segments of a handle"""
+    for seg in segments(handle):
+        try:
+            shm = shared_memory.SharedMemory(name=seg)
+        except FileNotFoundError:
+            continue
+        shm.close()
+        shm.unlink()
+
+
+def from_shared(handle, unlink=True):
+    """
+    Build a DataFrame from a handle with a single copy of each column, then
+    (by default) remove the segments.
+    """
+    with attach(handle) as views:
+        data = {name: values.copy() if isinstance(values, ExtensionArray) else np.array(values)
+                for name, values in views.items()}
+    if unlink:
+        release(handle)
+    return pd.DataFrame(data, index=handle['index'], copy=False)
@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Named DataFrames in shared memory, for processes that use the same datasets.
+
+Workers that each read gapminder.tsv and titanic.csv hold a copy of them
+apiece. With a store, one process puts a frame in once, its columns going
+into `multiprocessing.shared_memory` segments (see shmframe.py), and every
+other process gets it by name as a read-only DataFrame over those same
+segments, without copying them:
+
+    python shmstore.py put gapminder data/gapminder.tsv --categorize
+    python shmstore.py put titanic data/titanic.csv
+    python shmstore.py list
+
+and then, in each worker,
+
+    from shmstore import Store
+    gapminder = Store().get('gapminder')
+    gapminder.groupby('continent')['lifeExp'].mean()
+
+The catalog is a directory (one pickled entry per frame, guarded by a file
+lock) with the shmframe handle of each frame and the pids of the
+processes holding it. `get` adds a reference and `release` drops it; a
+frame goes when nobody holds it any more, so its segments are removed when
+the last process using it releases it or exits. Frames put from the
+command line are pinned and stay until dropped. The entries of processes
+that died without exiting cleanly are pruned by the next process to use
+the catalog (or by `python shmstore.py collect`).
+
+Only numeric, bool, datetime, categorical and nullable (Int64, Float64,
+boolean) columns are shared. String columns and the index are pickled in
+the entry and so copied by each process; `--categorize` (categorize=True)
+turns repetitive string columns such as gapminder's country and continent
+into categoricals, which share their codes.
+"""
+
+#%% preamble
+
+import argparse
+import atexit
+import collections
+import fcntl
+import os
+import pickle
+import re
+import tempfile
+import time
+import uuid
+from contextlib import contextmanager
+
+import pandas as pd
+
+import shmframe
+
+CATALOG = os.path.join(tempfile.gettempdir(), f'dfstore-{os.getuid()}')
+
+_NAME = re.compile(r'^\w[\w.-]*$')
+
+#%% Store
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def categorical(df, max_ratio=0.5):
+    """df with its string columns made categorical where values repeat enough"""
+    out = {}
+    for name in df.columns:
+        values = df[name]
+        if (pd.api.types.is_string_dtype(values.dtype) or values.dtype == object) and \
+                not isinstance(values.dtype, pd.CategoricalDtype) and \
+                values.nunique() <= max_ratio * len(values):
+            values = values.astype('category')
+        out[name] = values
+    return pd.DataFrame(out, index=df.index)
+
+
+class Store:
+    """
+    DataFrames in shared memory by name, for all the processes using the
+    same catalog.
+
+    directory : the catalog
+    """
+
+    def __init__(self, directory=CATALOG):
+        self.directory = os.path.abspath(directory)
+        os.makedirs(self.directory, mode=0o700, exist_ok=True)
+        self._pid = os.getpid()
+        self._held = collections.Counter()  # (name, id) -> references of this process
+        self._open = {}  # (name, id) -> segments of the frames returned by get
+        atexit.register(self.close)
+
+    def _path(self, name):
+        if not _NAME.match(name):
+            raise ValueError(f'invalid name {name!r}')
+        return os.path.join(self.directory, name + '.pkl')
+
+    def _owner(self):
+        # a forked child holds none of its parent's references
+        if os.getpid() != self._pid:
+            self._pid = os.getpid()
+            self._held.clear()
+            self._open = {}
+
+    @contextmanager
+    def _locked(self):
+        with open(os.path.join(self.directory, '.lock'), 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _read(self, name):
+        try:
+            with open(self._path(name), 'rb') as f:
+                return pickle.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _write(self, name, entry):
+        path = self._path(name)
+        with open(path + '.tmp', 'wb') as f:
+            pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(path + '.tmp', path)
+
+    def _remove(self, name, entry):
+        shmframe.release(entry['handle'])
+        os.remove(self._path(name))
+
+    def _live(self, name):
+        """The entry of name with dead holders pruned, None if it is gone (call locked)"""
+        entry = self._read(name)
+        if entry is None:
+            return None
+        holders = [pid for pid in entry['holders'] if _alive(pid)]
+        if not holders and not entry['pinned']:
+            self._remove(name, entry)
+            return None
+        if holders != entry['holders']:
+            entry['holders'] = holders
+            self._write(name, entry)
+        return entry
+
+    def names(self):
+        return sorted(f[:-4] for f in os.listdir(self.directory) if f.endswith('.pkl'))
+
+    def __contains__(self, name):
+        with self._locked():
+            return self._live(name) is not None
+
+    def put(self, name, df, pin=False, replace=False, categorize=False):
+        """
+        Copy a DataFrame into shared memory under a name.
+
+        INPUTS:
+        name       : letters, digits, '_', '.' and '-'
+        df         : the DataFrame
+        pin        : keep it until dropped, rather than until no process holds it
+                     (otherwise this process holds a reference, as after `get`)
+        replace    : replace a frame already under the name (processes using
+                     it keep their views); otherwise that is a ValueError
+        categorize : make repetitive string columns categorical, so that they
+                     are shared too (see `categorical`)
+        """
+        self._owner()
+        self._path(name)
+        if categorize:
+            df = categorical(df)
+        handle = shmframe.to_shared(df)
+        try:
+            with self._locked():
+                old = self._live(name)
+                if old is not None:
+                    if not replace:
+                        raise ValueError(f'{name!r} is already in the store')
+                    self._remove(name, old)
+                entry = {'id': uuid.uuid4().hex, 'handle': handle, 'shape': df.shape,
+                         'shared': sum(df[c].memory_usage(index=False)
+                                       for c, kind, _ in handle['columns'] if kind != 'pickle'),
+                         'bytes': int(df.memory_usage(index=True, deep=True).sum()),
+                         'holders': [] if pin else [os.getpid()], 'pinned': pin,
+                         'created': time.time()}
+                self._write(name, entry)
+        except BaseException:
+            shmframe.release(handle)
+            raise
+        if not pin:
+            self._held[name, entry['id']] += 1
+
+    def get(self, name):
+        """
+        The frame under a name, as a read-only DataFrame over its shared
+        memory (KeyError if there is none). This process holds a reference
+        to it until it calls `release(name)` (once per `get`) or exits.
+        """
+        self._owner()
+        with self._locked():
+            entry = self._live(name)
+            if entry is None:
+                raise KeyError(name)
+            df, opened = shmframe.view(entry['handle'])
+            entry['holders'].append(os.getpid())
+            self._write(name, entry)
+        key = name, entry['id']
+        self._held[key] += 1
+        self._open.setdefault(key, []).extend(opened)
+        return df
+
+    def release(self, name):
+        """
+        Drop a reference of this process to a frame; the frame goes if it
+        was the last. The DataFrames got for it must not be used afterwards.
+        """
+        self._owner()
+        keys = [key for key in self._held if key[0] == name]
+        if not keys:
+            raise KeyError(f'this process holds no reference to {name!r}')
+        key = keys[0]
+        self._held[key] -= 1
+        with self._locked():
+            entry = self._read(name)
+            if entry is not None and entry['id'] == key[1]:
+                if os.getpid() in entry['holders']:
+                    entry['holders'].remove(os.getpid())
+                self._write(name, entry)
+                self._live(name)
+        if not self._held[key]:
+            del self._held[key]
+            shmframe.close(self._open.pop(key, []))
+
+    def drop(self, name):
+        """
+        Remove a frame whoever holds it. Processes that have it can go on
+        using it: the memory is freed when the last of them lets it go.
+        """
+        with self._locked():
+            entry = self._read(name)
+            if entry is None:
+                raise KeyError(name)
+            self._remove(name, entry)
+
+    def collect(self):
+        """Remove the frames whose holders have all died; their names"""
+        removed = []
+        with self._locked():
+            for name in self.names():
+                if self._live(name) is None:
+                    removed.append(name)
+        return removed
+
+    def catalog(self):
+        """A DataFrame with a row per frame: its shape, size and holders"""
+        rows = []
+        with self._locked():
+            for name in self.names():
+                entry = self._live(name)
+                if entry is None:
+                    continue
+                rows.append({'name': name, 'rows': entry['shape'][0],
+                             'columns': entry['shape'][1], 'MB': entry['bytes'] / 2 ** 20,
+                             'shared MB': entry['shared'] / 2 ** 20,
+                             'holders': len(set(entry['holders'])), 'pinned': entry['pinned'],
+                             'created': pd.Timestamp(entry['created'], unit='s')})
+        return pd.DataFrame(rows, columns=['name', 'rows', 'columns', 'MB', 'shared MB',
+                                           'holders', 'pinned', 'created'])
+
+    def close(self):
+        """Release every reference this process holds (done on exit)"""
+        if os.getpid() != self._pid:
+            return
+        for (name, _), count in list(self._held.items()):
+            for _ in range(count):
+                self.release(name)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='DataFrames in shared memory by name')
+    parser.add_argument('--catalog', default=CATALOG, help='catalog directory')
+    commands = parser.add_subparsers(dest='command', required=True)
+    p = commands.add_parser('put', help='read a csv/tsv file into the store (pinned)')
+    p.add_argument('name')
+    p.add_argument('file')
+    p.add_argument('--sep', help='field separator (default: tab for .tsv, else comma)')
+    p.add_argument('--categorize', action='store_true',
+                   help='share repetitive string columns as categoricals')
+    p.add_argument('--replace', action='store_true')
+    commands.add_parser('list', help='show the frames in the store')
+    p = commands.add_parser('drop', help='remove frames')
+    p.add_argument('names', nargs='+')
+    commands.add_parser('collect', help='remove frames whose holders have died')
+    args = parser.parse_args()
+    store = Store(args.catalog)
+    if args.command == 'put':
+        sep = args.sep or ('\t' if args.file.endswith('.tsv') else ',')
+        store.put(args.name, pd.read_csv(args.file, sep=sep), pin=True, replace=args.replace,
+                  categorize=args.categorize)
+    elif args.command == 'drop':
+        for name in args.names:
+            store.drop(name)
+    elif args.command == 'collect':
+        for name in store.collect():
+            print(f'removed {name}')
+    if args.command in ('put', 'list'):
+        print(store.catalog().to_string(index=False, float_format='{:.2f}'.format))
@@ -0,0 +1,501 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Mergeable summaries for data that is too big, or arrives too slowly, to
+sort or count in full.
+
++ `Moments`     : count, mean, variance, min and max, updated in batches
++ `KLL`         : a KLL quantile sketch. It keeps about 3k values whatever
+                  the input size, and quantiles are accurate to about
+                  `rank_error()` of the data (1.7% of ranks at k = 200)
++ `HyperLogLog` : distinct counts in 2**p bytes, with relative standard
+                  error `error()` (0.8% at p = 14)
++ `CountMin`    : approximate value counts and the most frequent values;
+                  counts are over by at most `error()` (eps * rows)
++ `GroupedSummary` : one Moments and one KLL per group, giving an
+                     approximate `groupby(...).describe()`
+
+All of them can be built on separate chunks or processes and combined
+with `merge` (values are hashed so that a column read as int in one chunk
+and as float in another, because of a missing value, counts the same), so
+
+    summary = GroupedSummary()
+    for chunk in pd.read_csv('data/gapminder.tsv', sep = '\\t', chunksize = 100000):
+        summary.update(chunk['continent'], chunk['lifeExp'])
+    summary.describe()
+
+gives the same table as `df.groupby('continent')['lifeExp'].describe()`
+with exact counts, means, standard deviations, minima and maxima, and
+approximate quartiles. For a frame in memory, the approx_* functions
+stand in for the exact calls:
+
+    approx_nunique(df['country'])           # len(df['country'].unique())
+    approx_value_counts(df['continent'])    # df['continent'].value_counts()
+    approx_quantile(df['lifeExp'], 0.5)     # df['lifeExp'].median()
+    approx_describe(df)                     # df.describe()
+"""
+
+#%% preamble
+
+import numpy as np
+import pandas as pd
+
+#%% Moments
+
+
+class Moments:
+    """Count, mean, sum of squared deviations, min and max of a stream"""
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float).ravel()
+        values = values[~np.isnan(values)]
+        if len(values):
+            other = Moments()
+            other.n = len(values)
+            other.mean = values.mean()
+            other.m2 = ((values - other.mean) ** 2).sum()
+            other.min = values.min()
+            other.max = values.max()
+            self.merge(other)
+        return self
+
+    def merge(self, other):
+        """Combine with another Moments (Chan et al.'s parallel formula)"""
+        if other.n == 0:
+            return self
+        n = self.n + other.n
+        delta = other.mean - self.mean
+        self.m2 += other.m2 + delta * delta * self.n * other.n / n
+        self.mean += delta * other.n / n
+        self.n = n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def var(self, ddof=1):
+        return self.m2 / (self.n - ddof) if self.n > ddof else np.nan
+
+    def std(self, ddof=1):
+        return np.sqrt(self.var(ddof))
+
+
+#%% KLL quantile sketch
+
+
+class KLL:
+    """
+    A KLL quantile sketch (Karnin, Lang and Liberty, 2016).
+
+    INPUTS:
+    k    : accuracy parameter; memory is about 3k values and the rank
+           error about 3.3 / k
+    seed : seed for the random choices made when compacting
+
+    Values are kept in levels; a value at level h stands for 2**h input
+    values. When a level is full it is sorted and every other value
+    (starting at a random offset) moves up a level.
+    """
+
+    def __init__(self, k=200, seed=None):
+        self.k = k
+        self.n = 0
+        self.min = np.inf
+        self.max = -np.inf
+        self.levels = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(2, int(np.ceil(self.k * (2 / 3) ** depth)))
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(items)
+                keep = items[:len(items) % 2]  # an odd value out stays here
+                items = items[len(keep):]
+                promoted = items[self._rng.integers(2)::2]
+                self.levels[level] = keep
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            level += 1
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float).ravel()
+        values = values[~np.isnan(values)]
+        if len(values):
+            self.n += len(values)
+            self.min = min(self.min, values.min())
+            self.max = max(self.max, values.max())
+            self.levels[0] = np.concatenate([self.levels[0], values])
+            self._compress()
+        return self
+
+    def merge(self, other):
+        if other.k != self.k:
+            raise ValueError('can only merge sketches with the same k')
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for h, items in enumerate(other.levels):
+            self.levels[h] = np.concatenate([self.levels[h], items])
+        self.n += other.n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+        return self
+
+    def rank_error(self):
+        """Approximate normalized rank error (at about 99% confidence)"""
+        return 0.0 if self.n <= self.k else 3.3 / self.k
+
+    def quantiles(self, qs):
+        """Approximate quantiles; q = 0 and q = 1 give the exact min and max"""
+        qs = np.atleast_1d(np.asarray(qs, dtype=float))
+        if self.n == 0:
+            return np.full(len(qs), np.nan)
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items), 2.0 ** h)
+                                  for h, items in enumerate(self.levels)])
+        order = np.argsort(values)
+        values, cum = values[order], np.cumsum(weights[order])
+        if self.n <= self.k:
+            # nothing has been compacted: interpolate like np.quantile
+            return np.quantile(values, qs)
+        pos = np.searchsorted(cum, qs * cum[-1], side='left')
+        out = values[np.minimum(pos, len(values) - 1)]
+        out[qs <= 0] = self.min
+        out[qs >= 1] = self.max
+        return out
+
+    def quantile(self, q):
+        return self.quantiles([q])[0]
+
+
+#%% Hashing
+
+
+_NUMBERS = (int, float, np.integer, np.floating, np.bool_)
+
+
+def _number_hashes(x):
+    """Hashes of a numeric array that agree for equal numbers of any dtype"""
+    if x.dtype.kind in 'biu' and x.dtype != np.uint64:
+        return pd.util.hash_array(x.astype(np.int64))
+    if x.dtype.kind != 'f':
+        return pd.util.hash_array(x)
+    # whole floats are hashed as the int they equal (-0.0 as 0 too)
+    x = x.astype(np.float64)
+    with np.errstate(invalid='ignore'):
+        whole = (np.trunc(x) == x) & (np.abs(x) < 2.0 ** 63)
+    h = pd.util.hash_array(x)
+    h[whole] = pd.util.hash_array(x[whole].astype(np.int64))
+    return h
+
+
+def hash_values(values, exact=False):
+    """
+    64-bit hashes of a numpy array of non-missing values, alike for values
+    that compare equal: numbers by value whatever their type (1, 1.0 and
+    True; 0.0 and -0.0), so that chunks of a column parsed as int and as
+    float agree, and strings by their text. In object arrays other values
+    are hashed by type and repr, so that 1, '1' and (1,) all differ; with
+    exact = True, None is returned for those instead, as equal objects may
+    have different reprs.
+    """
+    if values.dtype.kind in 'biuf':
+        return _number_hashes(values)
+    if values.dtype.kind == 'c':
+        values = values + 0  # -0.0 parts equal 0.0 but hash differently
+    if values.dtype != object:
+        return pd.util.hash_array(values)
+    if pd.api.types.infer_dtype(values, skipna=False) == 'string':
+        return pd.util.hash_array(values, categorize=False)
+    h = np.empty(len(values), dtype=np.uint64)
+    string = np.fromiter((isinstance(v, str) for v in values), dtype=bool, count=len(values))
+    number = np.fromiter((isinstance(v, _NUMBERS) for v in values), dtype=bool,
+                         count=len(values))
+    h[string] = pd.util.hash_array(values[string], categorize=False)
+    numbers = np.array(values[number].tolist())
+    if numbers.dtype == object:  # ints too big for int64 among floats
+        number[:] = False
+    else:
+        h[number] = _number_hashes(numbers)
+    other = ~(string | number)
+    if other.any():
+        if exact:
+            return None
+        tagged = np.array([f'{type(v).__qualname__}\x00{v!r}' for v in values[other]], dtype=object)
+        h[other] = pd.util.hash_array(tagged, categorize=False)
+    return h
+
+
+def _hashes(values):
+    """
+    64-bit hashes of the non-missing values of a column (see hash_values),
+    and those values. A categorical column is hashed through its
+    categories: one hash per category, looked up by code.
+    """
+    if isinstance(values, pd.Series):
+        values = values.array
+    if isinstance(values, pd.Categorical):
+        codes = values.codes
+        codes = codes[codes >= 0]
+        return hash_values(values.categories.to_numpy())[codes], values.categories.take(codes)
+    values = pd.array(values) if not isinstance(values, pd.api.extensions.ExtensionArray) else values
+    values = values[~pd.isna(values)]
+    return hash_values(np.asarray(values, dtype=object) if values.dtype == object
+                       else values.to_numpy()), values
+
+
+#%% HyperLogLog
+
+
+class HyperLogLog:
+    """
+    A HyperLogLog distinct-value counter (Flajolet et al., 2007).
+
+    INPUTS:
+    p : 2**p registers of one byte; the relative standard error is
+        1.04 / sqrt(2**p)
+
+    Missing values are not counted, as in `nunique()`.
+    """
+
+    def __init__(self, p=14):
+        self.p = p
+        self.registers = np.zeros(1 << p, dtype=np.uint8)
+
+    def update(self, values):
+        h, _ = _hashes(values)
+        self.add_hashes(h)
+        return self
+
+    def add_hashes(self, h):
+        bits = 64 - self.p
+        bucket = (h >> np.uint64(bits)).astype(np.intp)
+        rest = (h & np.uint64((1 << bits) - 1)).astype(float)  # exact below 2**53
+        # position of the leftmost 1 bit among the remaining bits
+        rank = (bits + 1 - np.frexp(rest)[1]).astype(np.uint8)
+        np.maximum.at(self.registers, bucket, rank)
+        return self
+
+    def merge(self, other):
+        if other.p != self.p:
+            raise ValueError('can only merge counters with the same p')
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def count(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(2.0 ** -self.registers.astype(float))
+        zeros = np.count_nonzero(self.registers == 0)
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * np.log(m / zeros)  # linear counting for small counts
+        return int(round(estimate))
+
+    def error(self):
+        """Relative standard error of count()"""
+        return 1.04 / np.sqrt(len(self.registers))
+
+
+#%% Count-min sketch
+
+
+class CountMin:
+    """
+    A count-min sketch (Cormode and Muthukrishnan, 2005) that also keeps
+    the most frequent values.
+
+    INPUTS:
+    eps   : counts are over by at most eps * (rows seen) ...
+    delta : ... except with probability delta
+    top   : number of frequent values kept as candidates
+    seed  : seed for the hash functions
+
+    The table has ceil(e / eps) columns and ceil(ln(1 / delta)) rows.
+    """
+
+    def __init__(self, eps=1e-4, delta=1e-3, top=100, seed=25):
+        self.eps, self.delta, self.top = eps, delta, top
+        self.width = int(np.ceil(np.e / eps))
+        self.depth = int(np.ceil(np.log(1 / delta)))
+        self.table = np.zeros((self.depth, self.width), dtype=np.int64)
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, 2 ** 62, self.depth, dtype=np.int64).astype(np.uint64) * np.uint64(2) + np.uint64(1)
+        self.n = 0
+        self.candidates = {}  # value -> hash
+
+    def _columns(self, h):
+        with np.errstate(over='ignore'):
+            return [((a * h) >> np.uint64(32)) % np.uint64(self.width) for a in self._a]
+
+    def update(self, values):
+        h, values = _hashes(values)
+        self.n += len(h)
+        uniq, first, counts = np.unique(h, return_index=True, return_counts=True)
+        for row, cols in enumerate(self._columns(uniq)):
+            self.table[row] += np.bincount(cols.astype(np.intp), weights=counts,
+                                           minlength=self.width).astype(np.int64)
+        # the chunk's own most frequent values become candidates
+        best = np.argsort(-counts, kind='stable')[:self.top]
+        for i in best:
+            self.candidates.setdefault(values[first[i]], uniq[i])
+        self._prune()
+        return self
+
+    def _prune(self):
+        if len(self.candidates) > self.top:
+            keys = list(self.candidates)
+            est = self.query_hashes(np.array(list(self.candidates.values()), dtype=np.uint64))
+            keep = np.argsort(-est, kind='stable')[:self.top]
+            self.candidates = {keys[i]: self.candidates[keys[i]] for i in keep}
+
+    def merge(self, other):
+        if (other.width, other.depth) != (self.width, self.depth) or \
+                not np.array_equal(other._a, self._a):
+            raise ValueError('can only merge sketches with the same eps, delta and seed')
+        self.table += other.table
+        self.n += other.n
+        for value, h in other.candidates.items():
+            self.candidates.setdefault(value, h)
+        self._prune()
+        return self
+
+    def query_hashes(self, h):
+        rows = self._columns(np.asarray(h, dtype=np.uint64))
+        return np.min([self.table[r][cols.astype(np.intp)] for r, cols in enumerate(rows)], axis=0)
+
+    def query(self, values):
+        """Estimated counts of some values (never below the true counts)"""
+        values = pd.array(np.atleast_1d(np.asarray(values, dtype=object)))
+        return self.query_hashes(_hashes(values)[0])
+
+    def most_common(self, n=10):
+        """The n most frequent values with their estimated counts, as value_counts() does"""
+        keys = list(self.candidates)
+        est = self.query_hashes(np.array(list(self.candidates.values()), dtype=np.uint64))
+        order = np.argsort(-est, kind='stable')[:n]
+        return pd.Series(est[order], index=pd.Index([keys[i] for i in order]), name='count')
+
+    def error(self):
+        """Upper bound on the overcount of any value (holds with probability 1 - delta)"""
+        return self.eps * self.n
+
+
+#%% Grouped summaries
+
+
+class GroupedSummary:
+    """
+    Mergeable per-group Moments and KLL sketches: an approximate
+    `groupby(key)[column].describe()` that can be built chunk by chunk.
+    """
+
+    def __init__(self, k=200, seed=None):
+        self.k = k
+        self.seed = seed
+        self.groups = {}
+
+    def _group(self, key):
+        if key not in self.groups:
+            self.groups[key] = (Moments(), KLL(self.k, self.seed))
+        return self.groups[key]
+
+    def _update_sorted(self, keys, values, offsets):
+        for key, s, e in zip(keys, offsets[:-1], offsets[1:]):
+            moments, sketch = self._group(key)
+            moments.update(values[s:e])
+            sketch.update(values[s:e])
+
+    def update(self, keys, values):
+        """Add a chunk of (group key, value) pairs"""
+        codes, uniques = pd.factorize(pd.Series(keys).to_numpy())
+        values = np.asarray(values, dtype=float)
+        valid = np.flatnonzero(codes >= 0)
+        order = valid[np.argsort(codes[valid], kind='stable')]
+        counts = np.bincount(codes[valid], minlength=len(uniques))
+        self._update_sorted(uniques, values[order], np.concatenate(([0], np.cumsum(counts))))
+        return self
+
+    @classmethod
+    def from_index(cls, values, index, k=200, seed=None):
+        """Build from a column and a groupindex.GroupIndex"""
+        summary = cls(k, seed)
+        values = np.asarray(values, dtype=float)[index.order]
+        summary._update_sorted(index.groups, values, index.offsets)
+        return summary
+
+    def merge(self, other):
+        for key, (moments, sketch) in other.groups.items():
+            mine = self._group(key)
+            mine[0].merge(moments)
+            mine[1].merge(sketch)
+        return self
+
+    def describe(self, percentiles=(0.25, 0.5, 0.75), name=None):
+        """The describe() table, with groups in sorted order"""
+        keys = sorted(self.groups)
+        rows = []
+        for key in keys:
+            moments, sketch = self.groups[key]
+            qs = sketch.quantiles(percentiles)
+            rows.append([moments.n, moments.mean if moments.n else np.nan, moments.std(),
+                         moments.min if moments.n else np.nan] + list(qs)
+                        + [moments.max if moments.n else np.nan])
+        columns = (['count', 'mean', 'std', 'min'] + [f'{q * 100:g}%' for q in percentiles]
+                   + ['max'])
+        out = pd.DataFrame(rows, index=pd.Index(keys, name=name), columns=columns)
+        out['count'] = out['count'].astype(float)
+        return out
+
+    def rank_error(self):
+        return max((s.rank_error() for _, s in self.groups.values()), default=0.0)
+
+
+#%% On frames
+
+
+def approx_nunique(obj, p=14):
+    """Approximate `nunique()` of a Series, or of every column of a DataFrame"""
+    if isinstance(obj, pd.DataFrame):
+        return pd.Series({c: approx_nunique(obj[c], p) for c in obj.columns}, dtype=np.int64)
+    return HyperLogLog(p).update(obj).count()
+
+
+def approx_value_counts(series, n=10, eps=1e-4, delta=1e-3):
+    """The approximate n most frequent values of a Series and their counts"""
+    sketch = CountMin(eps, delta, top=max(100, 10 * n)).update(series)
+    out = sketch.most_common(n)
+    out.index.name = series.name
+    return out
+
+
+def approx_quantile(series, q=0.5, k=200):
+    """Approximate quantile(s) of a numeric Series"""
+    sketch = KLL(k).update(series.to_numpy(dtype=float, na_value=np.nan))
+    return sketch.quantile(q) if np.isscalar(q) else pd.Series(sketch.quantiles(q), index=q,
+                                                               name=series.name)
+
+
+def approx_describe(df, percentiles=(0.25, 0.5, 0.75), k=200):
+    """`df.describe()` of the numeric columns, with approximate percentiles"""
+    columns = [c for c in df.columns if df[c].dtype.kind in 'iuf']
+    out = {}
+    for c in columns:
+        values = df[c].to_numpy(dtype=float, na_value=np.nan)
+        moments, sketch = Moments().update(values), KLL(k).update(values)
+        out[c] = ([float(moments.n), moments.mean if moments.n else np.nan, moments.std(),
+                   sketch.quantile(0)] + list(sketch.quantiles(percentiles)) + [sketch.quantile(1)])
+    index = ['count', 'mean', 'std', 'min'] + [f'{q * 100:g}%' for q in percentiles] + ['max']
+    return pd.DataFrame(out, index=index)
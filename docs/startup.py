@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Start short scripts faster.
+
+Running `python pd_sac.py` spends a good part of its time before the
+first line of the recipe: importing numpy and pandas (and
+matplotlib.pyplot in python_primer.py) and compiling the script, whose
+bytecode Python never caches since it runs as __main__. Running it as
+
+    python startup.py pd_sac.py [args...]
+
+instead
+
++ imports the heavy modules lazily: `import pandas as pd` binds `pd` at
+  once, and pandas is only loaded when an attribute of it is first used
+  (importlib.util.LazyLoader), so a script that imports it but doesn't
+  get that far doesn't pay for it. `from pandas import DataFrame` still
+  loads pandas straight away, and a submodule (matplotlib.pyplot) loads
+  its package.
++ runs the script from bytecode cached in __pycache__, as for modules;
+  `python startup.py --compile *.py` compiles them all ahead of time
+
+To see where the time goes, `--profile` runs a script twice in fresh
+interpreters with `-X importtime`, directly and through startup.py, and
+prints the wall time, total import time and the slowest imports of each:
+
+    python startup.py --profile pd_extract.py
+"""
+
+#%% preamble
+
+import argparse
+import importlib.abc
+import importlib.util
+import marshal
+import os
+import py_compile
+import re
+import subprocess
+import sys
+import time
+import types
+
+# only the standard library is imported here: the point is not to load more
+
+LAZY = ('numpy', 'pandas', 'matplotlib.pyplot', 'scipy', 'seaborn', 'statsmodels.api')
+
+#%% Lazy imports
+
+
+class LazyFinder(importlib.abc.MetaPathFinder):
+    """Finds some modules as usual, but with a loader that runs them on first use"""
+
+    def __init__(self, names=LAZY):
+        self.names = set(names)
+
+    def find_spec(self, name, path, target=None):
+        if name not in self.names:
+            return None
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, 'find_spec'):
+                continue
+            spec = finder.find_spec(name, path, target)
+            if spec is not None:
+                if spec.loader is not None and hasattr(spec.loader, 'exec_module'):
+                    spec.loader = importlib.util.LazyLoader(spec.loader)
+                return spec
+        return None
+
+
+def install(names=LAZY):
+    """Import these modules lazily from now on (those already imported stay as they are)"""
+    finder = LazyFinder(names)
+    sys.meta_path.insert(0, finder)
+    return finder
+
+
+def uninstall(finder):
+    sys.meta_path.remove(finder)
+
+
+#%% Cached bytecode
+
+
+def _pyc(path):
+    return importlib.util.cache_from_source(path)
+
+
+def compile_script(path):
+    """Write the bytecode of a script to __pycache__; the path of the .pyc"""
+    return py_compile.compile(path, cfile=_pyc(path), doraise=True,
+                              invalidation_mode=py_compile.PycInvalidationMode.TIMESTAMP)
+
+
+def code(path):
+    """
+    The code object of a script, from __pycache__ if it is up to date
+    (the .pyc records the source's mtime and size), else compiled and cached
+    """
+    path = os.path.abspath(path)
+    st = os.stat(path)
+    try:
+        with open(_pyc(path), 'rb') as f:
+            data = f.read()
+        if data[:4] == importlib.util.MAGIC_NUMBER and \
+                int.from_bytes(data[4:8], 'little') == 0 and \
+                int.from_bytes(data[8:12], 'little') == int(st.st_mtime) & 0xFFFFFFFF and \
+                int.from_bytes(data[12:16], 'little') == st.st_size & 0xFFFFFFFF:
+            return marshal.loads(data[16:])
+    except (OSError, ValueError, EOFError):
+        pass
+    try:
+        compile_script(path)
+    except OSError:  # e.g. a read-only directory: just compile
+        pass
+    with open(path, 'rb') as f:
+        return compile(f.read(), path, 'exec', dont_inherit=True)
+
+
+def run(path, argv=(), lazy=LAZY):
+    """Run a script as __main__, as `python path argv...` would, with lazy imports"""
+    path = os.path.abspath(path)
+    if lazy:
+        install(lazy)
+    sys.argv = [path, *argv]
+    sys.path[0] = os.path.dirname(path)
+    script = code(path)
+    main = types.ModuleType('__main__')
+    main.__file__, main.__cached__ = path, _pyc(path)
+    sys.modules['__main__'] = main  # so that pickle finds the script's functions
+    exec(script, main.__dict__)
+
+
+#%% Import time profile
+
+_IMPORTTIME = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S.*)$')
+
+
+def importtime(text):
+    """
+    Parse `-X importtime` output: a list of dicts with the module, its own
+    and cumulative import time in seconds, and its depth in the import tree
+    (0: imported by the script itself)
+    """
+    out = []
+    for line in text.splitlines():
+        m = _IMPORTTIME.match(line)
+        if m:
+            out.append({'module': m.group(4), 'self': int(m.group(1)) / 1e6,
+                        'cumulative': int(m.group(2)) / 1e6,
+                        'depth': (len(m.group(3)) - 1) // 2})
+    return out
+
+
+def profile(path, argv=(), lazy=True):
+    """
+    Run a script in a fresh interpreter with -X importtime.
+
+    INPUTS:
+    path : the script (run from the current directory, as `python path` would)
+    lazy : run it through startup.py
+
+    OUTPUT:
+    A dict with the wall time, the return code, the total import time of
+    the modules imported at the top level, and the imports (see importtime)
+    """
+    command = [sys.executable, '-X', 'importtime']
+    command += [os.path.abspath(__file__), path] if lazy else [path]
+    start = time.perf_counter()
+    proc = subprocess.run(command + list(argv), stdout=subprocess.DEVNULL,
+                          stderr=subprocess.PIPE, text=True)
+    wall = time.perf_counter() - start
+    imports = importtime(proc.stderr)
+    return {'script': path, 'lazy': lazy, 'wall': wall, 'returncode': proc.returncode,
+            'imports': sum(i['cumulative'] for i in imports if i['depth'] == 0),
+            'modules': imports}
+
+
+def report(results, top=10):
+    """Text comparing profile() results: wall and import time, slowest imports"""
+    lines = []
+    for r in results:
+        label = 'startup.py' if r['lazy'] else 'python'
+        lines.append(f"{os.path.basename(r['script'])} via {label}: {r['wall']:.3f} s wall, "
+                     f"{r['imports']:.3f} s importing {len(r['modules'])} modules"
+                     + (f" (exit {r['returncode']})" if r['returncode'] else ''))
+        for m in sorted(r['modules'], key=lambda m: -m['self'])[:top]:
+            lines.append(f"  {m['self'] * 1e3:8.1f} ms self {m['cumulative'] * 1e3:8.1f} ms "
+                         f"cumulative  {'  ' * m['depth']}{m['module']}")
+    return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and not sys.argv[1].startswith('-'):
+        run(sys.argv[1], sys.argv[2:])  # the script gets the rest of the arguments
+    else:
+        parser = argparse.ArgumentParser(description='Start short scripts faster')
+        parser.add_argument('--compile', nargs='+', metavar='SCRIPT',
+                            help='cache the bytecode of scripts')
+        parser.add_argument('--profile', nargs='+', metavar='SCRIPT',
+                            help='compare import times with and without lazy imports')
+        parser.add_argument('--top', type=int, default=10, help='slowest imports to list')
+        args = parser.parse_args()
+        for path in args.compile or []:
+            print(compile_script(path))
+        for path in args.profile or []:
+            print(report([profile(path, lazy=False), profile(path, lazy=True)], args.top))
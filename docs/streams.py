@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Lazy pipelines over files, frames and row chunks.
+
+The primer points out that `range(10)` is an iterator that is only evaluated
+when it is used. `Stream` extends the same idea to data processing: each
+stage (`map`, `filter`, `batch`, `window`, `zip`, ...) wraps the previous
+one in a generator, so nothing is read or computed until the stream is
+iterated, and only a bounded number of items is held in memory at once.
+
+    tables = stream(sorted(glob('data/table*.csv'))).map(pd.read_csv, workers = 4)
+
+    for chunk in files('data/big*.csv').flat_map(csv_chunks(100000)):
+        ...
+
+`map` can fan out to a thread or process pool. At most `buffer` items are in
+flight, so a slow consumer holds back the readers (backpressure), and
+results come out in input order.
+"""
+
+#%% preamble
+
+import itertools
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from glob import glob
+
+import pandas as pd
+
+#%% Parallel map
+
+
+def _pool_map(f, items, workers, kind, buffer):
+    Executor = ThreadPoolExecutor if kind == 'thread' else ProcessPoolExecutor
+    with Executor(max_workers=workers) as pool:
+        pending = deque()
+        for item in items:
+            pending.append(pool.submit(f, item))
+            if len(pending) >= buffer:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def _window(items, size, step):
+    window = deque(maxlen=size)
+    skip = 0
+    for item in items:
+        window.append(item)
+        if len(window) == size:
+            if skip == 0:
+                yield tuple(window)
+                skip = step
+            skip -= 1
+
+
+#%% Stream
+
+
+class Stream:
+    """
+    A lazily evaluated sequence of items with chainable processing stages.
+
+    INPUTS:
+    source : any iterable (list, generator, range, file reader, ...)
+
+    A Stream is iterable, so it can be used in a for-loop, passed to
+    `list()` or unpacked (`a, b = stream(...)`). A Stream built from a
+    generator can only be iterated once, like the generator itself.
+    """
+
+    def __init__(self, source):
+        self._source = source
+
+    def __iter__(self):
+        return iter(self._source)
+
+    def map(self, f, workers=0, kind='thread', buffer=None):
+        """
+        Apply `f` to each item. With workers > 0 the calls run in a pool of
+        that many threads (kind = 'thread') or processes (kind = 'process'),
+        with at most `buffer` (default 2 * workers) items in flight.
+        """
+        if workers <= 0:
+            return Stream(map(f, self._source))
+        if kind not in ('thread', 'process'):
+            raise ValueError("kind must be 'thread' or 'process'")
+        buffer = buffer or 2 * workers
+        return Stream(_pool_map(f, self._source, workers, kind, buffer))
+
+    def flat_map(self, f):
+        """Apply `f` to each item and stream the items of each result"""
+        return Stream(itertools.chain.from_iterable(map(f, self._source)))
+
+    def filter(self, predicate):
+        return Stream(filter(predicate, self._source))
+
+    def batch(self, size):
+        """Group items into lists of `size` (the last one may be shorter)"""
+        def batches(items):
+            items = iter(items)
+            while True:
+                chunk = list(itertools.islice(items, size))
+                if not chunk:
+                    return
+                yield chunk
+        return Stream(batches(self._source))
+
+    def window(self, size, step=1):
+        """Sliding windows (tuples) of `size` consecutive items"""
+        return Stream(_window(self._source, size, step))
+
+    def zip(self, *others):
+        return Stream(zip(self._source, *others))
+
+    def enumerate(self, start=0):
+        return Stream(enumerate(self._source, start))
+
+    def take(self, n):
+        return Stream(itertools.islice(self._source, n))
+
+    def collect(self):
+        return list(self._source)
+
+
+def stream(source):
+    return Stream(source)
+
+
+#%% File sources
+
+
+def files(pattern):
+    """Stream the file names matching a glob pattern, in sorted order"""
+    return Stream(sorted(glob(pattern)))
+
+
+def csv_chunks(chunksize, **kwargs):
+    """
+    A function that turns a file name into a stream of DataFrame chunks of
+    `chunksize` rows, for use with `Stream.flat_map`. Extra arguments are
+    passed to `pd.read_csv`.
+    """
+    def read(filename):
+        with pd.read_csv(filename, chunksize=chunksize, **kwargs) as reader:
+            yield from reader
+    return read
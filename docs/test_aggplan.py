@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import aggplan
+from groupindex import group_index, groupby
+
+
+@pytest.fixture
+def df():
+    rng = np.random.RandomState(0)
+    n = 300
+    return pd.DataFrame({'year': rng.choice([1952, 1957, 2002, 2007], n),
+                         'continent': rng.choice(['Asia', 'Europe', 'Africa'], n),
+                         'lifeExp': np.where(rng.rand(n) < 0.1, np.nan, rng.rand(n) * 50 + 30),
+                         'pop': rng.randint(0, 1000, n),
+                         'big': rng.rand(n) > 0.5,
+                         'country': [f'c{i % 37}' for i in range(n)],
+                         'date': pd.Timestamp('2000-01-01') + pd.to_timedelta(rng.randint(0, 999, n),
+                                                                             unit='D')})
+
+
+SPECS = [
+    ('lifeExp', [np.count_nonzero, np.mean, np.std]),
+    ('lifeExp', 'median'),
+    ('pop', ['sum', 'mean', 'var', 'min', 'max', 'median', 'count', 'size']),
+    ('big', ['sum', 'mean', 'count']),
+    (None, {'lifeExp': np.mean, 'pop': np.median}),
+    (None, {'lifeExp': ['min', 'max'], 'pop': 'std'}),
+    (['lifeExp', 'pop'], ['mean', np.var]),
+    # not numbers: pandas computes these
+    ('country', ['min', 'max']),
+    ('country', 'count'),
+    ('date', ['min', 'max']),
+    (None, {'country': 'min', 'lifeExp': 'mean'}),
+    (['lifeExp', 'date'], 'max'),
+]
+
+
+@pytest.mark.parametrize('column, spec', SPECS)
+def test_same_as_pandas(df, column, spec):
+    gb, expected = groupby(df, 'year'), df.groupby('year')
+    if column is not None:
+        gb, expected = gb[column], expected[column]
+    got, expected = gb.agg(spec), expected.agg(spec)
+    if isinstance(expected, pd.DataFrame):
+        pd.testing.assert_frame_equal(got, expected, check_dtype=False)
+    else:
+        pd.testing.assert_series_equal(got, expected, check_dtype=False)
+
+
+@pytest.mark.parametrize('column', ['country', 'date', 'continent'])
+def test_not_numeric_is_not_planned(df, column):
+    assert aggplan.aggregate(df, group_index(df, 'year'), ['min', 'count'], column) is None
+
+
+def test_plan():
+    outputs, needs = aggplan.plan(['mean', np.std], 'x')
+    assert [name for name, *_ in outputs['x']] == ['mean', 'std']
+    assert needs['x'] == {'count', 'sum', 'm2'}
+    assert aggplan.plan(lambda s: s.iloc[0], 'x') is None
+
+
+def test_describe(df):
+    index = group_index(df, 'continent')
+    pd.testing.assert_frame_equal(aggplan.describe(df, index, 'lifeExp'),
+                                  df.groupby('continent')['lifeExp'].describe())
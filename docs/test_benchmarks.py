@@ -0,0 +1,52 @@
+import pytest
+
+import benchmarks
+
+
+def _report(*rows):
+    results = []
+    for name, seconds, mb, *error in rows:
+        row = {'benchmark': name, 'scale': 1, 'mix': 'default'}
+        if error:
+            row['error'] = error[0]
+        else:
+            row.update({'min': seconds, 'median': seconds, 'alloc_peak_mb': mb})
+        results.append(row)
+    return {'meta': {}, 'results': results}
+
+
+BASELINE = _report(('a', 1.0, 10.0), ('b', 1.0, 10.0), ('c', 1.0, 10.0), ('d', 1.0, 10.0),
+                   ('e', None, None, 'TypeError: no'))
+
+
+def _status(table):
+    return dict(zip(table['benchmark'], zip(table['status'], table['regression'])))
+
+
+def test_compare():
+    new = _report(('a', 1.1, 10.5), ('b', 2.0, 10.0), ('c', 1.0, 30.0),
+                  ('d', None, None, 'KeyError: x'), ('e', None, None, 'TypeError: no'),
+                  ('f', 1.0, 1.0))
+    assert _status(benchmarks.compare(new, BASELINE)) == {
+        'a': ('ok', False), 'b': ('ok', True), 'c': ('ok', True), 'd': ('error', True),
+        'e': ('error', False)}
+
+
+def test_compare_missing_case():
+    table = benchmarks.compare(_report(('a', 1.0, 10.0)), BASELINE)
+    assert len(table) == 5
+    assert _status(table)['b'] == ('missing', True)
+
+
+def test_compare_without_errors():
+    table = benchmarks.compare(_report(('a', 1.0, 10.0)), _report(('a', 1.0, 10.4)))
+    assert _status(table) == {'a': ('ok', False)}
+    assert table['min_ratio'].iloc[0] == pytest.approx(1.0)
+
+
+def test_run_one_case():
+    report = benchmarks.run(['extract_columns'], scales=[1], mixes=['default'], repeat=1,
+                            verbose=False)
+    [row] = report['results']
+    assert 'error' not in row and row['min'] > 0
+    assert _status(benchmarks.compare(report, report)) == {'extract_columns': ('ok', False)}
@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from catcounts import crosstab, describe, value_counts
+
+
+@pytest.fixture
+def df():
+    return pd.DataFrame({'A': list('baabcb'), 'C': [2.0, 1.0, 1.0, 1.0, np.nan, 2.0],
+                         'B': pd.Categorical(list('aabbab'), categories=list('abcd')),
+                         'D': pd.Categorical(list('yxxyyx'))})
+
+
+@pytest.mark.parametrize('column', ['A', 'B', 'C', 'D'])
+@pytest.mark.parametrize('kwargs', [{}, {'normalize': True}, {'ascending': True},
+                                    {'dropna': False}, {'sort': False}])
+def test_series(df, column, kwargs):
+    pd.testing.assert_series_equal(value_counts(df[column], **kwargs),
+                                   df[column].value_counts(**kwargs))
+
+
+@pytest.mark.parametrize('columns', [['A', 'C'], ['A', 'B'], ['B', 'D'], ['B'], ['C', 'A']])
+@pytest.mark.parametrize('kwargs', [{}, {'normalize': True}, {'ascending': True}])
+def test_frame(df, columns, kwargs):
+    pd.testing.assert_series_equal(value_counts(df[columns], **kwargs),
+                                   df[columns].value_counts(**kwargs))
+
+
+@pytest.mark.parametrize('column', ['A', 'B', 'D'])
+def test_describe(df, column):
+    pd.testing.assert_series_equal(describe(df[column]), df[column].describe().astype(object))
+
+
+def test_crosstab(df):
+    expected = pd.crosstab(df['B'], df['D'], dropna=False)
+    pd.testing.assert_frame_equal(crosstab(df, 'B', 'D'), expected, check_names=False,
+                                  check_index_type=False, check_column_type=False)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_frame_random(seed):
+    rng = np.random.RandomState(seed)
+    df = pd.DataFrame({'s': rng.choice(list('pqr'), 30), 'n': rng.randint(0, 3, 30),
+                       'c': pd.Categorical(rng.choice(list('uvw'), 30), categories=list('wvuz'))})
+    for columns in (['s', 'n'], ['n', 'c'], ['c', 's', 'n'], ['c']):
+        pd.testing.assert_series_equal(value_counts(df[columns]), df[columns].value_counts())
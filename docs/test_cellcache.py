@@ -0,0 +1,68 @@
+import pandas as pd
+import pytest
+
+import cellcache
+from cells import parse
+
+
+def _script(tmp_path, *cells):
+    path = tmp_path / 'script.py'
+    path.write_text(''.join(f'# %%\n{c}\n\n' for c in cells))
+    return path
+
+
+def _run(path, tmp_path):
+    return cellcache.run(str(path), cache=str(tmp_path / 'cache'), verbose=False)
+
+
+@pytest.mark.parametrize('source, changed', [
+    ('lst.append(1)', {'lst'}),
+    ('df.drop(columns=["a"], inplace=True)', {'df'}),
+    ('for i in range(3):\n    lst.append(i)', {'i', 'lst'}),
+    ('x = d.pop("a")', {'x', 'd'}),
+    ('df["b"] = 1', {'df'}),
+    ('out = pd.concat([df, df])', {'out'}),
+])
+def test_changes(source, changed):
+    (cell,) = parse(text=f'# %%\n{source}\n')
+    assert cell.changes({'pd'}) == changed
+
+
+# each of the middle cells changes a variable only through a method call
+MUTATING = [
+    'import pandas as pd\nlst = []\ndf = pd.DataFrame({"a": [1, 2], "b": [3, 4]})',
+    'lst.append(1)',
+    'df.drop(columns=["a"], inplace=True)',
+    'print(lst, list(df.columns))',
+]
+
+
+def test_cached_mutations(tmp_path, capsys):
+    path = _script(tmp_path, *MUTATING)
+    first, table = _run(path, tmp_path)
+    assert (table['status'] == 'ran').all()
+    printed = capsys.readouterr().out
+    second, table = _run(path, tmp_path)
+    assert (table['status'] == 'cached').all()
+    assert capsys.readouterr().out == printed == "[1] ['b']\n"
+    assert second['lst'] == first['lst'] == [1]
+    assert list(second['df'].columns) == ['b']
+
+
+def test_edit_reruns_downstream(tmp_path):
+    path = _script(tmp_path, *MUTATING)
+    _run(path, tmp_path)
+    path.write_text(path.read_text().replace('lst.append(1)', 'lst.append(2)'))
+    namespace, table = _run(path, tmp_path)
+    assert table['status'].tolist() == ['cached', 'ran', 'cached', 'ran']
+    assert namespace['lst'] == [2]
+
+
+def test_store_evicts_least_recently_used(tmp_path):
+    store = cellcache.Store(str(tmp_path / 'store'), max_bytes=10 ** 6)
+    store.put('old', b'x' * 400_000)
+    store.put('new', b'x' * 400_000)
+    store.get('old')
+    store.put('newest', b'x' * 400_000)
+    assert 'old' in store and 'newest' in store and 'new' not in store
+    assert store.size() <= 10 ** 6
@@ -0,0 +1,87 @@
+import io
+from contextlib import redirect_stdout
+
+import pandas as pd
+import pytest
+
+import cellgraph
+from cells import code_cells, parse
+
+
+def _serial(path):
+    namespace, out = {'__name__': '__main__'}, io.StringIO()
+    with redirect_stdout(out):
+        for cell in code_cells(str(path)):
+            cell.execute(namespace, str(path))
+    return namespace, out.getvalue()
+
+
+def _script(tmp_path, *cells):
+    path = tmp_path / 'script.py'
+    path.write_text(''.join(f'# %%\n{c}\n\n' for c in cells))
+    return path
+
+
+SCRIPTS = {
+    'branches': [
+        'import pandas as pd\ndf = pd.DataFrame({"a": [1, 2, 3], "g": list("xyx")})',
+        'means = df.groupby("g")["a"].mean()\nprint(means.to_dict())',
+        'df = df.assign(b=df["a"] * 2)\nprint(list(df.columns))',
+        'total = int(df["b"].sum()) + len(means)\nprint(total)',
+    ],
+    'functions': [
+        'import pandas as pd\ndef double(x):\n    return x * 2',
+        'df = pd.DataFrame({"a": [1, 2]})\nprint(double(df["a"]).tolist())',
+        'df["b"] = double(df["a"])\nprint(df.shape)',
+    ],
+    # a cell run in this process that changes a frame in place must not
+    # change the version an earlier cell, scheduled later, reads
+    'in_place': [
+        'import pandas as pd\ndef f(x):\n    return x\ndf = pd.DataFrame({"a": [1]})',
+        'import time\ntime.sleep(0.5)\nn = 1',
+        'print(list(df.columns), f(n))',
+        'df["b"] = f(2)',
+        'print(n)',
+    ],
+    # the locals of a function are not globals the cell binds
+    'function_locals': [
+        'n = 5',
+        'k = n * 2',
+        'def f(x):\n    n = x\n    return x',
+        'print(n, k, f(1))',
+    ],
+}
+
+
+@pytest.mark.parametrize('name', SCRIPTS)
+def test_same_as_serial(tmp_path, capsys, name):
+    path = _script(tmp_path, *SCRIPTS[name])
+    expected, printed = _serial(path)
+    namespace, table = cellgraph.run(str(path), workers=2, verbose=False)
+    assert capsys.readouterr().out == printed
+    assert (table['status'] == 'ok').all()
+    for key, value in expected.items():
+        if isinstance(value, (pd.DataFrame, pd.Series)):
+            assert namespace[key].equals(value)
+        elif isinstance(value, int):
+            assert namespace[key] == value
+
+
+def test_error_skips_dependents(tmp_path):
+    path = _script(tmp_path, 'x = 1 / 0', 'y = x + 1', 'z = 2')
+    with pytest.raises(ZeroDivisionError):
+        cellgraph.run(str(path), workers=2, verbose=False)
+    _, table = cellgraph.run(str(path), workers=2, stop=False, verbose=False)
+    assert table['status'].tolist() == ['error', 'skipped', 'ok']
+
+
+@pytest.mark.parametrize('source, loads, stores', [
+    ('def f(x, y=d):\n    n = x + m\n    return n', {'d', 'm'}, {'f'}),
+    ('g = lambda a: a + b', {'b'}, {'g'}),
+    ('ys = [i * k for i in xs if (last := i)]', {'k', 'xs'}, {'ys', 'last'}),
+    ('class A(B):\n    t = 1\n    u = t + w', {'B', 'w'}, {'A'}),
+    ('def h():\n    global G\n    G = H', {'H'}, {'h'}),
+])
+def test_names(source, loads, stores):
+    (cell,) = parse(text=f'# %%\n{source}\n')
+    assert cell.names() == (loads, stores)
@@ -0,0 +1,72 @@
+import json
+
+import pandas as pd
+import pytest
+
+import cellprof
+
+SCRIPT = '''# %% [markdown]
+# A small script
+
+# %% read
+import pandas as pd
+df = pd.read_csv('t.csv')
+
+# %%
+means = df.groupby('g')['x'].mean()
+means
+
+# %%
+bad = undefined_name
+
+# %%
+after = 1
+'''
+
+
+@pytest.fixture
+def script(tmp_path):
+    pd.DataFrame({'g': list('abab') * 25, 'x': range(100)}).to_csv(tmp_path / 't.csv', index=False)
+    path = tmp_path / 'script.py'
+    path.write_text(SCRIPT)
+    return str(path)
+
+
+def test_cells(script):
+    tracer = cellprof.run(script, summary=False, stop=False)
+    cells = tracer.summary('cell').sort_values('cell').reset_index(drop=True)
+    assert cells['name'].tolist() == ['read', "means = df.groupby('g')['x'].mean()",
+                                      'bad = undefined_name', 'after = 1']
+    assert cells['rows_in'].tolist() == [0, 100, 0, 0]
+    assert cells['rows_out'].tolist() == [100, 2, 0, 0]
+    assert cells['error'].tolist()[2].startswith('NameError')
+    assert (cells['wall'] >= 0).all() and tracer.namespace['after'] == 1
+
+
+def test_stop_reraises(script):
+    with pytest.raises(NameError):
+        cellprof.run(script, summary=False)
+
+
+def test_pandas_calls(script, tmp_path):
+    originals = pd.read_csv, pd.DataFrame.groupby, pd.core.groupby.SeriesGroupBy.mean
+    tracer = cellprof.run(script, pandas=True, summary=False, stop=False,
+                          trace=tmp_path / 'trace.json', jsonl=tmp_path / 'events.jsonl')
+    assert (pd.read_csv, pd.DataFrame.groupby, pd.core.groupby.SeriesGroupBy.mean) == originals
+    calls = tracer.summary('pandas')
+    assert {'pd.read_csv', 'DataFrame.groupby', 'SeriesGroupBy.mean'} <= set(calls.index)
+    assert calls.loc['pd.read_csv', 'rows_out'] == 100
+    assert calls.loc['SeriesGroupBy.mean', 'rows_in'] == 100
+    trace = json.loads((tmp_path / 'trace.json').read_text())['traceEvents']
+    events = (tmp_path / 'events.jsonl').read_text().splitlines()
+    assert len(trace) == len(events) == len(tracer.events)
+    assert all(e['ph'] == 'X' and e['dur'] >= 0 for e in trace)
+
+
+def test_nested_calls_counted_once():
+    tracer = cellprof.Tracer()
+    df = pd.DataFrame({'g': [1, 1, 2], 'x': [1.0, 2.0, 3.0]})
+    with cellprof.pandas_hooks(tracer):
+        df.groupby('g').agg('mean')
+    names = [e['name'] for e in tracer.events]
+    assert names == ['DataFrame.groupby', 'DataFrameGroupBy.agg']
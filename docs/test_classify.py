@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+
+from classify import _loop, classify
+
+RULES = [(lambda u: u < 0, 'Negative'), (lambda u: u % 2 == 1, 'Odd')]
+
+
+def test_matches_loop():
+    x = np.random.RandomState(0).randint(-100, 100, 1000)
+    assert list(classify(x, RULES, default='Even')) == _loop(x.tolist())
+
+
+def test_series_keeps_index():
+    x = pd.Series([-1, 1, 2], index=list('abc'), name='u')
+    y = classify(x, RULES, default='Even')
+    pd.testing.assert_series_equal(
+        y, pd.Series(pd.Categorical(['Negative', 'Odd', 'Even'],
+                                    categories=['Negative', 'Odd', 'Even']),
+                     index=list('abc'), name='u'))
+
+
+def test_no_default_is_missing():
+    y = classify([-1, 2], RULES)
+    assert y[0] == 'Negative' and pd.isna(y[1])
+
+
+def test_repeated_labels():
+    x = np.array([-5, 5, 50, 500])
+    y = classify(x, [(x < 0, 'Bad'), (x > 100, 'Bad'), (x > 10, 'Good')], default='Ok')
+    assert list(y) == ['Bad', 'Ok', 'Good', 'Bad']
+    assert list(y.categories) == ['Bad', 'Good', 'Ok']
+
+
+def test_default_among_labels():
+    y = classify([1, 2], [(lambda u: u > 1, 'Big')], default='Big')
+    assert list(y) == ['Big', 'Big'] and list(y.categories) == ['Big']
+
+
+def test_scalar_condition():
+    # conditions that only work on a single number are applied element-wise
+    y = classify([3, -3], [(lambda u: u if u > 0 else 0, 'Pos')], default='Other')
+    assert list(y) == ['Pos', 'Other']
@@ -0,0 +1,66 @@
+import glob
+import json
+import os
+
+import pytest
+
+import cells
+import convert
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SCRIPTS = sorted(os.path.basename(p) for p in glob.glob(os.path.join(HERE, 'p*_*.py')))
+
+
+def _cells(parsed):
+    return [(c.kind, c.source, c.title, c.metadata) for c in parsed]
+
+
+def _through(fmt, parsed, header):
+    """Cells and header of a script written as fmt and read back"""
+    return convert.read('lesson' + convert._WRITERS[fmt][0],
+                        convert._WRITERS[fmt][1](parsed, header))
+
+
+@pytest.mark.parametrize('fmt', ['md', 'ipynb', 'slides'])
+@pytest.mark.parametrize('script', SCRIPTS)
+def test_cells_round_trip(script, fmt):
+    parsed, header = convert.read(os.path.join(HERE, script))
+    back, back_header = _through(fmt, parsed, header)
+    again = cells.parse(text=convert.percent(back, back_header))
+    if fmt == 'slides':  # headings gain slideshow metadata
+        for cell in again:
+            if not any(c.metadata.get('slideshow') for c in parsed if c.source == cell.source):
+                cell.metadata.pop('slideshow', None)
+    assert _cells(again) == _cells(parsed)
+
+
+@pytest.mark.parametrize('script', SCRIPTS)
+def test_written_files_are_stable(script):
+    parsed, header = convert.read(os.path.join(HERE, script))
+    py = convert.percent(parsed, header)
+    md = convert.markdown(*convert.read('lesson.py', py))
+    assert convert.percent(*convert.read('lesson.md', md)) == py
+    nb = convert.notebook(*convert.read('lesson.py', py))
+    assert convert.notebook(*convert.read('lesson.py', convert.percent(
+        *convert.read('lesson.ipynb', nb)))) == nb
+
+
+def test_header_round_trip():
+    parsed, header = convert.read(os.path.join(HERE, 'python_pandas.py'))
+    assert cells.header(convert.percent(*_through('md', parsed, header))) == header
+    meta = json.loads(convert.notebook(parsed, header))['metadata']
+    assert meta['jupytext'] == {'formats': 'ipynb,md,py:percent'}
+    assert convert._paired(_through('ipynb', parsed, header)[1]) == ['ipynb', 'md', 'py']
+
+
+def test_convert_writes_once(tmp_path):
+    path = tmp_path / 'lesson.py'
+    with open(os.path.join(HERE, 'pd_tidy.py'), encoding='utf-8') as f:
+        path.write_text(f.read(), encoding='utf-8')
+    status = convert.convert([str(path)], formats=['md', 'ipynb'], verbose=False)
+    assert sorted(status.values()) == ['written', 'written']
+    status = convert.convert([str(path)], formats=['md', 'ipynb'], verbose=False)
+    assert sorted(status.values()) == ['skipped', 'skipped']
+    (tmp_path / 'lesson.md').write_text('edited\n')
+    status = convert.convert([str(path)], formats=['md', 'ipynb'], verbose=False)
+    assert status[str(tmp_path / 'lesson.md')] == 'edited'
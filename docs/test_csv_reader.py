@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from csv_reader import read_csv
+
+
+@pytest.fixture
+def path(tmp_path):
+    rng = np.random.RandomState(0)
+    n = 400
+    df = pd.DataFrame({'PassengerId': np.arange(1, n + 1),
+                       'Pclass': rng.randint(1, 4, n),
+                       'Name': [f'Passenger {i}' for i in range(n)],
+                       'Age': np.where(rng.rand(n) < 0.2, np.nan, rng.randint(1, 80, n)),
+                       'Fare': rng.exponential(30, n).round(2),
+                       # a sparse text column, empty in most byte ranges
+                       'Cabin': [f'C{i}' if i < 15 else None for i in range(n)],
+                       'Survived': rng.randint(0, 2, n),
+                       # bool in the first ranges, with missing values in the last ones
+                       'Alone': pd.array([i % 3 == 0 if i < 300 or i % 2 else None
+                                          for i in range(n)], dtype=object),
+                       # bool in the first ranges, text in the last ones
+                       'Flag': [str(i % 2 == 0) if i < 300 else 'maybe' for i in range(n)],
+                       'Embarked': rng.choice(list('CQS'), n)})
+    path = tmp_path / 'titanic.csv'
+    df.to_csv(path, index=False)
+    return str(path)
+
+
+CASES = [
+    (None, None),
+    (['Survived', 'Fare'], None),
+    (['Name', 'Cabin', 'Fare'], '(Pclass == 1) & (Fare > 50)'),
+    (None, 'Age > 30'),
+    (['Cabin', 'Pclass'], lambda df: df['Pclass'] == 2),
+    (['Name', 'Alone'], 'index < 5'),
+    (['Alone', 'Flag'], lambda df: (df.index % 7 == 0) & (df['Pclass'] > 1)),
+]
+
+
+@pytest.mark.parametrize('columns, where', CASES)
+@pytest.mark.parametrize('threads', [1, 4])
+def test_same_as_read_then_filter(path, columns, where, threads):
+    expected = pd.read_csv(path)
+    if where is not None:
+        expected = expected[where(expected)] if callable(where) else expected.query(where)
+    if columns is not None:
+        expected = expected[columns]
+    got = read_csv(path, columns=columns, where=where, threads=threads, min_bytes=256)
+    pd.testing.assert_frame_equal(got, expected)
+
+
+@pytest.mark.parametrize('dtype', [{'Pclass': 'category'}, {'Embarked': 'category', 'Age': float},
+                                   {'Fare': str}])
+@pytest.mark.parametrize('where', [None, 'Age > 30'])
+def test_dtype(path, dtype, where):
+    expected = pd.read_csv(path, dtype=dtype)
+    if where is not None:
+        expected = expected.query(where)
+    got = read_csv(path, where=where, dtype=dtype, threads=4, min_bytes=256)
+    pd.testing.assert_frame_equal(got, expected)
+
+
+def test_header_only(tmp_path):
+    path = tmp_path / 'empty.csv'
+    path.write_text('a,b\n')
+    assert list(read_csv(path, where=lambda df: df['a'] > 0).columns) == ['a', 'b']
+    assert len(read_csv(path, columns=['b'], where='a > 0')) == 0
+
+
+@pytest.mark.parametrize('kwargs', [{'nrows': 50}, {'skiprows': [1, 2, 3]}, {'index_col': 0},
+                                    {'header': None}])
+def test_whole_file_options(path, kwargs):
+    expected = pd.read_csv(path, **kwargs)
+    pd.testing.assert_frame_equal(read_csv(path, threads=4, min_bytes=256, **kwargs), expected)
+
+
+def test_usecols_refused(path):
+    with pytest.raises(TypeError):
+        read_csv(path, usecols=['Fare'])
@@ -0,0 +1,63 @@
+import os
+import subprocess
+import sys
+import time
+
+import pandas as pd
+import pytest
+
+import daemon
+
+
+@pytest.fixture
+def server(tmp_path):
+    data = tmp_path / 'data'
+    data.mkdir()
+    pd.DataFrame({'PassengerId': range(891), 'Fare': [1.5] * 891}).to_csv(
+        data / 'titanic.csv', index=False)
+    socket = str(tmp_path / 'daemon.sock')
+    proc = subprocess.Popen([sys.executable, daemon.__file__, '--socket', socket, 'serve',
+                             '--data', str(data)], stderr=subprocess.DEVNULL)
+    for _ in range(200):
+        if os.path.exists(socket):
+            break
+        time.sleep(0.05)
+    yield socket, data
+    daemon.request({'command': 'stop'}, socket)
+    proc.wait(10)
+
+
+def _code(socket, code, **kwargs):
+    return daemon.run(code=code, get=['n'], path=socket, **kwargs)
+
+
+def test_resident_frame(server, monkeypatch):
+    socket, data = server
+    monkeypatch.chdir(data.parent)
+    reply = _code(socket, 'import pandas as pd\ndf = pd.read_csv("data/titanic.csv")\n'
+                          'n = (len(df), len(frames["titanic"]))\nprint("hi")')
+    assert reply['status'] == 'ok' and reply['stdout'] == 'hi\n'
+    assert reply['values']['n'] == (891, 891)
+
+
+def test_changed_file_is_read_again(server, monkeypatch):
+    socket, data = server
+    monkeypatch.chdir(data.parent)
+    pd.read_csv(data / 'titanic.csv').head(99).to_csv(data / 'titanic.csv', index=False)
+    reply = _code(socket, 'import pandas as pd\nn = (len(pd.read_csv("data/titanic.csv")), '
+                          '"titanic" in frames)')
+    assert reply['values']['n'] == (99, False)
+
+
+def test_error(server):
+    reply = _code(server[0], 'n = 1\nraise ValueError("no")')
+    assert reply['status'] == 'error' and 'ValueError: no' in reply['error']
+    assert reply['values']['n'] == 1
+
+
+def test_timeout_not_swallowed(server):
+    start = time.perf_counter()
+    reply = _code(server[0], 'import time\ntry:\n    time.sleep(5)\nexcept Exception:\n    pass',
+                  timeout=0.5)
+    assert reply['status'] == 'timeout'
+    assert time.perf_counter() - start < 3
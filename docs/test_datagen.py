@@ -0,0 +1,80 @@
+import io
+
+import pandas as pd
+import pytest
+
+import datagen
+
+ROWS = {'mtcars.csv': 32, 'titanic.csv': 891, 'gapminder.tsv': 1704, 'pew.csv': 18,
+        'survey_person.csv': 5, 'survey_site.csv': 3, 'survey_visited.csv': 8,
+        'survey_survey.csv': 21, 'table1.csv': 6, 'table2.csv': 12, 'table4a.csv': 3,
+        'country_timeseries.csv': 122}
+
+
+# the file of each single-file dataset
+FILE = {'mtcars': 'mtcars.csv', 'titanic': 'titanic.csv', 'gapminder': 'gapminder.tsv',
+        'pew': 'pew.csv', 'country_timeseries': 'country_timeseries.csv'}
+
+
+def _files(name, scale):
+    out = datagen.generate(name, scale=scale)
+    return out if isinstance(out, dict) else {FILE[name]: out}
+
+
+@pytest.mark.parametrize('name', list(datagen.DATASETS))
+def test_original_sizes(name):
+    for filename, df in _files(name, 1).items():
+        if filename in ROWS:
+            assert len(df) == ROWS[filename], filename
+
+
+def test_columns():
+    assert list(datagen.generate('titanic').columns) == \
+        ['PassengerId', 'Survived', 'Pclass', 'Name', 'Sex', 'Age', 'SibSp', 'Parch', 'Ticket',
+         'Fare', 'Cabin', 'Embarked']
+    assert list(datagen.generate('gapminder').columns) == \
+        ['country', 'continent', 'year', 'lifeExp', 'pop', 'gdpPercap']
+
+
+@pytest.mark.parametrize('scale', [1, 2000])
+def test_dates_in_the_original_ranges(scale):
+    visited = datagen.generate('survey', scale=scale)['survey_visited.csv']
+    dated = pd.to_datetime(visited['dated'], format='%Y-%m-%d')
+    assert dated.min() >= pd.Timestamp('1927-02-08') and dated.max() <= pd.Timestamp('1932-03-22')
+    ebola = datagen.generate('country_timeseries', scale=scale)
+    date = pd.to_datetime(ebola['Date'], format='%m/%d/%Y')
+    assert date.min() == pd.Timestamp('2014-03-22') and date.max() == pd.Timestamp('2015-01-05')
+    assert date.is_monotonic_decreasing
+    assert ((date - pd.Timestamp('2014-03-22')).dt.days == ebola['Day']).all()
+
+
+def test_survey_keys():
+    survey = datagen.generate('survey', scale=50)
+    readings, visited = survey['survey_survey.csv'], survey['survey_visited.csv']
+    assert readings['taken'].isin(visited['ident']).all()
+    assert readings['person'].dropna().isin(survey['survey_person.csv']['ident']).all()
+    assert visited['site'].isin(survey['survey_site.csv']['name']).all()
+
+
+def test_pew_counts():
+    pew = datagen.generate('pew', scale=100)
+    counts = pew.drop(columns='religion')
+    assert len(counts.columns) == 10 and (counts >= 0).all().all()
+    assert counts.sum(axis=1).head(18).tolist() == datagen._FOLLOWERS
+
+
+def test_chunks(monkeypatch):
+    # the rows depend on the seed and scale only, chunk by chunk
+    monkeypatch.setattr(datagen, 'CHUNK', 100)
+    first = datagen.generate('titanic', scale=0.5)
+    pd.testing.assert_frame_equal(datagen.generate('titanic', scale=0.5), first)
+    assert first['PassengerId'].tolist() == list(range(1, 447))
+
+
+def test_write(tmp_path):
+    paths = datagen.write(tmp_path, names=['titanic', 'tables'], scale=2, workers=2, excel=False)
+    assert sorted(p.rsplit('/', 1)[1] for p in map(str, paths)) == \
+        sorted(['titanic.csv'] + [f'table{i}.csv' for i in ('1', '2', '3', '4a', '4b', '5')])
+    expected = datagen.generate('titanic', scale=2)
+    pd.testing.assert_frame_equal(pd.read_csv(tmp_path / 'titanic.csv'),
+                                  pd.read_csv(io.StringIO(expected.to_csv(index=False))))
@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from distinct import nunique
+
+rng = np.random.RandomState(0)
+N = 1000
+
+SERIES = {
+    'int': pd.Series(rng.randint(0, 50, N)),
+    'float': pd.Series(np.where(rng.rand(N) < 0.1, np.nan, rng.randint(0, 30, N) / 4)),
+    'str': pd.Series(rng.choice(['Asia', 'Europe', 'Africa', None], N)),
+    'object': pd.Series(rng.choice(['a', 'b', None], N).astype(object)),
+    'category': pd.Series(rng.choice(['x', 'y', None], N)).astype(
+        pd.CategoricalDtype(['x', 'y', 'unused'])),
+    'datetime': pd.Series(pd.to_datetime(rng.randint(0, 20, N), unit='D')),
+    'Int64': pd.Series(rng.randint(0, 5, N)).astype('Int64').where(rng.rand(N) < 0.9),
+    'bool': pd.Series(rng.rand(N) < 0.5),
+}
+
+
+@pytest.mark.parametrize('name', SERIES)
+@pytest.mark.parametrize('dropna', [True, False])
+@pytest.mark.parametrize('chunksize', [7, 1 << 22])
+def test_same_as_pandas(name, dropna, chunksize):
+    s = SERIES[name]
+    assert nunique(s, dropna=dropna, threads=3, chunksize=chunksize) == s.nunique(dropna=dropna)
+
+
+def test_frame():
+    df = pd.DataFrame(SERIES)
+    pd.testing.assert_series_equal(nunique(df, chunksize=64), df.nunique())
+
+
+@pytest.mark.parametrize('values', [[0.0, -0.0], [-0.0, 0.0, np.nan, 1.0]])
+@pytest.mark.parametrize('dtype', [float, object])
+def test_signed_zero_in_separate_chunks(values, dtype):
+    s = pd.Series(values, dtype=dtype)
+    for chunksize in (1, 2, 4):
+        assert nunique(s, chunksize=chunksize) == s.nunique()
+
+
+@pytest.mark.parametrize('values', [[1, '1'], [True, 'True', 1.0], [(1, 2), '(1, 2)', (1, 2)],
+                                    [1, 1.0, True, '1', 'a', None], [2 ** 70, 2.0 ** 70, 'x'],
+                                    [(1, 2), (1.0, 2.0)]])
+def test_mixed_objects(values):
+    s = pd.Series(values, dtype=object)
+    for chunksize in (1, 2, 1 << 22):
+        assert nunique(s, chunksize=chunksize) == s.nunique()
+        assert nunique(s, dropna=False, chunksize=chunksize) == s.nunique(dropna=False)
+
+
+def test_int_and_float_chunks():
+    s = pd.Series([1, 2, 3, 1.0, 2.0, np.nan], dtype=object)
+    assert nunique(s, chunksize=3) == s.nunique() == 3
@@ -0,0 +1,114 @@
+import datetime
+import os
+import re
+import zipfile
+
+import numpy as np
+import openpyxl
+from openpyxl.utils.datetime import CALENDAR_MAC_1904
+import pandas as pd
+import pytest
+
+from excel_io import read_excel, write_excel
+
+
+def _values(path, sheet=0):
+    wb = openpyxl.load_workbook(path)
+    return list(wb.worksheets[sheet].values)
+
+
+@pytest.fixture
+def df():
+    return pd.DataFrame({'mpg': [21.0, 22.8, np.nan, 18.7], 'cyl': [6, 4, 6, 8],
+                         'name': ['Mazda', None, 'Hornet', 'Valiant'],
+                         'am': [True, False, True, False]},
+                        index=pd.Index(['a', 'b', 'c', 'd'], name='car'))
+
+
+@pytest.mark.parametrize('index', [True, False])
+def test_same_cells_as_to_excel(df, tmp_path, index):
+    write_excel(df, tmp_path / 'w.xlsx', index=index)
+    df.to_excel(tmp_path / 'p.xlsx', index=index)
+    assert _values(tmp_path / 'w.xlsx') == _values(tmp_path / 'p.xlsx')
+
+
+def test_multiindex(df, tmp_path):
+    df.index = pd.MultiIndex.from_tuples([(0, 'a'), (0, 'b'), (1, 'a'), (1, 'b')],
+                                         names=['k', None])
+    write_excel(df, tmp_path / 'w.xlsx')
+    df.to_excel(tmp_path / 'p.xlsx', merge_cells=False)
+    assert _values(tmp_path / 'w.xlsx') == _values(tmp_path / 'p.xlsx')
+
+
+def test_round_trip(df, tmp_path):
+    write_excel(df, tmp_path / 'w.xlsx')
+    pd.testing.assert_frame_equal(pd.read_excel(tmp_path / 'w.xlsx', index_col=0), df)
+
+
+def test_sheets_split(df, tmp_path):
+    assert write_excel(df, tmp_path / 'w.xlsx', max_rows=3) == ['Sheet1', 'Sheet1_2']
+    assert len(_values(tmp_path / 'w.xlsx', 1)) == 3
+    assert write_excel(df.iloc[:0], tmp_path / 'e.xlsx') == ['Sheet1']
+
+
+@pytest.mark.parametrize('kwargs', [{}, {'usecols': ['cyl', 'name']}, {'nrows': 2},
+                                    {'index_col': 0}, {'index_col': 'car'},
+                                    {'usecols': ['cyl', 'name'], 'index_col': 1}])
+def test_read_like_pandas(df, tmp_path, kwargs):
+    df.to_excel(tmp_path / 'p.xlsx')
+    expected = pd.read_excel(tmp_path / 'p.xlsx', **kwargs)
+    pd.testing.assert_frame_equal(read_excel(tmp_path / 'p.xlsx', **kwargs), expected)
+
+
+def test_read_without_references(df, tmp_path):
+    df.to_excel(tmp_path / 'p.xlsx')
+    with zipfile.ZipFile(tmp_path / 'p.xlsx') as src, \
+            zipfile.ZipFile(tmp_path / 'n.xlsx', 'w') as dst:
+        for item in src.infolist():
+            data = src.read(item)
+            if item.filename.startswith('xl/worksheets/'):
+                data = re.sub(rb' r="[A-Z]*\d+"', b'', data)
+            dst.writestr(item, data)
+    assert b' r="' not in zipfile.ZipFile(tmp_path / 'n.xlsx').read('xl/worksheets/sheet1.xml')
+    pd.testing.assert_frame_equal(read_excel(tmp_path / 'n.xlsx', index_col=0),
+                                  pd.read_excel(tmp_path / 'p.xlsx', index_col=0))
+
+
+def test_cache(df, tmp_path):
+    df.to_excel(tmp_path / 'p.xlsx')
+    first = read_excel(tmp_path / 'p.xlsx', cache=tmp_path / 'cache')
+    assert len(os.listdir(tmp_path / 'cache')) == 1
+    pd.testing.assert_frame_equal(read_excel(tmp_path / 'p.xlsx', cache=tmp_path / 'cache'), first)
+
+
+@pytest.fixture
+def mixed(tmp_path):
+    # dates then a plain number, numbers then a date, and numeric headers
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.append([1, 2.5, 'when', 'n'])
+    ws.append([datetime.datetime(2020, 1, 1), 1.5, datetime.datetime(2020, 1, 2, 12), 3])
+    ws.append([2.5, 2.0, datetime.datetime(2020, 1, 3), 4])
+    ws.append([datetime.datetime(2020, 1, 3), datetime.datetime(2021, 1, 1), None, None])
+    wb.save(tmp_path / 'mixed.xlsx')
+    wb.epoch = CALENDAR_MAC_1904
+    wb.save(tmp_path / 'mac.xlsx')
+    return tmp_path
+
+
+@pytest.mark.parametrize('sample', [1, 100])
+@pytest.mark.parametrize('name', ['mixed.xlsx', 'mac.xlsx'])
+def test_dates_and_numeric_headers(mixed, name, sample):
+    expected = pd.read_excel(mixed / name)
+    assert list(expected.columns) == [1, 2.5, 'when', 'n']
+    pd.testing.assert_frame_equal(read_excel(mixed / name, sample=sample), expected)
+
+
+def test_cache_key_has_every_option(mixed, tmp_path):
+    cache = tmp_path / 'cache'
+    typed = read_excel(mixed / 'mixed.xlsx', usecols=['when'], nrows=2, sample=2, cache=cache)
+    assert typed['when'].dtype.kind == 'M'
+    objects = read_excel(mixed / 'mixed.xlsx', usecols=['when'], nrows=2, sample=1, cache=cache)
+    assert len(os.listdir(cache)) == 2
+    pd.testing.assert_frame_equal(objects, read_excel(mixed / 'mixed.xlsx', usecols=['when'],
+                                                      nrows=2, sample=1))
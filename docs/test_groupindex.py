@@ -0,0 +1,83 @@
+import copy
+import pickle
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from groupindex import clear_cache, group_index, groupby
+
+
+@pytest.fixture
+def df():
+    rng = np.random.RandomState(0)
+    n = 200
+    return pd.DataFrame({'continent': rng.choice(['Asia', 'Europe', 'Africa', None], n),
+                         'year': rng.choice([1952, 1957, 2007], n),
+                         'lifeExp': np.where(rng.rand(n) < 0.1, np.nan, rng.rand(n) * 80),
+                         'pop': rng.randint(1, 10 ** 6, n)},
+                        index=rng.permutation(n) * 10)
+
+
+KEYS = ['continent', ['continent', 'year']]
+
+
+@pytest.mark.parametrize('keys', KEYS)
+@pytest.mark.parametrize('column', ['lifeExp', 'pop'])
+@pytest.mark.parametrize('how', ['size', 'count', 'sum', 'mean', 'var', 'std', 'min', 'max',
+                                 'describe'])
+def test_reductions(df, keys, column, how):
+    got = getattr(groupby(df, keys)[column], how)()
+    expected = getattr(df.groupby(keys)[column], how)()
+    if how == 'size':
+        expected = expected.rename('size')
+    if isinstance(expected, pd.DataFrame):
+        pd.testing.assert_frame_equal(got, expected, check_dtype=False)
+    else:
+        pd.testing.assert_series_equal(got, expected, check_dtype=False)
+
+
+@pytest.mark.parametrize('keys', KEYS)
+def test_groups(df, keys):
+    gb, expected = groupby(df, keys), df.groupby(keys)
+    assert gb.ngroups == expected.ngroups
+    assert {k: list(v) for k, v in gb.groups.items()} == \
+        {k: list(v) for k, v in expected.groups.items()}
+    key = next(iter(expected.groups))
+    pd.testing.assert_frame_equal(gb.get_group(key), expected.get_group(key))
+
+
+@pytest.mark.parametrize('n', [0, 2, -1])
+def test_nth(df, n):
+    pd.testing.assert_frame_equal(groupby(df, 'continent').nth(n), df.groupby('continent').nth(n))
+
+
+def test_filter(df):
+    def big(g):
+        return len(g) > 50
+    pd.testing.assert_frame_equal(groupby(df, 'continent').filter(big),
+                                  df.groupby('continent').filter(big))
+
+
+def test_delegated(df):
+    pd.testing.assert_series_equal(groupby(df, 'continent')['lifeExp'].transform('mean'),
+                                   df.groupby('continent')['lifeExp'].transform('mean'))
+    pd.testing.assert_series_equal(groupby(df, 'continent')['pop'].median(),
+                                   df.groupby('continent')['pop'].median())
+
+
+def test_cache_follows_changes(df):
+    clear_cache()
+    first = group_index(df, 'continent')
+    assert group_index(df, 'continent') is first
+    df.loc[df.index[0], 'continent'] = 'Oceania'
+    assert group_index(df, 'continent') is not first
+    assert groupby(df, 'continent').ngroups == df['continent'].nunique()
+
+
+def test_copy_and_pickle(df):
+    gb = groupby(df, 'continent')['lifeExp']
+    for other in [copy.copy(gb), copy.deepcopy(gb), pickle.loads(pickle.dumps(gb))]:
+        pd.testing.assert_series_equal(other.mean(), gb.mean())
+    with pytest.raises(AttributeError):
+        gb._missing
@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from impute import Imputer, MissingMask
+
+
+@pytest.fixture
+def df():
+    return pd.DataFrame({'continent': ['Asia', 'Asia', 'Europe', 'Europe', 'Africa', 'Asia'],
+                         'x': [1.0, np.nan, 3.0, np.nan, np.nan, 6.0],
+                         'y': [np.nan, 2.0, 2.0, 4.0, 5.0, 8.0],
+                         'z': [1, 2, 3, 4, 5, 6]})
+
+
+@pytest.mark.parametrize('how', ['any', 'all'])
+def test_mask_dropna(df, how):
+    mask = MissingMask(df)
+    pd.testing.assert_frame_equal(mask.isna(), df.isna())
+    pd.testing.assert_frame_equal(mask.dropna(df, how=how), df.dropna(how=how))
+    pd.testing.assert_frame_equal(mask.dropna(df, subset=['x']), df.dropna(subset=['x']))
+
+
+@pytest.mark.parametrize('strategy', ['mean', 'median'])
+def test_overall(df, strategy):
+    stat = getattr(df[['x', 'y', 'z']], strategy)()
+    pd.testing.assert_frame_equal(Imputer(strategy).fit_transform(df), df.fillna(stat))
+
+
+def test_constant(df):
+    pd.testing.assert_frame_equal(Imputer('constant', value=0).fit_transform(df),
+                                  df.fillna({'x': 0, 'y': 0}))
+
+
+@pytest.mark.parametrize('strategy', ['mean', 'median'])
+def test_by_group(df, strategy):
+    expected = df.copy()
+    for c in ['x', 'y']:
+        group = df.groupby('continent')[c].transform(strategy)
+        expected[c] = df[c].fillna(group).fillna(getattr(df[c], strategy)())
+    pd.testing.assert_frame_equal(Imputer(strategy, by='continent').fit_transform(df), expected)
+
+
+def test_unseen_group(df):
+    imp = Imputer('mean', by='continent').fit(df)
+    batch = pd.DataFrame({'continent': ['Oceania'], 'x': [np.nan], 'y': [1.0], 'z': [1]})
+    assert imp.transform(batch)['x'].iloc[0] == pytest.approx(df['x'].mean())
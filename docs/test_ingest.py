@@ -0,0 +1,76 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import shmframe
+from ingest import _concat_shared, read_csvs
+
+
+def _segments():
+    return {f for f in os.listdir('/dev/shm') if f.startswith('psm_')} \
+        if os.path.isdir('/dev/shm') else set()
+
+
+@pytest.fixture
+def files(tmp_path):
+    rng = np.random.RandomState(0)
+    paths = []
+    for i in range(3):
+        df = pd.DataFrame({'id': np.arange(10) + 10 * i, 'x': rng.rand(10),
+                           'g': rng.choice(['a', 'b'], 10), 'n': rng.randint(0, 5, 10)})
+        path = tmp_path / f'table{i}.csv'
+        df.to_csv(path, index=False)
+        paths.append(str(path))
+    return paths
+
+
+def _expected(files, **kwargs):
+    frames = [pd.read_csv(f, **kwargs) for f in files]
+    return pd.concat(frames, ignore_index='index_col' not in kwargs)
+
+
+@pytest.mark.parametrize('shared', [True, False])
+def test_list(files, shared):
+    for got, f in zip(read_csvs(files, workers=2, shared=shared), files):
+        pd.testing.assert_frame_equal(got, pd.read_csv(f))
+
+
+@pytest.mark.parametrize('kwargs', [{}, {'index_col': 'id'}, {'dtype': {'g': 'category'}},
+                                    {'index_col': 0, 'dtype': {'g': 'category'}}])
+def test_concat(files, kwargs):
+    before = _segments()
+    got = read_csvs(files, workers=2, concat=True, **kwargs)
+    pd.testing.assert_frame_equal(got, _expected(files, **kwargs))
+    assert _segments() == before
+
+
+def test_unify(files, tmp_path):
+    extra = tmp_path / 'other.csv'
+    pd.DataFrame({'id': [1], 'y': [2.0]}).to_csv(extra, index=False)
+    with pytest.raises(ValueError):
+        read_csvs(files + [str(extra)], workers=2, concat=True)
+    got = read_csvs(files + [str(extra)], workers=2, concat=True, unify=True)
+    pd.testing.assert_frame_equal(got, _expected(sorted(files + [str(extra)])))
+
+
+def test_failure_releases_segments(files, tmp_path):
+    before = _segments()
+    with pytest.raises(FileNotFoundError):
+        read_csvs(files + [str(tmp_path / 'missing.csv')], workers=2)
+    assert _segments() == before
+
+
+def test_concat_shared_attach_failure():
+    before = _segments()
+    handles = [shmframe.to_shared(pd.DataFrame({'a': np.arange(5) + i, 'b': np.ones(5)}))
+               for i in range(3)]
+    shmframe.release(handles[1])
+    try:
+        with pytest.raises(FileNotFoundError):
+            _concat_shared(handles)
+    finally:
+        for h in handles:
+            shmframe.release(h)
+    assert _segments() == before
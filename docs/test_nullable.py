@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import nullable
+
+
+def _plain(df):
+    # the values with None for every kind of missing, to compare across dtypes
+    return df.astype(object).where(df.notna(), None)
+
+
+@pytest.fixture
+def df():
+    return pd.DataFrame({'one': [0.5, np.nan, 1.5], 'four': np.array([20, 21, 22], dtype='int32'),
+                         'five': [True, False, True], 'word': ['a', None, 'c']},
+                        index=['a', 'c', 'e'])
+
+
+def test_to_nullable(df):
+    out = nullable.to_nullable(df)
+    assert out.dtypes.astype(str).tolist() == ['float64', 'Int32', 'boolean', df['word'].dtype.name]
+    assert nullable.to_nullable(df, floats=True)['one'].dtype == 'Float64'
+    assert nullable.to_nullable(df['four']).dtype == 'Int32'
+
+
+def test_float16():
+    s = pd.Series(np.array([1.5, np.nan], dtype='float16'))
+    out = nullable.to_nullable(s, floats=True)
+    assert out.dtype == 'Float32'
+    assert out.tolist() == [1.5, pd.NA]
+
+
+def test_reindex_keeps_dtypes(df):
+    out = nullable.reindex(df, list('abcdefg'))
+    assert out['four'].dtype == 'Int32' and out['five'].dtype == 'boolean'
+    expected = df.reindex(list('abcdefg'))
+    pd.testing.assert_frame_equal(_plain(out), _plain(expected))
+    pd.testing.assert_frame_equal(nullable.isna(out), expected.isna())
+    pd.testing.assert_frame_equal(nullable.notna(out), expected.notna())
+
+
+@pytest.mark.parametrize('how', ['any', 'all'])
+def test_dropna(df, how):
+    out = nullable.reindex(df, list('abcdefg'))
+    expected = df.reindex(list('abcdefg')).dropna(how=how)
+    assert nullable.dropna(out, how=how).index.tolist() == expected.index.tolist()
+
+
+def test_merge_and_concat():
+    left = pd.DataFrame({'ident': [1, 2, 3], 'reading': [10, 20, 30]})
+    right = pd.DataFrame({'taken': [2, 3, 4], 'dry': [True, False, True]})
+    out = nullable.merge(left, right, how='outer', left_on='ident', right_on='taken')
+    assert out['reading'].dtype == 'Int64' and out['dry'].dtype == 'boolean'
+    assert out['reading'].isna().tolist() == [False, False, False, True]
+    out = nullable.concat([left, right])
+    assert out['ident'].dtype == 'Int64' and out['dry'].isna().sum() == 3
+
+
+def test_missing_is_a_copy():
+    s = pd.Series([1, None, 3], dtype='Int64')
+    mask = nullable.missing(s)
+    assert mask.tolist() == [False, True, False]
+    mask[:] = True
+    assert s.notna().sum() == 2
+    assert nullable.missing(pd.Series([1.0, np.nan])).tolist() == [False, True]
+
+
+def test_validity_bitmap():
+    s = pd.Series([1, None, 3, None, 5, 6, 7, 8, 9], dtype='Int64')
+    bits = nullable.validity_bitmap(s)
+    assert np.unpackbits(bits, bitorder='little')[:len(s)].tolist() == s.notna().astype(int).tolist()
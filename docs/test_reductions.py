@@ -0,0 +1,57 @@
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from reductions import kahan_sum, my_mean, my_sum, parallel_mean, parallel_sum
+
+
+def _loop(x):
+    # the primer's version
+    y = 0
+    for u in x:
+        y = y + u
+    return y
+
+
+@pytest.mark.parametrize('values', [[], [1, 2, 3], [0.1] * 10, [1, 0.5, 2], [1e100, 1.0, -1e100],
+                                    [2 ** 60, 1, 1], [True, 2]])
+def test_same_for_every_container(values):
+    expected = math.fsum(values) if any(isinstance(u, float) for u in values) else _loop(values)
+    for x in [values, tuple(values), iter(values)]:
+        total = my_sum(x)
+        assert total == expected and type(total) is type(expected)
+
+
+def test_ints_stay_exact():
+    values = [2 ** 53, 1, 1]
+    assert my_sum(values) == _loop(values) == 2 ** 53 + 2
+    assert my_sum(iter(values)) == 2 ** 53 + 2
+    assert kahan_sum(iter(values)) == (2 ** 53 + 2, 3)
+
+
+@pytest.mark.parametrize('values', [[math.inf, 1.0], [1.0, -math.inf], [math.inf, -math.inf],
+                                    [math.nan, 1.0], [1, math.inf]])
+def test_not_finite(values):
+    expected = _loop(values)
+    for x in [values, iter(values)]:
+        total = my_sum(x)
+        assert total == expected or (math.isnan(total) and math.isnan(expected))
+
+
+def test_arrays():
+    x = np.random.RandomState(0).rand(1001)
+    assert my_sum(x) == pytest.approx(math.fsum(x))
+    assert my_mean(pd.Series(x)) == pytest.approx(x.mean())
+    assert my_mean(iter(x.tolist())) == pytest.approx(x.mean())
+    with pytest.raises(ZeroDivisionError):
+        my_mean(iter([]))
+
+
+def test_parallel():
+    x = np.random.RandomState(0).rand(10000)
+    assert parallel_sum(x, chunksize=1000) == pytest.approx(math.fsum(x))
+    assert parallel_mean(x, chunksize=1000) == pytest.approx(x.mean())
+    ints = np.arange(10000)
+    assert parallel_sum(ints, chunksize=1000) == ints.sum()
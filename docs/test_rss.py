@@ -0,0 +1,28 @@
+import resource
+
+import numpy as np
+import pytest
+
+import rss
+
+
+def test_current_and_peak():
+    assert 0 < rss.current() <= rss.peak()
+
+
+def test_peak_of_a_piece_of_work():
+    if not rss.reset_peak():
+        pytest.skip('the peak RSS cannot be reset here')
+    before = rss.current()
+    block = np.ones(50 * 2 ** 20 // 8)  # 50 MB, touched
+    assert rss.peak() - before >= 40 * 2 ** 20
+    del block
+
+
+@pytest.mark.parametrize('platform, scale', [('darwin', 1), ('linux', 1024)])
+def test_getrusage_units(monkeypatch, platform, scale):
+    def no_proc():
+        raise OSError
+    monkeypatch.setattr(rss, '_status', no_proc)
+    monkeypatch.setattr(rss.sys, 'platform', platform)
+    assert rss.peak() == resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
@@ -0,0 +1,48 @@
+import json
+
+import runner
+
+
+def _script(directory, name, *cells):
+    path = directory / name
+    path.write_text(''.join(f'# %%\n{c}\n\n' for c in cells))
+    return str(path)
+
+
+def test_outputs_and_notebook(tmp_path):
+    path = _script(tmp_path, 'a.py', 'import pandas as pd\nx = 41', 'print(x + 1)', 'x')
+    [report] = runner.run([path], out=str(tmp_path / 'out'), verbose=False)
+    assert report['status'] == 'ok' and len(report['cells']) == 3
+    nb = json.load(open(report['notebook']))
+    assert nb['cells'][1]['outputs'][0]['text'] == ['42\n']
+    assert nb['cells'][2]['outputs'][0]['data']['text/plain'] == ['41']
+
+
+def test_error_stops_script(tmp_path):
+    path = _script(tmp_path, 'e.py', '1 / 0', 'print(1)')
+    [report] = runner.run([path], verbose=False)
+    assert report['status'] == 'error' and len(report['cells']) == 1
+    [report] = runner.run([path], stop=False, verbose=False)
+    assert report['status'] == 'error' and len(report['cells']) == 2
+
+
+def test_timeout_not_swallowed(tmp_path):
+    path = _script(tmp_path, 't.py', 'import time\ntry:\n    time.sleep(5)\nexcept Exception:\n'
+                                     '    pass', 'print(1)')
+    [report] = runner.run([path], timeout=0.3, verbose=False)
+    assert report['status'] == 'timeout' and len(report['cells']) == 1
+    assert report['wall'] < 3
+
+
+def test_scripts_dont_share_state(tmp_path):
+    first = _script(tmp_path, 'a.py', 'import sys\nsys.modules["leak"] = sys')
+    second = _script(tmp_path, 'b.py', 'import sys\nassert "leak" not in sys.modules')
+    reports = runner.run([first, second], workers=1, verbose=False)
+    assert [r['status'] for r in reports] == ['ok', 'ok']
+
+
+def test_crash(tmp_path):
+    crash = _script(tmp_path, 'c.py', 'import os\nos._exit(1)')
+    fine = _script(tmp_path, 'f.py', 'x = 1')
+    reports = runner.run([crash, fine], workers=2, verbose=False)
+    assert [r['status'] for r in reports] == ['crashed', 'ok']
@@ -0,0 +1,59 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import shmframe
+
+
+def _segments():
+    return {f for f in os.listdir('/dev/shm') if f.startswith('psm_')} \
+        if os.path.isdir('/dev/shm') else set()
+
+
+@pytest.fixture
+def df():
+    return pd.DataFrame({
+        'float': [1.5, np.nan, 3.0], 'int': [1, 2, 3], 'bool': [True, False, True],
+        'str': ['a', None, 'c'], 'object': pd.Series([1, 'x', None], dtype=object),
+        'Int64': pd.array([1, None, 3], dtype='Int64'),
+        'Float64': pd.array([0.5, None, 1.5], dtype='Float64'),
+        'boolean': pd.array([True, None, False], dtype='boolean'),
+        'category': pd.Categorical(['x', 'y', None], categories=['y', 'x', 'z']),
+        'datetime': pd.to_datetime(['2020-01-01', None, '2020-01-03']),
+        'tz': pd.to_datetime(['2020-01-01', '2020-01-02', None]).tz_localize('UTC'),
+    }, index=pd.Index(['r0', 'r1', 'r2'], name='row'))
+
+
+def test_round_trip(df):
+    before = _segments()
+    handle = shmframe.to_shared(df)
+    assert len(_segments() - before) == len(shmframe.segments(handle))
+    pd.testing.assert_frame_equal(shmframe.from_shared(handle), df)
+    assert _segments() == before
+
+
+def test_view_is_read_only_and_shared(df):
+    handle = shmframe.to_shared(df)
+    try:
+        view, opened = shmframe.view(handle)
+        pd.testing.assert_frame_equal(view, df)
+        assert view['Int64'].dtype == 'Int64'
+        # no copy: a write through another mapping of the segments shows in the view
+        with shmframe.attach(handle, readonly=False) as views:
+            views['int'][0] = 99
+            views['Int64']._data[0] = 99
+        assert view['int'].iloc[0] == 99 and view['Int64'].iloc[0] == 99
+        for column in ('int', 'Int64', 'category'):
+            with pytest.raises(ValueError):
+                view.loc['r0', column] = view[column].iloc[1]
+        del view
+        shmframe.close(opened)
+    finally:
+        shmframe.release(handle)
+
+
+def test_empty(df):
+    pd.testing.assert_frame_equal(shmframe.from_shared(shmframe.to_shared(df.iloc[:0])),
+                                  df.iloc[:0])
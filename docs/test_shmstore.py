@@ -0,0 +1,104 @@
+import os
+import signal
+import subprocess
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from shmstore import Store
+
+
+def _segments():
+    return {f for f in os.listdir('/dev/shm') if f.startswith('psm_')} \
+        if os.path.isdir('/dev/shm') else set()
+
+
+@pytest.fixture
+def df():
+    return pd.DataFrame({'country': ['Chad', 'Chad', 'Peru', 'Peru'],
+                         'year': [2002, 2007, 2002, 2007],
+                         'lifeExp': [50.5, np.nan, 69.9, 71.4],
+                         'pop': pd.array([9, None, 27, 28], dtype='Int64')})
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = Store(tmp_path / 'catalog')
+    yield store
+    store.close()
+
+
+def _child(store, code):
+    code = 'import sys\nfrom shmstore import Store\n' \
+           f'store = Store({store.directory!r})\n' + code
+    return subprocess.Popen([sys.executable, '-c', code], stdout=subprocess.PIPE, text=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_get_is_the_frame_read_only(store, df):
+    store.put('gapminder', df)
+    got = store.get('gapminder')
+    pd.testing.assert_frame_equal(got, df)
+    with pytest.raises(ValueError):
+        got.loc[0, 'year'] = 1
+    with pytest.raises(ValueError):
+        store.put('gapminder', df)
+
+
+def test_categorize(store, df):
+    store.put('gapminder', df, categorize=True)
+    got = store.get('gapminder')
+    assert isinstance(got['country'].dtype, pd.CategoricalDtype)
+    pd.testing.assert_frame_equal(got.astype({'country': 'str'}), df)
+
+
+def test_last_release_removes(store, df):
+    before = _segments()
+    store.put('gapminder', df)
+    store.get('gapminder')
+    store.release('gapminder')
+    assert 'gapminder' in store
+    store.release('gapminder')
+    assert 'gapminder' not in store and _segments() == before
+    with pytest.raises(KeyError):
+        store.release('gapminder')
+
+
+def test_other_process(store, df):
+    store.put('gapminder', df, pin=True)
+    child = _child(store, "print(int(store.get('gapminder')['year'].sum()))\n"
+                          "print(store.catalog()['holders'].iloc[0])")
+    assert child.communicate()[0].split() == [str(df['year'].sum()), '1']
+    # the child's reference went with it
+    assert store.catalog()['holders'].iloc[0] == 0
+    store.drop('gapminder')
+
+
+def test_dead_holder_collected(store, df):
+    before = _segments()
+    child = _child(store, "import time\nstore.put('gapminder', __import__('pandas')"
+                          ".DataFrame({'a': [1, 2]}))\nprint('ready', flush=True)\ntime.sleep(60)")
+    assert child.stdout.readline().strip() == 'ready'
+    assert 'gapminder' in store
+    child.send_signal(signal.SIGKILL)
+    child.wait()
+    assert store.collect() == ['gapminder']
+    assert _segments() == before
+
+
+def test_pinned_until_dropped(store, df):
+    before = _segments()
+    store.put('gapminder', df, pin=True)
+    got = store.get('gapminder')
+    store.drop('gapminder')
+    assert 'gapminder' not in store and _segments() == before
+    pd.testing.assert_frame_equal(got, df)  # still readable where already attached
+    store.release('gapminder')
+
+
+def test_replace(store, df):
+    store.put('gapminder', df)
+    store.put('gapminder', df.head(2), replace=True)
+    assert len(store.get('gapminder')) == 2
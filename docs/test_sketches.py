@@ -0,0 +1,144 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from groupindex import groupby
+from sketches import (KLL, CountMin, GroupedSummary, HyperLogLog, Moments, approx_describe,
+                      approx_nunique, approx_quantile, approx_value_counts, hash_values)
+
+
+@pytest.fixture
+def df():
+    rng = np.random.RandomState(0)
+    n = 20000
+    return pd.DataFrame({'continent': rng.choice(['Asia', 'Europe', 'Africa'], n),
+                         'lifeExp': np.where(rng.rand(n) < 0.05, np.nan, rng.normal(60, 10, n)),
+                         'pop': rng.randint(0, 10 ** 6, n)})
+
+
+def _rank(values, x):
+    # the fraction of values below x
+    return np.searchsorted(np.sort(values), x) / len(values)
+
+
+def test_moments_merge():
+    x = np.random.RandomState(0).rand(1001)
+    merged = Moments().update(x[:300]).merge(Moments().update(x[300:]))
+    assert merged.n == len(x)
+    assert merged.mean == pytest.approx(x.mean())
+    assert merged.var() == pytest.approx(x.var(ddof=1))
+    assert (merged.min, merged.max) == (x.min(), x.max())
+
+
+def test_kll_small_is_exact():
+    x = np.random.RandomState(0).rand(150)
+    qs = [0, 0.1, 0.25, 0.5, 0.9, 1]
+    np.testing.assert_allclose(KLL(200).update(x).quantiles(qs), np.quantile(x, qs))
+
+
+@pytest.mark.parametrize('chunks', [1, 7])
+def test_kll_rank_error(chunks):
+    x = np.random.RandomState(1).lognormal(size=100000)
+    sketches = [KLL(200, seed=i).update(part) for i, part in enumerate(np.array_split(x, chunks))]
+    sketch = sketches[0]
+    for other in sketches[1:]:
+        sketch.merge(other)
+    assert sketch.n == len(x)
+    assert sum(len(level) for level in sketch.levels) < 3 * 200 * 2
+    qs = np.linspace(0.01, 0.99, 25)
+    ranks = _rank(x, sketch.quantiles(qs))
+    assert np.abs(ranks - qs).max() <= sketch.rank_error()
+    assert sketch.quantiles([0, 1]).tolist() == [x.min(), x.max()]
+
+
+def test_kll_merge_needs_same_k():
+    with pytest.raises(ValueError):
+        KLL(100).merge(KLL(200))
+
+
+def test_grouped_summary_chunks(df):
+    summary = GroupedSummary(seed=0)
+    for start in range(0, len(df), 3000):
+        chunk = df.iloc[start:start + 3000]
+        summary.update(chunk['continent'], chunk['lifeExp'])
+    got = summary.describe(name='continent')
+    expected = df.groupby('continent')['lifeExp'].describe()
+    exact = ['count', 'mean', 'std', 'min', 'max']
+    pd.testing.assert_frame_equal(got[exact], expected[exact])
+    for key, row in got.iterrows():
+        values = df.loc[(df['continent'] == key) & df['lifeExp'].notna(), 'lifeExp'].to_numpy()
+        ranks = _rank(values, row[['25%', '50%', '75%']].to_numpy(dtype=float))
+        assert np.abs(ranks - [0.25, 0.5, 0.75]).max() <= summary.rank_error()
+
+
+@pytest.mark.parametrize('approx', [False, True])
+def test_describe(df, approx):
+    got = groupby(df, 'continent')['lifeExp'].describe(approx=approx)
+    expected = df.groupby('continent')['lifeExp'].describe()
+    if approx:
+        got, expected = got[['count', 'mean', 'std', 'min', 'max']], \
+            expected[['count', 'mean', 'std', 'min', 'max']]
+    pd.testing.assert_frame_equal(got, expected)
+
+
+def test_approx_frame_helpers(df):
+    got = approx_describe(df)
+    expected = df.describe()
+    pd.testing.assert_frame_equal(got.loc[['count', 'mean', 'std', 'min', 'max']],
+                                  expected.loc[['count', 'mean', 'std', 'min', 'max']])
+    median = approx_quantile(df['lifeExp'], 0.5)
+    assert abs(_rank(df['lifeExp'].dropna().to_numpy(), median) - 0.5) <= 3.3 / 200
+
+
+@pytest.mark.parametrize('equal', [[np.array([1, 2, -3]), np.array([1.0, 2.0, -3.0]),
+                                    np.array([1, 2, -3], dtype=np.int32),
+                                    np.array([1, 2, -3], dtype=object)],
+                                   [np.array([0.0]), np.array([-0.0]), np.array([False])]])
+def test_hash_values_equal_numbers(equal):
+    first = hash_values(equal[0])
+    for values in equal[1:]:
+        assert (hash_values(values) == first).all()
+
+
+def test_hash_values_types_differ():
+    h = hash_values(np.array([1, '1', True, 'True', (1, 2), '(1, 2)', 1.5], dtype=object))
+    assert len(set(h.tolist())) == 6  # 1 and True are equal
+    assert h[6] == hash_values(np.array([1.5]))[0]
+    assert h[1] == hash_values(np.array(['1', 'x'], dtype=object))[0]
+
+
+def test_hll_int_and_float_chunks():
+    merged = HyperLogLog().update([1, 2, 3]).merge(HyperLogLog().update([1.0, 2.0, np.nan]))
+    assert merged.count() == 3
+    merged = HyperLogLog().update(pd.Series([1, 2])).merge(
+        HyperLogLog().update(pd.Series([2, None], dtype='Int64')))
+    assert merged.count() == 2
+
+
+def test_hll_error(df):
+    values = pd.Series(np.random.RandomState(0).randint(0, 10 ** 9, 200000))
+    expected = values.nunique()
+    chunks = [HyperLogLog().update(c) for c in np.array_split(values, 4)]
+    for c in chunks[1:]:
+        chunks[0].merge(c)
+    assert abs(chunks[0].count() - expected) <= 4 * chunks[0].error() * expected
+    assert approx_nunique(df[['continent']])['continent'] == 3
+
+
+def test_count_min_chunks():
+    first, second = pd.Series([1, 2, 2, 3]), pd.Series([2.0, np.nan, 1.0])
+    sketch = CountMin().update(first).merge(CountMin().update(second))
+    assert sketch.n == 6
+    assert sketch.query([1, 2, 3, 1.0]).tolist() == [2, 3, 1, 2]
+    assert sketch.most_common(1).to_dict() == {2: 3}
+
+
+def test_count_min_bound(df):
+    values = pd.Series(np.random.RandomState(0).zipf(1.5, 100000) % 5000)
+    got = approx_value_counts(values, n=10, eps=1e-3)
+    expected = values.value_counts()
+    assert list(got.index[:5]) == list(expected.index[:5])
+    over = got - expected[got.index]
+    assert (over >= 0).all() and (over <= 1e-3 * len(values)).all()
+    pd.testing.assert_series_equal(approx_value_counts(df['continent'], n=3),
+                                   df['continent'].value_counts(), check_index_type=False)
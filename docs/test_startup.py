@@ -0,0 +1,96 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+import startup
+
+STARTUP = os.path.abspath(startup.__file__)
+
+
+@pytest.fixture
+def module(tmp_path, monkeypatch):
+    """A module that records when it is run"""
+    (tmp_path / 'slowmod.py').write_text('import sys\nsys.slowmod_ran = True\nvalue = 42\n')
+    monkeypatch.syspath_prepend(str(tmp_path))
+    yield 'slowmod'
+    sys.modules.pop('slowmod', None)
+    if hasattr(sys, 'slowmod_ran'):
+        del sys.slowmod_ran
+
+
+def test_lazy_import(module):
+    finder = startup.install([module])
+    try:
+        import slowmod
+        assert not hasattr(sys, 'slowmod_ran')
+        assert slowmod.value == 42
+        assert sys.slowmod_ran
+    finally:
+        startup.uninstall(finder)
+    assert finder not in sys.meta_path
+
+
+def test_other_modules_not_lazy(module):
+    finder = startup.install(['numpy'])
+    try:
+        import slowmod  # noqa: F401
+        assert sys.slowmod_ran
+    finally:
+        startup.uninstall(finder)
+
+
+def test_code_is_cached(tmp_path):
+    path = tmp_path / 'script.py'
+    path.write_text('x = 1\n')
+    namespace = {}
+    exec(startup.code(str(path)), namespace)
+    assert namespace['x'] == 1
+    pyc = startup._pyc(str(path))
+    assert os.path.exists(pyc)
+    written = os.stat(pyc).st_mtime_ns
+    exec(startup.code(str(path)), namespace)
+    assert os.stat(pyc).st_mtime_ns == written
+    path.write_text('x = 22\n')  # another size, so stale whatever the mtime
+    exec(startup.code(str(path)), namespace)
+    assert namespace['x'] == 22
+
+
+def test_run(tmp_path):
+    path = tmp_path / 'script.py'
+    path.write_text(
+        'import pickle, sys\n'
+        'import pandas as pd\n'
+        "loaded = 'pandas.core.frame' in sys.modules\n"
+        'def f():\n'
+        '    pass\n'
+        "print(sys.argv[1:], loaded, len(pd.DataFrame({'a': [1, 2]})),\n"
+        "      'pandas.core.frame' in sys.modules, pickle.loads(pickle.dumps(f)) is f)\n")
+    out = subprocess.run([sys.executable, STARTUP, str(path), 'a', 'b'], capture_output=True,
+                         text=True, check=True).stdout
+    assert out == "['a', 'b'] False 2 True True\n"
+    assert os.path.exists(startup._pyc(str(path)))
+
+
+def test_importtime():
+    text = ('import time: self [us] | cumulative | imported package\n'
+            'import time:       150 |        150 |     _io\n'
+            'import time:      1000 |       3000 |   encodings\n'
+            'import time:      2500 |       9000 | pandas\n'
+            'some other output\n')
+    assert startup.importtime(text) == [
+        {'module': '_io', 'self': 0.00015, 'cumulative': 0.00015, 'depth': 2},
+        {'module': 'encodings', 'self': 0.001, 'cumulative': 0.003, 'depth': 1},
+        {'module': 'pandas', 'self': 0.0025, 'cumulative': 0.009, 'depth': 0},
+    ]
+
+
+def test_profile(tmp_path):
+    path = tmp_path / 'script.py'
+    path.write_text('import json\nprint(json.dumps(1))\n')
+    results = [startup.profile(str(path), lazy=lazy) for lazy in (False, True)]
+    for r in results:
+        assert r['returncode'] == 0
+        assert any(m['module'] == 'json' for m in r['modules'])
+    assert 'via startup.py' in startup.report(results)
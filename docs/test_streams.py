@@ -0,0 +1,72 @@
+import time
+from glob import glob
+
+import pandas as pd
+import pytest
+
+from streams import csv_chunks, files, stream
+
+
+def _square(x):
+    return x * x
+
+
+def test_builtins():
+    assert stream(range(10)).map(_square).filter(lambda x: x % 2).collect() == \
+        [x * x for x in range(10) if x * x % 2]
+    assert stream('abc').enumerate(1).collect() == list(enumerate('abc', 1))
+    assert stream('abc').zip(range(3), 'xyz').collect() == list(zip('abc', range(3), 'xyz'))
+    assert stream(range(7)).batch(3).collect() == [[0, 1, 2], [3, 4, 5], [6]]
+    assert stream([[1, 2], [], [3]]).flat_map(iter).collect() == [1, 2, 3]
+    assert list(stream(iter(range(100))).take(3)) == [0, 1, 2]
+
+
+@pytest.mark.parametrize('size, step', [(3, 1), (2, 2), (3, 2), (5, 1)])
+def test_window(size, step):
+    items = list(range(7))
+    expected = [tuple(items[i:i + size]) for i in range(0, len(items) - size + 1, step)]
+    assert stream(items).window(size, step).collect() == expected
+
+
+def test_lazy():
+    seen = []
+    s = stream(range(5)).map(lambda x: seen.append(x) or x)
+    assert seen == []
+    assert s.take(2).collect() == [0, 1] and seen == [0, 1]
+
+
+@pytest.mark.parametrize('kind', ['thread', 'process'])
+def test_parallel_map_in_order(kind):
+    assert stream(range(20)).map(_square, workers=2, kind=kind).collect() == \
+        [x * x for x in range(20)]
+
+
+def test_backpressure():
+    started = []
+
+    def slow(x):
+        started.append(x)
+        return x
+
+    out = iter(stream(range(100)).map(slow, workers=2, buffer=4))
+    next(out)
+    time.sleep(0.1)
+    assert len(started) <= 5
+
+
+def test_map_kind():
+    with pytest.raises(ValueError):
+        stream([1]).map(_square, workers=1, kind='fiber')
+
+
+def test_csv_chunks(tmp_path):
+    for i in range(3):
+        pd.DataFrame({'a': range(i, i + 5), 'b': list('vwxyz')}).to_csv(tmp_path / f'table{i}.csv',
+                                                                      index=False)
+    pattern = str(tmp_path / 'table*.csv')
+    names = sorted(glob(pattern))
+    assert files(pattern).collect() == names
+    chunks = files(pattern).flat_map(csv_chunks(2)).collect()
+    assert len(chunks) == 9 and all(len(c) <= 2 for c in chunks)
+    expected = pd.concat([pd.read_csv(n) for n in names], ignore_index=True)
+    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), expected)